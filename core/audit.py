@@ -1,7 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional
+import asyncio
+import hashlib
 import json
-from .schema import AuditResult, AuditStatus, TaskContext
+import re
+import time
+from collections import OrderedDict
+from .schema import AuditResult, AuditStatus, RiskTier, TaskContext
+from .prompts import AUDIT_PROMPT
+from .text import normalize_query
 
 class BaseAuditor(ABC):
     """
@@ -15,6 +22,58 @@ class BaseAuditor(ABC):
         """
         pass
 
+    def config(self) -> Dict[str, Any]:
+        """
+        审计器配置描述 (用于审计缓存失效判定)：类名、审计代码摘要、公开的简单配置属性，子审计器递归展开。
+        统计计数与私有属性不计入；provider 等复杂对象只记录类名。
+        """
+        code = type(self).audit.__code__
+        config = {
+            "class": type(self).__qualname__,
+            "code": hashlib.sha1(code.co_code + repr([c for c in code.co_consts if isinstance(c, (str, int, float))]).encode("utf-8")).hexdigest()[:12],
+        }
+        for name, value in vars(self).items():
+            if name.startswith("_") or name == "counters":
+                continue
+            if isinstance(value, BaseAuditor):
+                config[name] = value.config()
+            elif isinstance(value, (list, tuple)) and value and all(isinstance(v, BaseAuditor) for v in value):
+                config[name] = [v.config() for v in value]
+            elif isinstance(value, (str, int, float, bool, type(None), list, tuple, dict, set, frozenset)):
+                config[name] = sorted(map(str, value)) if isinstance(value, (set, frozenset)) else value
+            else:
+                config[name] = type(value).__name__
+        return config
+
+# 需要升级复核的参数特征：路径穿越、shell 元字符 (含换行 / 回车命令分隔符)、通配符、绝对路径 / 家目录
+_SUSPICIOUS_PARAM = re.compile(r"\.\.[/\\]|[;|&`$<>*\n\r]|^\s*[/~]")
+
+
+def suspicious_parameter(parameters: Any, prefix: str = "") -> Optional[str]:
+    """返回第一个值可疑的参数名 (递归检查嵌套结构)，没有则返回 None"""
+    if isinstance(parameters, dict):
+        items = parameters.items()
+    elif isinstance(parameters, (list, tuple)):
+        items = enumerate(parameters)
+    elif isinstance(parameters, str) and _SUSPICIOUS_PARAM.search(parameters):
+        return prefix or "value"
+    else:
+        return None
+    for key, value in items:
+        found = suspicious_parameter(value, f"{prefix}.{key}" if prefix else str(key))
+        if found is not None:
+            return found
+    return None
+
+
+def context_risk_tier(context: TaskContext) -> Optional[RiskTier]:
+    """调度器在审计前写入 context.metadata["risk_tier"]；未声明或无法识别时返回 None"""
+    try:
+        return RiskTier(context.metadata.get("risk_tier"))
+    except ValueError:
+        return None
+
+
 class RuleBasedAuditor(BaseAuditor):
     """
     基于规则的审计器：检测高危操作和毁灭性意图。
@@ -65,37 +124,15 @@ class AIAuditor(BaseAuditor):
 
     async def audit(self, skill_id: str, parameters: Dict[str, Any], context: TaskContext) -> AuditResult:
         raw_query = context.messages[0].content
-        
-        system_prompt = f"""
-你现在是 JANUS Hub 的首席安全审计官 (CISO)。
-你的任务是审查即将执行的技能调用，判断其是否存在安全风险、隐私泄露或毁灭性倾向。
-
-## 执行详情:
-- 目标技能: {skill_id}
-- 执行参数: {json.dumps(parameters, ensure_ascii=False)}
-- 原始意图: {raw_query}
-
-## 审计准则:
-1. 严禁未经授权的文件删除、格式化操作。
-2. 严禁越权访问系统核心配置文件。
-3. 对大批量的数据导出或列表操作需给出 WARN（警告）。
-4. 对常规、无害的查询给出 PASS。
-
-## 响应格式要求:
-必须返回一个 JSON 对象：
-- status: "pass", "warn", 或 "fail"
-- rationale: 详细的理由
-- risk_level: 0-10 风险等级
-
-示例：
-{{"status": "fail", "rationale": "试图删除受保护的数据目录", "risk_level": 10}}
-"""
+        # 审计准则为静态前缀，执行详情放在其后的用户消息中
+        messages = AUDIT_PROMPT.render(
+            skill_id=skill_id,
+            parameters=json.dumps(parameters, ensure_ascii=False),
+            raw_query=raw_query
+        )
         try:
-            from .schema import Message, MessageRole
-            response_json = await self.provider.chat([
-                Message(role=MessageRole.SYSTEM, content=system_prompt),
-                Message(role=MessageRole.USER, content="请进行安全评估。")
-            ])
+            from .schema import Message
+            response_json = await self.provider.chat([Message(**m) for m in messages])
             
             # 清理 JSON
             if "```json" in response_json:
@@ -104,26 +141,261 @@ class AIAuditor(BaseAuditor):
             data = json.loads(response_json)
             return AuditResult(**data)
         except Exception as e:
-            return AuditResult(status=AuditStatus.PASS, rationale=f"AI 审计由于技术原因跳过: {str(e)}", risk_level=0)
+            return AuditResult(status=AuditStatus.PASS, rationale=f"AI 审计由于技术原因跳过: {str(e)}", risk_level=0,
+                               cacheable=False)
+
+    def config(self) -> Dict[str, Any]:
+        # 审计准则在提示词模板中，修改后应视为新的审计配置
+        return {**super().config(), "prompt": AUDIT_PROMPT.prefix_hash}
 
 class CompositeAuditor(BaseAuditor):
     """
     复合审计器：结合规则引擎与 AI 语义分析，构建多重防御线。
+    auditors 为每次必跑的廉价审计器；escalation 为昂贵审计器 (如 AIAuditor)，按技能风险等级决定是否升级：
+    - 技能声明的 risk_tier 属于 skip_tiers (默认只读) 时先跑廉价审计器，结论为 PASS、风险低于 escalate_risk
+      且参数中没有可疑内容才跳过昂贵审计器，否则升级复核
+    - 其他等级或未声明等级的技能，全部审计器并发运行
+    并发运行时审计耗时取决于最慢的一个而不是全部之和：
+    - 任一审计器判定 FAIL 立即取消其余审计器并返回 (Short-circuit on FAIL)
+    - 全部返回后取风险等级最高的结果 (同等级按审计器顺序取前者)
+    - deadline 为每个审计器的默认时限 (秒，None 不限)，deadlines 可按审计器类名单独设置；
+      超时按 timeout_policy 处理: "warn" 转人工确认 / "fail" 直接拦截 / "ignore" 忽略该审计器
+    各审计器的结论、跳过与升级原因写入返回结果的 audit_trail。
     """
-    def __init__(self, auditors: List[BaseAuditor]):
+    TIMEOUT_POLICIES = ("warn", "fail", "ignore")
+
+    def __init__(self, auditors: List[BaseAuditor], deadline: Optional[float] = None,
+                 deadlines: Optional[Dict[str, float]] = None, timeout_policy: str = "warn",
+                 escalation: Optional[List[BaseAuditor]] = None,
+                 skip_tiers: Iterable[RiskTier] = (RiskTier.READ_ONLY,), escalate_risk: int = 3):
+        if timeout_policy not in self.TIMEOUT_POLICIES:
+            raise ValueError(f"Unknown audit timeout policy: {timeout_policy}")
         self.auditors = auditors
+        self.escalation = escalation or []
+        self.deadline = deadline
+        self.deadlines = deadlines or {}
+        self.timeout_policy = timeout_policy
+        self.skip_tiers = set(skip_tiers)
+        self.escalate_risk = escalate_risk
+        self.counters = {"audits": 0, "short_circuits": 0, "cancelled": 0, "timeouts": 0, "escalations": 0, "skipped": 0}
+        self._durations: Dict[str, List[float]] = {}  # 审计器 -> [次数, 总耗时]
+        self._wall = [0, 0.0]
+
+    def _deadline_for(self, auditor: BaseAuditor) -> Optional[float]:
+        return self.deadlines.get(type(auditor).__name__, self.deadline)
+
+    def _on_timeout(self, name: str, deadline: float) -> Optional[AuditResult]:
+        self.counters["timeouts"] += 1
+        print(f"[审计中枢] 审计器 {name} 超过 {deadline:g}s 未返回，按 '{self.timeout_policy}' 策略处理。")
+        if self.timeout_policy == "fail":
+            return AuditResult(status=AuditStatus.FAIL, rationale=f"审计器 {name} 超时 ({deadline:g}s)，按策略拦截。",
+                               risk_level=10, cacheable=False)
+        if self.timeout_policy == "warn":
+            return AuditResult(status=AuditStatus.WARN, rationale=f"审计器 {name} 超时 ({deadline:g}s)，需要您的二次确认。",
+                               risk_level=5, cacheable=False)
+        return None
+
+    async def _run(self, index: int, auditor: BaseAuditor, skill_id: str, parameters: Dict[str, Any],
+                   context: TaskContext, trail: List[str], state: Dict[str, bool]):
+        name = type(auditor).__name__
+        deadline = self._deadline_for(auditor)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(auditor.audit(skill_id, parameters, context), deadline)
+            trail.append(f"{name}: {result.status.value} (risk {result.risk_level})")
+        except asyncio.TimeoutError:
+            result = self._on_timeout(name, deadline)
+            trail.append(f"{name}: timeout after {deadline:g}s -> {self.timeout_policy}")
+            state["transient"] = True  # ignore 策略下超时的审计器没有结论，同样不可缓存
+        if result is not None and not result.cacheable:
+            state["transient"] = True
+        entry = self._durations.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += time.perf_counter() - started
+        return index, result
+
+    async def _run_group(self, auditors: List[BaseAuditor], offset: int, skill_id: str, parameters: Dict[str, Any],
+                         context: TaskContext, trail: List[str], results: list,
+                         state: Dict[str, bool]) -> Optional[AuditResult]:
+        """并发运行一组审计器，结果追加到 results；出现 FAIL 时取消其余审计器并返回该结果"""
+        tasks = {
+            asyncio.ensure_future(self._run(offset + i, a, skill_id, parameters, context, trail, state)): a
+            for i, a in enumerate(auditors)
+        }
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, result = await next_done
+                if result is None:
+                    continue
+                # 如果任何一个审计器判定为 FAIL，取消其余审计器并直接返回
+                if result.status == AuditStatus.FAIL:
+                    self.counters["short_circuits"] += 1
+                    return result
+                results.append((index, result))
+        finally:
+            for task, auditor in tasks.items():
+                if not task.done():
+                    task.cancel()
+                    self.counters["cancelled"] += 1
+                    trail.append(f"{type(auditor).__name__}: cancelled")
+        return None
+
+    def _escalation_reason(self, parameters: Dict[str, Any], results: list) -> Optional[str]:
+        for _, result in results:
+            if result.status != AuditStatus.PASS or result.risk_level >= self.escalate_risk:
+                return f"rule verdict {result.status.value} (risk {result.risk_level})"
+        key = suspicious_parameter(parameters)
+        if key is not None:
+            return f"suspicious parameter '{key}'"
+        return None
 
     async def audit(self, skill_id: str, parameters: Dict[str, Any], context: TaskContext) -> AuditResult:
-        highest_risk_result = None
-        
-        for auditor in self.auditors:
-            result = await auditor.audit(skill_id, parameters, context)
-            
-            # 如果任何一个审计器判定为 FAIL，直接终止 (Short-circuit on FAIL)
-            if result.status == AuditStatus.FAIL:
-                return result
-            
-            if not highest_risk_result or result.risk_level > highest_risk_result.risk_level:
-                highest_risk_result = result
-                
-        return highest_risk_result or AuditResult(status=AuditStatus.PASS, rationale="所有审计环节均已通过。", risk_level=1)
+        self.counters["audits"] += 1
+        started = time.perf_counter()
+        tier = context_risk_tier(context)
+        trail = [f"tier: {tier.value if tier else 'undeclared'}"]
+        results = []
+        state = {"transient": False}
+        try:
+            if self.escalation and tier in self.skip_tiers:
+                failed = await self._run_group(self.auditors, 0, skill_id, parameters, context, trail, results, state)
+                if failed is not None:
+                    return self._final(failed, trail, state)
+                reason = self._escalation_reason(parameters, results)
+                if reason is None:
+                    self.counters["skipped"] += 1
+                    trail.extend(f"{type(a).__name__}: skipped (low-risk tier, rule audit clean)" for a in self.escalation)
+                else:
+                    self.counters["escalations"] += 1
+                    trail.append(f"escalated: {reason}")
+                    failed = await self._run_group(self.escalation, len(self.auditors), skill_id, parameters, context,
+                                                   trail, results, state)
+            else:
+                if self.escalation:
+                    self.counters["escalations"] += 1
+                    trail.append(f"escalated: tier {tier.value if tier else 'undeclared'}")
+                failed = await self._run_group(self.auditors + self.escalation, 0, skill_id, parameters, context,
+                                               trail, results, state)
+        finally:
+            self._wall[0] += 1
+            self._wall[1] += time.perf_counter() - started
+
+        if failed is not None:
+            return self._final(failed, trail, state)
+        if not results:
+            return self._final(AuditResult(status=AuditStatus.PASS, rationale="所有审计环节均已通过。", risk_level=1), trail, state)
+        results.sort(key=lambda r: (-r[1].risk_level, r[0]))
+        return self._final(results[0][1], trail, state)
+
+    @staticmethod
+    def _final(result: AuditResult, trail: List[str], state: Dict[str, bool]) -> AuditResult:
+        return result.model_copy(update={"audit_trail": trail, "cacheable": result.cacheable and not state["transient"]})
+
+    def stats(self) -> dict:
+        auditors = {
+            name: {"count": n, "avg_ms": round(total / n * 1000, 2) if n else 0.0}
+            for name, (n, total) in self._durations.items()
+        }
+        return {
+            **self.counters,
+            "timeout_policy": self.timeout_policy,
+            "skip_tiers": sorted(t.value for t in self.skip_tiers),
+            "avg_wall_ms": round(self._wall[1] / self._wall[0] * 1000, 2) if self._wall[0] else 0.0,
+            # 串行执行时的预期耗时 (各审计器平均耗时之和)，与 avg_wall_ms 对比即并发收益
+            "serial_estimate_ms": round(sum(a["avg_ms"] for a in auditors.values()), 2),
+            "auditors": auditors,
+        }
+
+class CachedAuditor(BaseAuditor):
+    """
+    审计结论缓存 (Audit verdict cache)
+    key = 技能 ID + 参数指纹 (键排序后的 JSON) + 归一化原始查询 + 风险等级。
+    - 只缓存 PASS / FAIL；WARN 需要人工确认，每次都重新审计
+    - 不缓存标记为不可复用的结论 (审计器超时、AI 审计故障降级)
+    - TTL 过期 + LRU 淘汰 (max_entries)
+    - 内层审计器配置 (见 BaseAuditor.config：类、规则代码、配置属性、审计提示词) 的指纹只在构造、
+      reconfigure() 与 invalidate() 时计算，不在审计热路径上；就地修改审计器配置后须调用二者之一
+    """
+    CACHEABLE_STATUSES = (AuditStatus.PASS, AuditStatus.FAIL)
+
+    def __init__(self, inner: BaseAuditor, ttl: float = 300.0, max_entries: int = 256):
+        self.inner = inner
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (stored_at, AuditResult)
+        self.counters = {"lookups": 0, "hits": 0, "misses": 0, "stores": 0, "skipped": 0, "expired": 0,
+                         "evictions": 0, "invalidations": 0}
+        self._fingerprint = self.config_fingerprint()
+
+    def config_fingerprint(self) -> str:
+        payload = json.dumps(self.inner.config(), ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def reconfigure(self, inner: Optional[BaseAuditor] = None):
+        """替换内层审计器或在其配置被就地修改后调用：指纹变化时缓存的审计结论全部失效"""
+        if inner is not None:
+            self.inner = inner
+        fingerprint = self.config_fingerprint()
+        if fingerprint != self._fingerprint:
+            self.invalidate()
+
+    def invalidate(self):
+        """无条件丢弃全部缓存的审计结论，并按当前配置重新计算指纹"""
+        if self._entries:
+            self.counters["invalidations"] += 1
+            print("[审计缓存] 审计器配置已变化，缓存的审计结论全部失效。")
+        self._entries.clear()
+        self._fingerprint = self.config_fingerprint()
+
+    @staticmethod
+    def make_key(skill_id: str, parameters: Dict[str, Any], context: TaskContext) -> str:
+        params = json.dumps(parameters, ensure_ascii=False, sort_keys=True, default=str)
+        raw_query = normalize_query(context.messages[0].content) if context.messages else ""
+        tier = context.metadata.get("risk_tier") or ""
+        payload = json.dumps([skill_id, params, raw_query, tier], ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    async def audit(self, skill_id: str, parameters: Dict[str, Any], context: TaskContext) -> AuditResult:
+        key = self.make_key(skill_id, parameters, context)
+        self.counters["lookups"] += 1
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] >= self.ttl:
+            del self._entries[key]
+            self.counters["expired"] += 1
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            age = time.monotonic() - entry[0]
+            cached = entry[1]
+            return cached.model_copy(update={"audit_trail": [f"cache: hit (age {age:.0f}s)"] + cached.audit_trail})
+
+        self.counters["misses"] += 1
+        result = await self.inner.audit(skill_id, parameters, context)
+        if result.status in self.CACHEABLE_STATUSES and result.cacheable:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            self.counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+        else:
+            self.counters["skipped"] += 1
+        return result
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.counters["lookups"]
+        stats = {
+            **self.counters,
+            "entries": len(self._entries),
+            "ttl": self.ttl,
+            "config_fingerprint": self._fingerprint,
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+        }
+        inner_stats = getattr(self.inner, "stats", None)
+        if callable(inner_stats):
+            stats["inner"] = inner_stats()
+        return stats
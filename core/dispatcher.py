@@ -12,6 +12,7 @@ from .executor import BaseExecutor
 from .audit import BaseAuditor, AuditStatus
 from .memory import MirrorMemory, KnowledgeStore
 from .perception import PerceptionBus
+from .prompts import prompt_report
 
 class Dispatcher:
     """
@@ -28,7 +29,9 @@ class Dispatcher:
         self.skills: Dict[str, AgentSkill] = {}
         self.skill_executors: Dict[str, BaseExecutor] = {}
         self.active_tasks: Dict[str, TaskContext] = {}
+        self.pending_suggestions: Dict[str, TaskContext] = {}  # 待确认的反射建议 (active_tasks 的子集)
         self.completed_tasks_queue = asyncio.Queue()  # 背景任务完成队列
+        self.sensor_manager = None  # 由 SensorManager 注册，供 runtime_stats 读取
         self.dynamic_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "core", "dynamic_skills")
         os.makedirs(self.dynamic_dir, exist_ok=True)
         self._load_dynamic_skills()
@@ -39,6 +42,26 @@ class Dispatcher:
         self.skill_executors[skill.id] = executor
         print(f"[调度器] 已注册技能: {skill.name} ({skill.id}) 通过 {executor.__class__.__name__}")
 
+    def track_task(self, context: TaskContext):
+        """登记活跃任务，同时维护反射建议索引 (Register an active task)"""
+        self.active_tasks[context.task_id] = context
+        if context.metadata.get("is_suggestion"):
+            self.pending_suggestions[context.task_id] = context
+
+    def release_task(self, task_id: str):
+        """注销活跃任务 (Unregister an active task)"""
+        self.active_tasks.pop(task_id, None)
+        self.pending_suggestions.pop(task_id, None)
+
+    @property
+    def pending_suggestion_count(self) -> int:
+        """未决反射建议数量，O(1) (Number of outstanding reflex suggestions)"""
+        return len(self.pending_suggestions)
+
+    def next_suggestion(self) -> Optional[TaskContext]:
+        """最早登记的未决建议 (Oldest outstanding suggestion)"""
+        return next(iter(self.pending_suggestions.values()), None)
+
     async def handle_query(self, query: str) -> TaskContext:
         """
         Main entry point for user queries (用户查询主入口)
@@ -48,24 +71,33 @@ class Dispatcher:
         
         # 1. 获取感知快照并进行意图解析 (Perception-aware Intent Resolution)
         snapshot = self.perception.get_recent_snapshot()
-        intent = await self.provider.resolve_intent(query, list(self.skills.values()), perception_snapshot=snapshot)
-        
-        # 1.5 再次同步 (Re-sync in case the provider injected a gene)
-        self._load_dynamic_skills()
-        
-        # 2. Initialize Task Context
         task_id = str(uuid.uuid4())
         context = TaskContext(
             task_id=task_id,
-            messages=[Message(role=MessageRole.USER, content=query)],
-            metadata={
-                "intent": intent.model_dump(),
-                "perception_snapshot": snapshot
-            }
+            messages=[Message(role=MessageRole.USER, content=query)]
         )
+        # 流式 provider 在解析出技能 ID / 参数时即回调：提前预热技能并启动推测审计
+        speculation = {}
+        hint_kwargs = {}
+        if getattr(self.provider, "streams_intent", False):
+            hint_kwargs["on_skill_hint"] = lambda skill_id, parameters: self._on_skill_hint(context, speculation, skill_id, parameters)
+        try:
+            intent = await self.provider.resolve_intent(query, list(self.skills.values()), perception_snapshot=snapshot, **hint_kwargs)
+        except BaseException:
+            self._discard_speculation(speculation)
+            raise
+        
+        # 1.5 再次同步 (Re-sync in case the provider injected a gene)
+        self._load_dynamic_skills()
+        
+        # 2. Initialize Task Context (update 而非替换：保留推测审计期间写入的 risk_tier)
+        context.metadata.update({
+            "intent": intent.model_dump(),
+            "perception_snapshot": snapshot
+        })
 
         
-        self.active_tasks[task_id] = context
+        self.track_task(context)
 
         
         print(f"[调度器] 正在验证目标技能: {intent.target_skill_id}")
@@ -82,8 +114,15 @@ class Dispatcher:
             context.metadata["is_background"] = is_background
 
             # --- 强制审计环节 (Mandatory Audit) ---
-            print(f"[审计中枢] 正在对技能 {intent.target_skill_id} 进行安全扫描...")
-            audit_report = await self.auditor.audit(intent.target_skill_id, intent.parameters, context)
+            # 推测审计的技能与参数和最终意图完全一致时直接复用其结果，否则丢弃重审
+            audit_task = self._take_speculative_audit(speculation, intent)
+            if audit_task is not None:
+                print(f"[审计中枢] 技能 {intent.target_skill_id} 的安全扫描已在意图流式解析期间提前启动。")
+                audit_report = await audit_task
+            else:
+                print(f"[审计中枢] 正在对技能 {intent.target_skill_id} 进行安全扫描...")
+                context.metadata["risk_tier"] = self.skill_risk_tier(intent.target_skill_id)
+                audit_report = await self.auditor.audit(intent.target_skill_id, intent.parameters, context)
             
             # 将审计报告存入上下文消息中 (Persist audit report in context)
             context.messages.append(Message(
@@ -107,10 +146,65 @@ class Dispatcher:
             return await self.run_task(context)
         
         # 如果没有目标技能，也应该移除（意图解析完成但无后续）
-        if task_id in self.active_tasks:
-            del self.active_tasks[task_id]
+        self._discard_speculation(speculation)
+        self.release_task(task_id)
         return context
 
+    # --- 推测执行 (Speculative warm-up & audit) ---
+
+    def _on_skill_hint(self, context: TaskContext, speculation: dict, skill_id: str, parameters: Optional[dict]):
+        """流式意图解析的回调：技能 ID 已知即预热，参数也已知即启动推测审计"""
+        if skill_id not in self.skills and not os.path.exists(os.path.join(self.dynamic_dir, f"{skill_id}.py")):
+            return
+        if speculation.get("warmed") != skill_id:
+            speculation["warmed"] = skill_id
+            self._warm_up_skill(skill_id)
+        if parameters is None or not isinstance(parameters, dict):
+            return
+        if speculation.get("skill_id") == skill_id and speculation.get("parameters") == parameters:
+            return
+        self._discard_speculation(speculation)
+        # 审计器在任务启动时读取风险等级，须在创建任务前写入
+        context.metadata["risk_tier"] = self.skill_risk_tier(skill_id)
+        audit = asyncio.create_task(self.auditor.audit(skill_id, parameters, context))
+        audit.add_done_callback(lambda t: t.cancelled() or t.exception())  # 被丢弃的推测审计不报未取回异常
+        speculation.update({"skill_id": skill_id, "parameters": parameters, "audit": audit})
+
+    def skill_risk_tier(self, skill_id: str) -> Optional[str]:
+        """技能声明的风险等级 (供审计器决定是否升级复核)，未注册或未声明时为 None"""
+        skill = self.skills.get(skill_id)
+        return skill.risk_tier.value if skill is not None and skill.risk_tier else None
+
+    def _warm_up_skill(self, skill_id: str):
+        """动态技能预编译字节码；注册执行器的技能调用其 warm_up 钩子"""
+        dynamic_py = os.path.join(self.dynamic_dir, f"{skill_id}.py")
+        if os.path.exists(dynamic_py):
+            import py_compile
+            task = asyncio.get_running_loop().run_in_executor(None, py_compile.compile, dynamic_py)
+        elif skill_id in self.skill_executors:
+            task = asyncio.create_task(self.skill_executors[skill_id].warm_up(skill_id))
+        else:
+            return
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())  # 预热失败不影响正式执行
+
+    def _take_speculative_audit(self, speculation: dict, intent: Intent):
+        audit = speculation.get("audit")
+        if audit is None:
+            return None
+        if speculation["skill_id"] == intent.target_skill_id and speculation["parameters"] == intent.parameters:
+            speculation.pop("audit")
+            return audit
+        self._discard_speculation(speculation)
+        return None
+
+    @staticmethod
+    def _discard_speculation(speculation: dict):
+        audit = speculation.pop("audit", None)
+        if audit is not None and not audit.done():
+            audit.cancel()
+        speculation.pop("skill_id", None)
+        speculation.pop("parameters", None)
+
     async def run_task(self, context: TaskContext) -> TaskContext:
         """
         统一任务启动器：智能判断后台/前台执行
@@ -125,10 +219,39 @@ class Dispatcher:
             return context
         else:
             result_context = await self.execute_task(context)
-            if context.task_id in self.active_tasks:
-                del self.active_tasks[context.task_id]
+            self.release_task(context.task_id)
             return result_context
 
+    async def run_unattended(self, context: TaskContext) -> TaskContext:
+        """
+        无人值守任务 (定时任务等) 的启动器：与交互任务走同一审计管线，
+        只有 PASS 才执行；WARN 没有人可以确认，按未通过处理并记录。
+        """
+        intent_data = context.metadata.get("intent") or {}
+        skill_id = intent_data.get("target_skill_id")
+        parameters = intent_data.get("parameters") or {}
+        if not skill_id:
+            self.release_task(context.task_id)
+            return context
+
+        context.status = TaskStatus.AUDITING
+        context.metadata["risk_tier"] = self.skill_risk_tier(skill_id)
+        print(f"[审计中枢] 正在对无人值守任务 {context.task_id} 的技能 {skill_id} 进行安全扫描...")
+        audit_report = await self.auditor.audit(skill_id, parameters, context)
+        context.messages.append(Message(
+            role=MessageRole.SYSTEM,
+            content=f"审计报告: {audit_report.status.upper()} - {audit_report.rationale}",
+            metadata={"audit_report": audit_report.model_dump()}
+        ))
+
+        if audit_report.status != AuditStatus.PASS:
+            print(f"[审计中枢] ❌ 无人值守任务未获放行 ({audit_report.status.upper()}): {audit_report.rationale}")
+            context.status = TaskStatus.REJECTED
+            self.memory.log_task(context)
+            self.release_task(context.task_id)
+            return context
+        return await self.run_task(context)
+
     async def _run_task_in_background(self, context: TaskContext):
         """后台运行任务并入队 (Background execution runner)"""
         try:
@@ -136,8 +259,7 @@ class Dispatcher:
         finally:
             # 无论成功失败，都放入完成队列
             await self.completed_tasks_queue.put(context)
-            if context.task_id in self.active_tasks:
-                del self.active_tasks[context.task_id]
+            self.release_task(context.task_id)
 
     async def execute_task(self, context: TaskContext) -> TaskContext:
         """
@@ -204,6 +326,23 @@ class Dispatcher:
             self.memory.log_task(context)
             return context
 
+        if skill_id == "runtime_stats":
+            # 汇总各组件的运行时统计 (缓存命中率、审计耗时、事实落盘、传感器占空比)
+            sections = {}
+            for label, component in (("provider", self.provider), ("auditor", self.auditor)):
+                stats_fn = getattr(component, "stats", None)
+                if callable(stats_fn):
+                    sections[label] = stats_fn()
+            sections["prompts"] = prompt_report()
+            sections["fact_sink"] = dict(self.perception.fact_sink.stats)
+            if self.sensor_manager is not None:
+                sections["sensors"] = self.sensor_manager.stats()
+            result = "📊 运行时统计：\n" + json.dumps(sections, ensure_ascii=False, indent=2, default=str)
+            context.messages.append(Message(role=MessageRole.ASSISTANT, content=result))
+            context.status = TaskStatus.COMPLETED
+            self.memory.log_task(context)
+            return context
+
         if skill_id == "refresh_rules":
             self.perception.load_rules()
             result = f"🔄 反射神经已重载。当前活跃规则数: {len(self.perception.reflex_rules)}"
@@ -251,6 +390,12 @@ class Dispatcher:
                 new_intent = await self.provider.wait_for_brain(context, self)
                 # 注入完成后，更新意图并重新路由执行
                 context.metadata["intent"] = new_intent.model_dump()
+                if not new_intent.target_skill_id:
+                    # 脑桥超时或大脑未给出目标技能：终止，避免以空技能重新路由
+                    context.status = TaskStatus.FAILED
+                    context.messages.append(Message(role=MessageRole.SYSTEM, content=f"[大脑救援未完成] {new_intent.thought_process}"))
+                    self.memory.log_task(context)
+                    return context
                 
                 # --- 核心演化：如果大脑返回了 evolution_code，则物理更新基因！ ---
                 if "evolution_code" in new_intent.parameters:
@@ -283,12 +428,23 @@ class Dispatcher:
             return context
 
         if skill_id == "system_stats":
-            import subprocess
             try:
-                # 基因注入：赋予 JANUS 基础的系统感知能力
-                disk = subprocess.check_output("df -h | grep '/$' | awk '{print $4}'", shell=True).decode().strip()
-                top_files = subprocess.check_output("find . -maxdepth 2 -type f -exec ls -Ssh {} + | head -n 3", shell=True).decode().strip()
-                result = f"💻 系统状态报告：\n- 剩余磁盘空间 (根目录): {disk}\n- 当前目录周边大文件：\n{top_files}"
+                # 基因注入：赋予 JANUS 基础的系统感知能力 (读取 SystemSensor 的指标序列，不再 fork df/find)
+                from .sensors.system_sensor import read_system_snapshot
+                m = read_system_snapshot()
+                result = f"💻 系统状态报告：\n- 剩余磁盘空间 (根目录): {m.get('disk.free_gb', 0):.1f}G ({m.get('disk.used_pct', 0)}% 已用)"
+                if "cpu.busy_pct" in m:
+                    result += f"\n- CPU: {m['cpu.busy_pct']}% (iowait {m.get('cpu.iowait_pct', 0)}%)"
+                if "load.1" in m:
+                    result += f"\n- 负载 (1min): {m['load.1']} (每核 {m.get('load.per_cpu')})"
+                if "mem.available_pct" in m:
+                    result += f"\n- 可用内存: {m['mem.available_mb']} MB ({m['mem.available_pct']}%)"
+                if "io.busy_pct" in m:
+                    result += f"\n- 磁盘 IO: 读 {m['io.read_kbps']} KB/s, 写 {m['io.write_kbps']} KB/s, 繁忙 {m['io.busy_pct']}%"
+                if "proc.rss_mb" in m:
+                    result += f"\n- JANUS 进程常驻内存: {m['proc.rss_mb']} MB"
+                top_files = "\n".join(f"  {size / (1024 * 1024):.1f}M {path}" for size, path in self._largest_files(".", 3))
+                result += f"\n- 当前目录周边大文件：\n{top_files}"
             except:
                 result = "获取系统状态失败。"
             
@@ -400,6 +556,29 @@ class Dispatcher:
         self._load_dynamic_skills()
         return list(self.skills.values())
 
+    @staticmethod
+    def _largest_files(top: str, n: int = 3, max_depth: int = 2):
+        """返回 top 下 (深度不超过 max_depth) 最大的 n 个文件 [(size, path)]"""
+        import heapq
+        found = []
+        stack = [(top, 1)]
+        while stack:
+            dirpath, depth = stack.pop()
+            try:
+                with os.scandir(dirpath) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if depth < max_depth:
+                                    stack.append((entry.path, depth + 1))
+                            elif entry.is_file(follow_symlinks=False):
+                                found.append((entry.stat(follow_symlinks=False).st_size, entry.path))
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return heapq.nlargest(n, found)
+
     def _load_dynamic_skills(self):
         """Scans the dynamic directory for new skills (扫描动态技能文件夹)"""
         if not os.path.exists(self.dynamic_dir):
@@ -0,0 +1,22 @@
+import os
+
+
+def sense(params, state):
+    """
+    Git HEAD Watcher: 读取 .git/HEAD，与上一次的值比较。
+    state 在同一个工作者生命周期内保持，首次调用只记录基线。
+    """
+    repo = params.get("repo") or os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    head_file = os.path.join(repo, ".git", "HEAD")
+    try:
+        with open(head_file, "r", encoding="utf-8") as f:
+            head = f.read().strip()
+    except OSError:
+        return None
+
+    ref = head[len("ref: refs/heads/"):] if head.startswith("ref: refs/heads/") else f"detached@{head[:8]}"
+    previous = state.get("ref")
+    state["ref"] = ref
+    if previous is None or previous == ref:
+        return None
+    return {"source": "git", "data": f"检测到 Git 分支切换: {previous} -> {ref}", "importance": 0.5}
@@ -126,23 +126,56 @@ def check_memory_health(mirror_dir, knowledge_file):
     }
 
 
+def _dir_size(root_dir):
+    """纯 Python 统计目录大小 (不再调用 du)"""
+    total = 0
+    stack = [root_dir]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+
+def _human_size(num):
+    for unit in ("B", "K", "M", "G"):
+        if num < 1024:
+            return f"{num:.1f}{unit}" if unit != "B" else f"{num}{unit}"
+        num /= 1024
+    return f"{num:.1f}T"
+
+
 def check_resources(root_dir):
-    """检查系统资源"""
-    import subprocess
+    """检查系统资源 (读取 SystemSensor 维护的指标时间序列)"""
     score = 100
     
     try:
+        from core.sensors.system_sensor import read_system_snapshot
+        metrics = read_system_snapshot()
+        
         # 检查磁盘空间
-        disk_info = subprocess.check_output("df -h / | tail -n 1", shell=True).decode().split()
-        available_gb = disk_info[3]
+        free_gb = metrics.get("disk.free_gb", 0)
         
         # 检查工作目录大小
-        dir_size = subprocess.check_output(f"du -sh {root_dir}", shell=True).decode().split()[0]
+        dir_size = _human_size(_dir_size(root_dir))
         
         return {
             "score": score,
-            "disk_available": available_gb,
-            "workspace_size": dir_size
+            "disk_available": f"{free_gb:.1f}G",
+            "workspace_size": dir_size,
+            "cpu_busy_pct": metrics.get("cpu.busy_pct"),
+            "mem_available_pct": metrics.get("mem.available_pct"),
+            "load_per_cpu": metrics.get("load.per_cpu"),
+            "rss_mb": metrics.get("proc.rss_mb")
         }
     except:
         return {"score": 80, "error": "无法获取系统资源信息"}
@@ -268,6 +301,10 @@ def generate_report(diagnostics, total_score):
     report.append(f"\n3. 系统资源 [{rh['score']}/100] 🟢")
     report.append(f"   💾 磁盘剩余: {rh.get('disk_available', 'N/A')}")
     report.append(f"   📁 工作目录: {rh.get('workspace_size', 'N/A')}")
+    if rh.get('cpu_busy_pct') is not None:
+        report.append(f"   🧮 CPU: {rh['cpu_busy_pct']}% | 负载/核: {rh.get('load_per_cpu', 'N/A')}")
+    if rh.get('mem_available_pct') is not None:
+        report.append(f"   🧠 可用内存: {rh['mem_available_pct']}% | JANUS 常驻: {rh.get('rss_mb', 'N/A')} MB")
     
     # 感知系统
     ph = diagnostics["perception_health"]
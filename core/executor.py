@@ -19,6 +19,13 @@ class BaseExecutor(ABC):
         """
         pass
 
+    async def warm_up(self, skill_id: str):
+        """
+        Optional warm-up hook (预热钩子)：流式意图解析刚确定目标技能时调用，
+        可用于提前建立连接、加载模型等；默认什么也不做。
+        """
+        pass
+
 class LocalPythonExecutor(BaseExecutor):
     """
     Directly executes local Python functions (直接执行本地 Python 函数)
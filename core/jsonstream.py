@@ -0,0 +1,99 @@
+import json
+from typing import Any, Dict, List, Optional
+
+
+class IncrementalJSONObject:
+    """
+    增量 JSON 对象解析器 (Incremental parser for one top-level JSON object)
+    按流式片段 feed()，每当一个顶层字段的值完整闭合时立即解析并返回该字段名，
+    无需等待整个对象结束。对象之前的杂质 (如 ```json 围栏、寒暄) 会被跳过，
+    对象闭合后的内容被忽略。
+
+        parser = IncrementalJSONObject()
+        for chunk in stream:
+            for key in parser.feed(chunk):
+                print(key, parser.fields[key])
+    """
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._started = False
+        self._buf: List[str] = []   # 当前顶层 key 或 value 的原文
+        self._key: Optional[str] = None
+        self._expect = "key"        # key | colon | value
+        self._depth = 0             # 相对于顶层对象内部的嵌套深度
+        self._in_string = False
+        self._escape = False
+        self.raw = []
+
+    def feed(self, chunk: str) -> List[str]:
+        """喂入一个片段，返回本次新闭合的顶层字段名列表"""
+        completed = []
+        for ch in chunk:
+            if self.done:
+                break
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self.raw.append(ch)
+                continue
+            self.raw.append(ch)
+
+            if self._in_string:
+                self._buf.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._expect == "key" and self._depth == 0:
+                        self._key = json.loads("".join(self._buf))
+                        self._buf = []
+                        self._expect = "colon"
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._buf.append(ch)
+            elif self._expect == "colon":
+                if ch == ":":
+                    self._expect = "value"
+            elif self._expect == "key":
+                if ch == "}":
+                    self.done = True
+            elif ch in "{[":
+                self._depth += 1
+                self._buf.append(ch)
+            elif ch in "}]" and self._depth > 0:
+                self._depth -= 1
+                self._buf.append(ch)
+            elif self._depth == 0 and ch in ",}":
+                key = self._close_value()
+                if key is not None:
+                    completed.append(key)
+                if ch == "}":
+                    self.done = True
+            else:
+                self._buf.append(ch)
+        return completed
+
+    def _close_value(self) -> Optional[str]:
+        text = "".join(self._buf).strip()
+        key, self._key = self._key, None
+        self._buf = []
+        self._expect = "key"
+        if key is None or not text:
+            return None
+        try:
+            self.fields[key] = json.loads(text)
+        except ValueError:
+            return None
+        return key
+
+    @property
+    def value(self) -> Optional[Dict[str, Any]]:
+        """对象完整闭合后返回整个对象，否则为 None"""
+        if not self.done:
+            return None
+        return json.loads("".join(self.raw))
@@ -1,7 +1,9 @@
 import os
 import json
+import asyncio
+import threading
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Tuple
 from .schema import TaskContext, MessageRole
 
 class MirrorMemory:
@@ -72,6 +74,7 @@ class KnowledgeStore:
     def __init__(self, filename: str = "logs/knowledge.json"):
         self.filename = filename
         os.makedirs(os.path.dirname(filename), exist_ok=True)
+        self._lock = threading.RLock() # EpisodicFactSink 会在工作线程中批量提交
         self.data = self._load()
 
     def _load(self) -> dict:
@@ -113,18 +116,16 @@ class KnowledgeStore:
         }
 
     def _save(self):
-        self.data["last_updated"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        with open(self.filename, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
-            f.flush()
-            os.fsync(f.fileno())
-            # print(f"[知识层] 影子事实已同步至持久化存储。")
+        with self._lock:
+            self.data["last_updated"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            with open(self.filename, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+                # print(f"[知识层] 影子事实已同步至持久化存储。")
 
-    def add_fact(self, category: str, content: str, source_task: str, layer: str = "episodic"):
-        """
-        记录一个新事实。
-        layer: [episodic, conceptual, semantic, preference]
-        """
+    def _insert_fact(self, category: str, content: str, source_task: str, layer: str) -> bool:
+        """去重后插入单条事实，返回是否真正插入 (不落盘)"""
         if layer not in self.data:
             layer = "episodic"
 
@@ -136,9 +137,9 @@ class KnowledgeStore:
                     last_time = datetime.strptime(fact["timestamp"], '%Y-%m-%d %H:%M:%S')
                     # 对相同内容的事实，300秒内不重复记录（除非是关键状态变更）
                     if (datetime.now() - last_time).total_seconds() < 300:
-                        return
+                        return False
                 except:
-                    return
+                    return False
 
         # 2. 插入新事实 (Insertion)
         self.data[layer].append({
@@ -147,9 +148,34 @@ class KnowledgeStore:
             "source": source_task,
             "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         })
-        self._save()
-        # 3. 自动维护 (Auto-Maintenance)
-        self.prune_facts()
+        return True
+
+    def add_fact(self, category: str, content: str, source_task: str, layer: str = "episodic"):
+        """
+        记录一个新事实。
+        layer: [episodic, conceptual, semantic, preference]
+        """
+        with self._lock:
+            if not self._insert_fact(category, content, source_task, layer):
+                return
+            self._save()
+            # 3. 自动维护 (Auto-Maintenance)
+            self.prune_facts()
+
+    def add_facts(self, facts: List[dict]) -> int:
+        """
+        批量记录事实，整批只落盘一次 (Group commit)。
+        facts: [{"category", "content", "source", "layer"}]，返回实际插入条数。
+        """
+        with self._lock:
+            inserted = 0
+            for fact in facts:
+                if self._insert_fact(fact["category"], fact["content"], fact.get("source", ""), fact.get("layer", "episodic")):
+                    inserted += 1
+            if inserted:
+                self._save()
+                self.prune_facts()
+            return inserted
 
     def query_facts(self, keyword: str, layer: str = None) -> List[dict]:
         """
@@ -180,22 +206,90 @@ class KnowledgeStore:
         - Conceptual/Semantic: 容量管理
         禁止将修剪逻辑通用化，不同层级的生命周期截然不同。
         """
-        # 1. 情境决策：代谢超过 24 小时的记录 (Episodic Pruning)
-        cutoff = 86400 # 24 小时
-        now = datetime.now()
-        
-        original_len = len(self.data["episodic"])
-        self.data["episodic"] = [
-            f for f in self.data["episodic"]
-            if (now - datetime.strptime(f["timestamp"], '%Y-%m-%d %H:%M:%S')).total_seconds() < cutoff
-        ]
-        
-        # 2. 容量限制 (Capacity Pruning)
-        for lyr in ["conceptual", "semantic", "preference"]:
-            max_size = 500 if lyr == "conceptual" else 200
-            if len(self.data[lyr]) > max_size:
-                self.data[lyr] = self.data[lyr][-max_size:]
+        with self._lock:
+            # 1. 情境决策：代谢超过 24 小时的记录 (Episodic Pruning)
+            cutoff = 86400 # 24 小时
+            now = datetime.now()
+            
+            original_len = len(self.data["episodic"])
+            self.data["episodic"] = [
+                f for f in self.data["episodic"]
+                if (now - datetime.strptime(f["timestamp"], '%Y-%m-%d %H:%M:%S')).total_seconds() < cutoff
+            ]
+            
+            # 2. 容量限制 (Capacity Pruning)
+            for lyr in ["conceptual", "semantic", "preference"]:
+                max_size = 500 if lyr == "conceptual" else 200
+                if len(self.data[lyr]) > max_size:
+                    self.data[lyr] = self.data[lyr][-max_size:]
 
-        if len(self.data["episodic"]) != original_len:
-            self._save()
+            if len(self.data["episodic"]) != original_len:
+                self._save()
 
+
+class EpisodicFactSink:
+    """
+    异步情境事实写入器 (Batched async fact sink)
+    感知事件产生的事实先在内存窗口中合并 (相同内容只保留一条)，
+    窗口结束或批次写满后在工作线程中一次性提交，避免每个传感器事件都重写一次 knowledge.json。
+    """
+    def __init__(self, store: KnowledgeStore, window: float = 2.0, max_batch: int = 64):
+        self.store = store
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[Tuple[str, str, str], dict] = {}
+        self._batch_full = asyncio.Event()
+        self._task = None
+        self._closing = False
+        self.stats = {"submitted": 0, "coalesced": 0, "commits": 0, "facts_written": 0}
+
+    def submit(self, category: str, content: str, source_task: str, layer: str = "episodic"):
+        """登记一条事实 (非阻塞)，必须在事件循环中调用"""
+        self.stats["submitted"] += 1
+        key = (layer, category, content)
+        if key in self._pending:
+            self.stats["coalesced"] += 1
+            return
+        self._pending[key] = {"category": category, "content": content, "source": source_task, "layer": layer}
+        if len(self._pending) >= self.max_batch:
+            self._batch_full.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            while self._pending:
+                if not self._closing:
+                    try:
+                        await asyncio.wait_for(self._batch_full.wait(), timeout=self.window)
+                    except asyncio.TimeoutError:
+                        pass
+                await self.flush()
+        finally:
+            self._task = None
+
+    async def flush(self):
+        """立即提交当前窗口内的全部事实"""
+        self._batch_full.clear()
+        if not self._pending:
+            return
+        batch = list(self._pending.values())
+        self._pending = {}
+        try:
+            written = await asyncio.to_thread(self.store.add_facts, batch)
+            self.stats["commits"] += 1
+            self.stats["facts_written"] += written
+        except Exception as e:
+            print(f"[知识层] 批量事实提交失败 ({len(batch)} 条): {e}")
+
+    async def aclose(self):
+        """
+        停止后台提交并冲刷剩余事实。
+        不取消后台任务：取消无法中止已在工作线程中进行的提交，只会让 aclose 提前返回并丢失统计；
+        改为置停止标志、唤醒后台任务并等待其把剩余批次写完。
+        """
+        self._closing = True
+        self._batch_full.set()
+        if self._task:
+            await self._task
+        await self.flush()
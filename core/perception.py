@@ -4,6 +4,11 @@ import json
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from .schema import Message, MessageRole, TaskStatus
+from .ratelimit import BucketTable
+from .memory import EpisodicFactSink
+
+# 反射规则默认限流：每 5 秒 1 次 (规则 JSON 中可用 "rate_limit": {"tokens": N, "period": S} 覆盖)
+DEFAULT_REFLEX_RATE_LIMIT = {"tokens": 1, "period": 5.0}
 
 class PerceptionEvent:
     """单个感知事件 (A single perception unit)"""
@@ -22,8 +27,10 @@ class PerceptionBus:
         self.dispatcher = dispatcher
         # 瞬时环形缓冲区 (Transient Buffer): 只保留最近 50 条原始感知记录
         self.transient_log = collections.deque(maxlen=50)
-        self.suggestion_cooldown = {} # {(rule_id, msg): last_time}
+        self.reflex_buckets = BucketTable() # {rule_id: TokenBucket}，回满后自动过期
         self.running = False
+        self.recorder = None # 可选的事件录制器 (PerceptionRecorder)
+        self.fact_sink = EpisodicFactSink(dispatcher.knowledge) # 感知事实批量异步落盘
         
         # --- 聚合机制 (Aggregation State) ---
         self._visual_buffer = []
@@ -45,7 +52,8 @@ class PerceptionBus:
                 "pattern": "磁盘空间告急",
                 "target_skill": "memory_cleaner",
                 "template": "检测到磁盘空间紧缺 ({data})，建议启动自动清理流程。",
-                "params": {"days": 7}
+                "params": {"days": 7},
+                "rate_limit": {"tokens": 1, "period": 600.0}
             },
             {
                 "id": "code_refactor_suggest",
@@ -75,8 +83,28 @@ class PerceptionBus:
                 except: continue
         except: pass
 
+    def start_recording(self, path: str):
+        """开启事件录制，供 core.perception_replay 回放"""
+        from .perception_replay import PerceptionRecorder
+        self.stop_recording()
+        self.recorder = PerceptionRecorder(path)
+        print(f"[感知总线] 事件录制已开启: {path}")
+
+    def stop_recording(self):
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    async def aclose(self):
+        """关闭总线：冲刷待写事实并停止录制"""
+        await self.fact_sink.aclose()
+        self.stop_recording()
+
     async def emit(self, source: str, data: Any, importance: float = 0.5):
         """向总头发射感知信号"""
+        if self.recorder:
+            self.recorder.record("emit", source, data, importance)
+
         if source == "visual":
             async with self._visual_lock:
                 self._visual_buffer.append({"data": data, "importance": importance, "time": datetime.now()})
@@ -122,11 +150,13 @@ class PerceptionBus:
 
     async def _process_event(self, event: PerceptionEvent):
         """核心处理链路"""
+        if self.recorder:
+            self.recorder.record("event", event.source, event.content, event.importance)
         self.transient_log.append(event)
         
-        # 1. 记忆固化
+        # 1. 记忆固化 (经由批量 sink，同一窗口内的相同事实只写一次)
         if event.importance > 0.7:
-            self.dispatcher.knowledge.add_fact(
+            self.fact_sink.submit(
                 "Perception", 
                 f"[{event.source.upper()}] {str(event.content)}", 
                 "PerceptionBus", 
@@ -139,7 +169,7 @@ class PerceptionBus:
     async def _check_reflexes(self, event: PerceptionEvent):
         """遍历反射逻辑组"""
         trigger_msg = str(event.content)
-        import time, uuid
+        import uuid
         from .schema import TaskContext, Message, MessageRole, TaskStatus
         from prompt_toolkit import print_formatted_text, HTML
         import sys
@@ -149,15 +179,17 @@ class PerceptionBus:
             if event.source != rule["source"]: continue
             if rule["pattern"].lower() not in trigger_msg.lower(): continue
 
-            # 冷却与防抖
-            cooldown_key = f"reflex_{rule['id']}"
-            if time.time() - self.suggestion_cooldown.get(cooldown_key, 0) < 5: continue
-            
             # 避免多重建议 (自律通道拥有完全并发权)
             if not rule.get("is_auto_run"):
-                if any(tid.startswith("reflex_") for tid in self.dispatcher.active_tasks): return
+                if self.dispatcher.pending_suggestion_count: return
+
+            # 规则级令牌桶限流 (Per-rule token bucket)
+            limit = rule.get("rate_limit") or DEFAULT_REFLEX_RATE_LIMIT
+            if not self.reflex_buckets.try_acquire(
+                rule["id"], limit.get("tokens", 1), limit.get("period", DEFAULT_REFLEX_RATE_LIMIT["period"])
+            ):
+                continue
 
-            self.suggestion_cooldown[cooldown_key] = time.time()
             suggestion_msg = rule["template"].format(data=trigger_msg)
             
             context = TaskContext(
@@ -174,10 +206,11 @@ class PerceptionBus:
 
             if rule.get("is_auto_run"):
                 print_formatted_text(HTML(f"\n<ansigreen>⚡ [自律快速通道] 逻辑命中: '{rule['id']}' 正在自动执行...</ansigreen>"))
-                self.dispatcher.active_tasks[context.task_id] = context
-                asyncio.create_task(self.dispatcher.execute_task(context))
+                self.dispatcher.track_task(context)
+                task = asyncio.create_task(self.dispatcher.execute_task(context))
+                task.add_done_callback(lambda _, tid=context.task_id: self.dispatcher.release_task(tid))
             else:
-                self.dispatcher.active_tasks[context.task_id] = context
+                self.dispatcher.track_task(context)
                 print_formatted_text(HTML(f"\n<ansiyellow>⚡ [反射中枢]: {suggestion_msg} [y/n]</ansiyellow>"))
             
             sys.stdout.flush()
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .ratelimit import BucketTable
+
+RECORD_VERSION = 1
+
+
+class PerceptionRecorder:
+    """
+    感知事件录制器 (Perception Event Recorder)
+    以 JSONL 形式追加记录总线上的每个事件，时间轴使用单调时钟，便于确定性回放。
+    - stage = "emit": emit() 收到的原始信号 (聚合前)
+    - stage = "event": 进入 _process_event 的事件 (聚合后)
+    """
+    def __init__(self, path: str):
+        self.path = path
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._t0 = time.monotonic()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self.count = 0
+        self._write({"version": RECORD_VERSION, "started": datetime.now().isoformat()})
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+
+    def record(self, stage: str, source: str, content: Any, importance: float):
+        if self._file.closed:
+            return
+        self._write({
+            "t": round(time.monotonic() - self._t0, 6),
+            "stage": stage,
+            "source": source,
+            "content": content,
+            "importance": importance,
+        })
+        self.count += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def load_recording(path: str, stage: Optional[str] = None) -> List[Dict[str, Any]]:
+    """读取录制文件，返回事件列表 (可按 stage 过滤)。多段录制会被首尾相接到同一时间轴上。"""
+    events = []
+    offset = last_t = 0.0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 进程被强杀时最后一行可能不完整
+            if "stage" not in record:
+                offset = last_t  # 新一段录制的文件头
+                continue
+            record["t"] = last_t = record["t"] + offset
+            if stage and record["stage"] != stage:
+                continue
+            events.append(record)
+    return events
+
+
+class _ReplayDispatcher:
+    """
+    回放期间替换总线上的调度器 (Dispatcher stand-in used during replay)
+    - 反射建议一律自动拒绝 (只计数，不登记为未决建议)，否则第一条建议之后总线会因
+      pending_suggestion_count 非零而跳过全部后续建议，无法复现反射风暴
+    - dry_run=True 时自动执行的反射只计数不真正执行技能
+    其余属性透传给真实调度器。
+    """
+    def __init__(self, dispatcher, dry_run: bool, reflexes: Dict[str, Any]):
+        self._dispatcher = dispatcher
+        self._dry_run = dry_run
+        self._reflexes = reflexes
+
+    def __getattr__(self, name):
+        return getattr(self._dispatcher, name)
+
+    @staticmethod
+    def _count(bucket: Dict[str, int], context):
+        skill_id = (context.metadata.get("intent") or {}).get("target_skill_id") or "unknown"
+        bucket[skill_id] = bucket.get(skill_id, 0) + 1
+
+    @property
+    def pending_suggestion_count(self) -> int:
+        return 0
+
+    def track_task(self, context):
+        if context.metadata.get("is_suggestion"):
+            self._count(self._reflexes["suggested"], context)
+            return
+        self._dispatcher.track_task(context)
+
+    async def execute_task(self, context):
+        self._count(self._reflexes["auto_run"], context)
+        if not self._dry_run:
+            return await self._dispatcher.execute_task(context)
+        from .schema import Message, MessageRole, TaskStatus
+        context.messages.append(Message(role=MessageRole.SYSTEM, content="[回放] dry-run 模式，已跳过技能执行。"))
+        context.status = TaskStatus.COMPLETED
+        return context
+
+
+class PerceptionReplayer:
+    """
+    确定性回放驱动器 (Deterministic Replay Driver)
+    将录制文件重新注入感知总线：
+    - stage="event": 直接送入 _process_event，复现反射匹配与记忆写入
+    - stage="emit": 送入 emit()，连同视觉聚合逻辑一起复现
+    speed=1.0 按原始节奏回放，speed<=0 则尽可能快地回放 (用于基准测试)。
+    回放期间反射建议自动拒绝；dry_run=True (默认) 时自动执行的反射不真正执行技能，
+    两者都按目标技能计入结果中的 reflexes 统计。
+    反射限流桶在回放期间改由录制时间轴驱动，限流结果与回放倍速无关。
+    """
+    def __init__(self, bus, dry_run: bool = True):
+        self.bus = bus
+        self.dry_run = dry_run
+        self._replay_now = 0.0  # 当前回放到的录制时刻 (秒)
+
+    async def replay(self, path: str, speed: float = 1.0, stage: str = "event") -> Dict[str, Any]:
+        events = load_recording(path, stage=stage)
+        durations = []
+        reflexes = {"suggested": {}, "auto_run": {}}
+        dispatcher = self.bus.dispatcher
+        buckets = self.bus.reflex_buckets
+        self._replay_now = events[0]["t"] if events else 0.0
+        self.bus.dispatcher = _ReplayDispatcher(dispatcher, self.dry_run, reflexes)
+        self.bus.reflex_buckets = BucketTable(clock=lambda: self._replay_now)
+        try:
+            start = time.monotonic()
+            await self._feed(events, speed, stage, durations)
+            wall = time.monotonic() - start
+            # 尾部视觉聚合窗口结束后的事件也须在替身调度器下处理
+            flush = self.bus._visual_flush_task
+            if flush is not None:
+                await flush
+        finally:
+            self.bus.dispatcher = dispatcher
+            self.bus.reflex_buckets = buckets
+
+        durations.sort()
+        return {
+            "events": len(events),
+            "stage": stage,
+            "dry_run": self.dry_run,
+            "reflexes": reflexes,
+            "wall_seconds": round(wall, 3),
+            "events_per_second": round(len(events) / wall, 1) if wall > 0 else None,
+            "avg_ms": round(sum(durations) / len(durations) * 1000, 3) if durations else 0.0,
+            "p95_ms": round(durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000, 3) if durations else 0.0,
+            "max_ms": round(durations[-1] * 1000, 3) if durations else 0.0,
+        }
+
+    async def _feed(self, events: List[Dict[str, Any]], speed: float, stage: str, durations: List[float]):
+        from .perception import PerceptionEvent
+
+        start = time.monotonic()
+        base_t = events[0]["t"] if events else 0.0
+        for record in events:
+            if speed > 0:
+                due = start + (record["t"] - base_t) / speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            self._replay_now = record["t"]
+            t = time.perf_counter()
+            if stage == "emit":
+                await self.bus.emit(record["source"], record["content"], record["importance"])
+            else:
+                await self.bus._process_event(
+                    PerceptionEvent(record["source"], record["content"], record["importance"])
+                )
+            durations.append(time.perf_counter() - t)
+
+
+async def _main(argv=None):
+    import argparse
+    import tempfile
+    from .audit import RuleBasedAuditor
+    from .dispatcher import Dispatcher
+    from .memory import KnowledgeStore
+    from .providers.antigravity import AntigravityBrainProvider
+
+    parser = argparse.ArgumentParser(description="Replay a recorded JANUS perception trace.")
+    parser.add_argument("recording", help="由 JANUS_PERCEPTION_RECORD 生成的 JSONL 录制文件")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，<=0 表示全速")
+    parser.add_argument("--stage", choices=["event", "emit"], default="event")
+    parser.add_argument("--knowledge", default=None, help="回放使用的知识库文件 (默认使用临时文件，避免污染真实记忆)")
+    parser.add_argument("--live", action="store_true", help="真正执行自动运行的反射技能 (默认 dry-run 只计数)")
+    args = parser.parse_args(argv)
+
+    knowledge_path = args.knowledge or os.path.join(tempfile.mkdtemp(prefix="janus_replay_"), "knowledge.json")
+    dispatcher = Dispatcher(
+        provider=AntigravityBrainProvider(),
+        auditor=RuleBasedAuditor(),
+        knowledge=KnowledgeStore(knowledge_path),
+    )
+    replayer = PerceptionReplayer(dispatcher.perception, dry_run=not args.live)
+    stats = await replayer.replay(args.recording, speed=args.speed, stage=args.stage)
+    await dispatcher.perception.aclose()
+    stats["fact_sink"] = dispatcher.perception.fact_sink.stats
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
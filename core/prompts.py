@@ -0,0 +1,169 @@
+import hashlib
+import textwrap
+from typing import Any, Dict, List, Optional
+from .skill_retriever import estimate_tokens
+
+
+class _PromptStats:
+    __slots__ = ("calls", "static_tokens", "dynamic_tokens", "server_reports", "server_prompt_tokens", "server_cached_tokens")
+
+    def __init__(self):
+        self.calls = 0
+        self.static_tokens = 0
+        self.dynamic_tokens = 0
+        self.server_reports = 0
+        self.server_prompt_tokens = 0
+        self.server_cached_tokens = 0
+
+    def as_dict(self) -> dict:
+        total = self.static_tokens + self.dynamic_tokens
+        stats = {
+            "calls": self.calls,
+            "avg_prompt_tokens": round(total / self.calls, 1) if self.calls else 0.0,
+            "static_share": round(self.static_tokens / total, 3) if total else 0.0,
+        }
+        if self.server_reports:
+            # 服务端上报的前缀缓存命中 (usage.prompt_tokens_details.cached_tokens 或 DeepSeek 的 prompt_cache_hit_tokens)
+            stats["server_reports"] = self.server_reports
+            stats["cache_hit_rate"] = round(self.server_cached_tokens / self.server_prompt_tokens, 3) \
+                if self.server_prompt_tokens else 0.0
+        return stats
+
+
+class PromptTemplate:
+    """
+    预编译提示词模板 (Precompiled prompt template)
+    - static: 不含任何动态数据的系统提示词，导入时生成一次，每次调用逐字节相同，始终作为第一条消息，
+              便于服务端前缀缓存 (prefix cache) 命中
+    - context: 动态段 (感知快照、技能清单、执行参数等) 的 str.format 模板，放在静态前缀之后
+    render() 返回 OpenAI 格式的消息列表，并按模板名记录提示词规模。
+    """
+    def __init__(self, name: str, static: str, context: str, context_role: str = "system"):
+        self.name = name
+        self.static = textwrap.dedent(static).strip()
+        self.context = textwrap.dedent(context).strip()
+        self.context_role = context_role
+        self.static_tokens = estimate_tokens(self.static)
+        self.prefix_hash = hashlib.sha1(self.static.encode("utf-8")).hexdigest()[:12]
+        _templates[self.static] = self
+
+    def render(self, user: Optional[str] = None, **fields: Any) -> List[Dict[str, str]]:
+        """静态前缀 -> 动态上下文 -> 用户输入"""
+        context = self.context.format(**fields)
+        messages = [{"role": "system", "content": self.static}, {"role": self.context_role, "content": context}]
+        if user is not None:
+            messages.append({"role": "user", "content": user})
+        stats = _stats.setdefault(self.name, _PromptStats())
+        stats.calls += 1
+        stats.static_tokens += self.static_tokens
+        stats.dynamic_tokens += estimate_tokens(context) + (estimate_tokens(user) if user else 0)
+        return messages
+
+    @staticmethod
+    def prompt_tokens(messages: List[Dict[str, str]]) -> int:
+        return sum(estimate_tokens(m["content"]) for m in messages)
+
+
+_templates: Dict[str, PromptTemplate] = {}
+_stats: Dict[str, _PromptStats] = {}
+
+
+def record_usage(messages: List[Dict[str, str]], usage: Any):
+    """
+    按首条消息识别调用类型，记录服务端返回的 usage 中的前缀缓存命中量。
+    不是由模板渲染的消息 (如普通对话) 直接忽略。
+    """
+    if not messages or usage is None:
+        return
+    template = _templates.get(messages[0].get("content"))
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    if template is None or not prompt_tokens:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None)
+    if cached is None:
+        cached = getattr(usage, "prompt_cache_hit_tokens", None)
+    if cached is None:
+        return
+    stats = _stats.setdefault(template.name, _PromptStats())
+    stats.server_reports += 1
+    stats.server_prompt_tokens += prompt_tokens
+    stats.server_cached_tokens += cached
+
+
+def prompt_report() -> Dict[str, dict]:
+    """各调用类型的提示词规模与缓存命中报告"""
+    report = {}
+    for template in _templates.values():
+        stats = _stats.get(template.name, _PromptStats()).as_dict()
+        report[template.name] = {"prefix_hash": template.prefix_hash, "static_tokens": template.static_tokens, **stats}
+    return report
+
+
+# 字段顺序即输出顺序：target_skill_id / parameters 放在最前，流式解析时最先闭合
+INTENT_PROMPT = PromptTemplate(
+    "intent",
+    static="""
+    你现在是 JANUS Hub 的中枢调度员。
+    你的任务是根据用户的输入，判断是否需要调用特定的技能库，并提取参数。
+    可用技能清单与当前环境感知快照在下一条系统消息中给出。
+
+    ## 响应格式要求:
+    你必须仅返回一个有效的 JSON 对象，并按以下顺序输出字段：
+    - target_skill_id: 匹配的技能 ID，如果不匹配任何技能则为 null
+    - parameters: 提取出的技能参数字典
+    - confidence: 信心评分 (0.0 - 1.0)
+    - raw_query: 原始查询
+    - thought_process: 简短的调度逻辑思考
+
+    示例：
+    {
+      "target_skill_id": "list_files",
+      "parameters": {"pattern": "*分享*"},
+      "confidence": 0.95,
+      "raw_query": "列出数据目录下的文件",
+      "thought_process": "用户希望浏览文件，匹配 list_files 技能。"
+    }
+    """,
+    # 技能清单比感知快照更稳定，放在前面让可复用的前缀尽量长
+    context="""
+    ## 可用技能清单:
+    {manifest}
+
+    ## 当前环境感知快照 (Context):
+    {perception_snapshot}
+    """,
+)
+
+AUDIT_PROMPT = PromptTemplate(
+    "audit",
+    static="""
+    你现在是 JANUS Hub 的首席安全审计官 (CISO)。
+    你的任务是审查即将执行的技能调用，判断其是否存在安全风险、隐私泄露或毁灭性倾向。
+    执行详情在用户消息中给出。
+
+    ## 审计准则:
+    1. 严禁未经授权的文件删除、格式化操作。
+    2. 严禁越权访问系统核心配置文件。
+    3. 对大批量的数据导出或列表操作需给出 WARN（警告）。
+    4. 对常规、无害的查询给出 PASS。
+
+    ## 响应格式要求:
+    必须返回一个 JSON 对象：
+    - status: "pass", "warn", 或 "fail"
+    - rationale: 详细的理由
+    - risk_level: 0-10 风险等级
+
+    示例：
+    {"status": "fail", "rationale": "试图删除受保护的数据目录", "risk_level": 10}
+    """,
+    context="""
+    ## 执行详情:
+    - 目标技能: {skill_id}
+    - 执行参数: {parameters}
+    - 原始意图: {raw_query}
+
+    请进行安全评估。
+    """,
+    context_role="user",
+)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import AsyncIterator, List
 from .schema import Message, Intent, AgentSkill
 
 class BaseProvider(ABC):
@@ -7,12 +7,22 @@ class BaseProvider(ABC):
     Abstract base class for LLM providers (LLM 供给侧抽象基类)
     Allows JANUS to switch between Cloud APIs, Local models, or Proxies.
     """
+    # 为 True 时 resolve_intent 接受 on_skill_hint 回调：流式解析出 target_skill_id / parameters 时
+    # 立即回调，调度器据此提前预热技能、启动审计 (Time-to-first-action)
+    streams_intent = False
     
     @abstractmethod
     async def chat(self, messages: List[Message]) -> str:
         """Standard chat interface"""
         pass
 
+    async def chat_stream(self, messages: List[Message]) -> AsyncIterator[str]:
+        """
+        Streaming chat interface (流式对话)：逐段产出回复文本。
+        默认实现一次性产出 chat() 的完整结果，不支持流式的 provider 无需覆盖。
+        """
+        yield await self.chat(messages)
+
     @abstractmethod
     async def resolve_intent(self, query: str, skills: List[AgentSkill], perception_snapshot: str = "") -> Intent:
         """
@@ -21,3 +31,43 @@ class BaseProvider(ABC):
         """
         pass
 
+
+class ProviderWrapper(BaseProvider):
+    """
+    Provider 装饰层基类 (Decorator over another provider)
+    未覆盖的属性 / 方法全部委托给内层 provider，便于多层叠加 (缓存、限流、路由……)。
+    """
+    def __init__(self, inner: BaseProvider):
+        self.inner = inner
+
+    def __getattr__(self, name):
+        # 仅在自身找不到属性时触发
+        inner = self.__dict__.get("inner")
+        if inner is None:
+            raise AttributeError(name)
+        return getattr(inner, name)
+
+    @property
+    def streams_intent(self) -> bool:
+        return getattr(self.inner, "streams_intent", False)
+
+    async def chat(self, messages: List[Message]) -> str:
+        return await self.inner.chat(messages)
+
+    async def chat_stream(self, messages: List[Message]) -> AsyncIterator[str]:
+        async for chunk in self.inner.chat_stream(messages):
+            yield chunk
+
+    async def resolve_intent(self, query: str, skills: List[AgentSkill], perception_snapshot: str = "", **kwargs) -> Intent:
+        return await self.inner.resolve_intent(query, skills, perception_snapshot=perception_snapshot, **kwargs)
+
+    def own_stats(self) -> dict:
+        return {}
+
+    def stats(self) -> dict:
+        """本层统计，并附带内层 provider 的统计 (若有)"""
+        stats = {type(self).__name__: self.own_stats()}
+        inner_stats = getattr(self.inner, "stats", None)
+        if callable(inner_stats):
+            stats.update(inner_stats())
+        return stats
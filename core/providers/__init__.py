@@ -1,3 +1,6 @@
 from .openai import OpenAIProvider
+from .intent_cache import CachingProvider
+from .middleware import LimitedProvider
+from .router import RoutingProvider
 
-__all__ = ["OpenAIProvider"]
+__all__ = ["OpenAIProvider", "CachingProvider", "LimitedProvider", "RoutingProvider"]
@@ -0,0 +1,165 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from ..schema import AgentSkill, Intent
+from ..provider import BaseProvider, ProviderWrapper
+from ..text import normalize_query
+
+CACHE_VERSION = 1
+
+# 不缓存的意图：异步脑桥求援 (每次都应真正转交) 与未匹配任何技能的空意图
+_UNCACHEABLE_SKILLS = {"brain_rescue"}
+
+_SNAPSHOT_TIME = re.compile(r"\b\d{2}:\d{2}:\d{2}\b")
+
+
+def skills_fingerprint(skills: List[AgentSkill]) -> str:
+    """技能清单指纹：增删技能或修改描述 / schema 后旧缓存自动失效"""
+    manifest = sorted((s.model_dump() for s in skills), key=lambda s: s["id"])
+    return hashlib.sha1(json.dumps(manifest, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def snapshot_digest(snapshot: str) -> str:
+    """感知快照摘要 (去掉时间戳，只保留事件内容)"""
+    return hashlib.sha1(_SNAPSHOT_TIME.sub("", snapshot or "").encode("utf-8")).hexdigest()[:12]
+
+
+class CachingProvider(ProviderWrapper):
+    """
+    意图解析缓存 (Intent Resolution Cache)
+    key = 归一化查询 + 技能清单指纹 (+ 可选的感知快照摘要)。
+    - LRU 淘汰 (max_entries) + TTL 过期
+    - 持久化到 path (JSON)，重启后仍然有效；写入合并为每 save_delay 秒最多一次
+    - 只缓存匹配到技能且 confidence >= min_confidence 的意图；brain_rescue 与空意图不缓存
+    缓存命中的意图与实时解析的意图走完全相同的审计流程。
+    """
+    def __init__(self, inner: BaseProvider, path: Optional[str] = os.path.join("logs", "intent_cache.json"),
+                 max_entries: int = 512, ttl: float = 24 * 3600, include_snapshot: bool = False,
+                 min_confidence: float = 0.5, save_delay: float = 1.0):
+        super().__init__(inner)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.include_snapshot = include_snapshot
+        self.min_confidence = min_confidence
+        self.save_delay = save_delay
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._save_task = None
+        self.counters = {"lookups": 0, "hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0, "skipped": 0}
+        self._load()
+
+    # --- 持久化 ---
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != CACHE_VERSION:
+            return
+        now = time.time()
+        for key, entry in data.get("entries", []):
+            if now - entry.get("stored_at", 0) < self.ttl:
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def save(self):
+        """同步落盘 (原子替换)"""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        payload = {"version": CACHE_VERSION, "entries": list(self._entries.items())}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"), default=str)
+        os.replace(tmp, self.path)
+
+    def _schedule_save(self):
+        if not self.path or (self._save_task and not self._save_task.done()):
+            return
+        self._save_task = asyncio.create_task(self._deferred_save())
+
+    async def _deferred_save(self):
+        await asyncio.sleep(self.save_delay)
+        try:
+            await asyncio.to_thread(self.save)
+        except OSError as e:
+            print(f"[意图缓存] 保存失败: {e}")
+
+    # --- 缓存逻辑 ---
+
+    def make_key(self, query: str, skills: List[AgentSkill], perception_snapshot: str = "") -> str:
+        parts = [normalize_query(query), skills_fingerprint(skills)]
+        if self.include_snapshot:
+            parts.append(snapshot_digest(perception_snapshot))
+        return "|".join(parts)
+
+    def _get(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["stored_at"] >= self.ttl:
+            del self._entries[key]
+            self.counters["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: str, intent: Intent):
+        self._entries[key] = {"intent": intent.model_dump(), "stored_at": time.time(), "hits": 0}
+        self._entries.move_to_end(key)
+        self.counters["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+        self._schedule_save()
+
+    def _cacheable(self, intent: Intent) -> bool:
+        return (
+            intent.target_skill_id is not None
+            and intent.target_skill_id not in _UNCACHEABLE_SKILLS
+            and intent.confidence >= self.min_confidence
+        )
+
+    async def resolve_intent(self, query: str, skills: List[AgentSkill], perception_snapshot: str = "", **kwargs) -> Intent:
+        key = self.make_key(query, skills, perception_snapshot)
+        self.counters["lookups"] += 1
+        entry = self._get(key)
+        if entry is not None:
+            self.counters["hits"] += 1
+            entry["hits"] += 1
+            data = copy.deepcopy(entry["intent"])
+            data["raw_query"] = query
+            data["thought_process"] = f"[意图缓存命中] {data.get('thought_process', '')}"
+            return Intent(**data)
+
+        self.counters["misses"] += 1
+        intent = await self.inner.resolve_intent(query, skills, perception_snapshot=perception_snapshot, **kwargs)
+        if self._cacheable(intent):
+            self._put(key, intent)
+        else:
+            self.counters["skipped"] += 1
+        return intent
+
+    def clear(self):
+        self._entries.clear()
+        self._schedule_save()
+
+    def own_stats(self) -> dict:
+        lookups = self.counters["lookups"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+            "llm_calls_saved": self.counters["hits"],
+        }
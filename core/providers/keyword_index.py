@@ -0,0 +1,164 @@
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from ..schema import AgentSkill
+
+# 打分权重 (与原 Antigravity 快速通道一致)
+KEYWORD_WEIGHT = 10
+KEYWORD_START_WEIGHT = 20   # 关键词位于句首
+ID_EXACT_WEIGHT = 30        # ID 作为独立单词出现
+ID_SUBSTRING_WEIGHT = 5     # ID 仅作为子串出现
+NAME_WEIGHT = 15
+TAG_WEIGHT = 5
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick 多模式匹配自动机
+    构建一次后，对任意文本单遍扫描即可找出所有模式的全部出现位置。
+    """
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(ch, 0)
+                # 合并失配链上的输出，匹配时无需再沿 fail 回溯
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text: str):
+        """产出 (pattern_index, start, end)"""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for idx in self._out[node]:
+                end = i + 1
+                yield idx, end - len(self.patterns[idx]), end
+
+
+class _Entry(NamedTuple):
+    skill: int      # 技能下标
+    kind: str       # keyword | id | name | tag
+
+
+def skill_keywords(skill: AgentSkill) -> List[str]:
+    """技能清单中声明的意图关键词 (AgentSkill.keywords)"""
+    return [k for k in skill.keywords if k]
+
+
+def index_signature(skills: Sequence[AgentSkill]) -> tuple:
+    return tuple((s.id, s.name, tuple(s.tags), tuple(s.keywords)) for s in skills)
+
+
+class SkillKeywordIndex:
+    """
+    技能关键词索引 (Skill keyword index)
+    把所有技能的 keywords / id / name / tags 编译进一个 Aho-Corasick 自动机，
+    每个模式携带 (技能, 类型) 条目；打分时对查询单遍扫描，按类型累加权重：
+    - keyword: 出现 +10，位于句首 +20
+    - id: 作为独立单词出现 +30，否则作为子串出现 +5
+    - name: +15；tag: 每个 +5
+    同一模式在查询中多次出现只计一次 (与逐条 `in` 判断等价)。
+    """
+    def __init__(self, skills: Sequence[AgentSkill], exclude: Iterable[str] = ("brain_rescue",)):
+        excluded = set(exclude)
+        self.source = list(skills)  # 持有引用，保证 identity 快速校验期间对象 id 不被复用
+        self.identity = tuple(map(id, self.source))
+        self.skills = [s for s in skills if s.id not in excluded]
+        self.signature = index_signature(skills)
+        entries: Dict[str, List[_Entry]] = {}
+
+        def add(text: str, idx: int, kind: str):
+            if text:
+                entries.setdefault(text, []).append(_Entry(idx, kind))
+
+        for idx, skill in enumerate(self.skills):
+            for kw in skill_keywords(skill):
+                add(kw.lower(), idx, "keyword")
+            add(skill.id, idx, "id")
+            add(skill.name.lower(), idx, "name")
+            for tag in skill.tags:
+                add(tag.lower(), idx, "tag")
+
+        self._automaton = AhoCorasick(entries.keys())
+        self._entries = [entries[p] for p in self._automaton.patterns]
+
+    def scores(self, q: str) -> List[int]:
+        """返回与 self.skills 对齐的得分列表；q 应已小写并去除首尾空白"""
+        seen: Dict[int, List[bool]] = {}  # pattern -> [出现在句首, 作为独立单词出现]
+        for idx, start, end in self._automaton.iter_matches(q):
+            flags = seen.setdefault(idx, [False, False])
+            if start == 0:
+                flags[0] = True
+            if (start == 0 or q[start - 1] == " ") and (end == len(q) or q[end] == " "):
+                flags[1] = True
+
+        scores = [0] * len(self.skills)
+        for idx, (at_start, bounded) in seen.items():
+            for entry in self._entries[idx]:
+                if entry.kind == "keyword":
+                    scores[entry.skill] += KEYWORD_START_WEIGHT if at_start else KEYWORD_WEIGHT
+                elif entry.kind == "id":
+                    scores[entry.skill] += ID_EXACT_WEIGHT if bounded else ID_SUBSTRING_WEIGHT
+                elif entry.kind == "name":
+                    scores[entry.skill] += NAME_WEIGHT
+                else:
+                    scores[entry.skill] += TAG_WEIGHT
+        return scores
+
+    def best(self, q: str) -> Tuple[Optional[AgentSkill], int, int]:
+        """(最高分技能, 最高分, 次高分)；并列时取注册顺序靠前者"""
+        best_skill, highest, runner_up = None, 0, 0
+        for skill, score in zip(self.skills, self.scores(q)):
+            if score > highest:
+                best_skill, highest, runner_up = skill, score, highest
+            elif score > runner_up:
+                runner_up = score
+        return best_skill, highest, runner_up
+
+
+_cached_index: Optional[SkillKeywordIndex] = None
+
+
+def get_keyword_index(skills: Sequence[AgentSkill]) -> SkillKeywordIndex:
+    """
+    按技能集版本 (id / name / tags / keywords) 缓存索引，技能集不变时直接复用。
+    先比较技能对象身份 (调度器每次传入的是同一批对象)，不同时再比较内容签名。
+    """
+    global _cached_index
+    if _cached_index is not None and _cached_index.identity == tuple(map(id, skills)):
+        return _cached_index
+    if _cached_index is None or _cached_index.signature != index_signature(skills):
+        _cached_index = SkillKeywordIndex(skills)
+    else:
+        _cached_index.source = list(skills)
+        _cached_index.identity = tuple(map(id, _cached_index.source))
+    return _cached_index
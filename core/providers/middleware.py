@@ -0,0 +1,214 @@
+import asyncio
+import copy
+import hashlib
+import json
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from ..schema import AgentSkill, Intent, Message
+from ..provider import BaseProvider, ProviderWrapper
+from ..ratelimit import TokenBucket
+from .intent_cache import skills_fingerprint
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """HTTP 429 (openai.RateLimitError 及其他带 status_code 的兼容网关异常)"""
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """从 429 响应头读取服务端建议的等待秒数"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+class _Flight:
+    """一次进行中的请求及其等待者数量 (全部等待者取消时才取消底层请求)"""
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class LimitedProvider(ProviderWrapper):
+    """
+    Provider 中间件 (Request coalescing + concurrency / rate limiting)
+    - 合并 (Coalescing)：进行中的相同请求 (相同 messages 的 chat、相同查询 + 技能清单 + 快照的意图解析)
+      共享同一次底层调用，后来者只等待结果
+    - 并发上限：信号量限制同时在途的底层请求数，超出的请求排队
+    - 令牌桶限流：rate_tokens 个请求 / rate_period 秒 (None 表示不限)
+    - 429 重试：指数退避 + 抖动，优先遵循 Retry-After；退避期间所有请求一起冷却
+    chat_stream 不做合并，但同样占用并发槽位并受限流约束 (仅在首段输出之前重试)。
+    """
+    def __init__(self, inner: BaseProvider, max_concurrency: int = 4, rate_tokens: Optional[float] = None,
+                 rate_period: float = 60.0, max_retries: int = 3, backoff_base: float = 1.0,
+                 backoff_max: float = 30.0, coalesce: bool = True):
+        super().__init__(inner)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.coalesce = coalesce
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_tokens, rate_period) if rate_tokens else None
+        self._flights: Dict[str, _Flight] = {}
+        self._cooldown_until = 0.0
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_in_flight = 0
+        self.counters = {"calls": 0, "coalesced": 0, "retries": 0, "rate_limited": 0, "failures": 0}
+        self._queue_waits = 0
+        self._queue_wait_total = 0.0
+        self.max_queue_wait = 0.0
+        self.throttle_wait_total = 0.0
+
+    # --- 基础设施 ---
+
+    @asynccontextmanager
+    async def _slot(self):
+        """获取并发槽位，记录排队时长与在途数"""
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        wait = time.perf_counter() - queued
+        self._queue_waits += 1
+        self._queue_wait_total += wait
+        self.max_queue_wait = max(self.max_queue_wait, wait)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def _throttle(self):
+        """等待 429 冷却结束并从令牌桶取得令牌"""
+        started = time.monotonic()
+        while True:
+            delay = self._cooldown_until - time.monotonic()
+            if delay <= 0 and (self._bucket is None or self._bucket.try_acquire()):
+                break
+            if delay <= 0:
+                delay = self._bucket.wait_time()
+            await asyncio.sleep(delay)
+        self.throttle_wait_total += time.monotonic() - started
+
+    async def _backoff(self, error: Exception, attempt: int):
+        """可重试的 429 则退避后返回，否则原样抛出"""
+        if not is_rate_limited(error) or attempt >= self.max_retries:
+            self.counters["failures"] += 1
+            raise error
+        self.counters["rate_limited"] += 1
+        self.counters["retries"] += 1
+        delay = _retry_after(error)
+        if delay is None:
+            delay = min(self.backoff_base * 2 ** attempt, self.backoff_max) * (0.5 + random.random() / 2)
+        self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+        print(f"[限流] LLM 接口返回 429，{delay:.1f}s 后重试 ({attempt + 1}/{self.max_retries})。")
+        await asyncio.sleep(delay)
+
+    async def _call(self, factory: Callable[[], Awaitable]):
+        async with self._slot():
+            attempt = 0
+            while True:
+                await self._throttle()
+                self.counters["calls"] += 1
+                try:
+                    return await factory()
+                except Exception as e:
+                    await self._backoff(e, attempt)
+                    attempt += 1
+
+    async def _coalesced(self, key: Optional[str], factory: Callable[[], Awaitable]):
+        if not self.coalesce or key is None:
+            return await self._call(factory)
+        flight = self._flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight(asyncio.ensure_future(self._call(factory)))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda t, k=key: self._flights.pop(k, None) if self._flights.get(k) is flight else None)
+        else:
+            self.counters["coalesced"] += 1
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        flight.waiters -= 1
+        # 后来者拿到独立副本，避免多个任务共享同一可变对象
+        return result if leader else copy.deepcopy(result)
+
+    # --- Provider 接口 ---
+
+    async def chat(self, messages: List[Message]) -> str:
+        payload = json.dumps([(m.role, m.content) for m in messages], ensure_ascii=False, default=str)
+        key = "chat:" + hashlib.sha1(payload.encode("utf-8")).hexdigest()
+        return await self._coalesced(key, lambda: self.inner.chat(messages))
+
+    async def chat_stream(self, messages: List[Message]) -> AsyncIterator[str]:
+        async with self._slot():
+            attempt = 0
+            while True:
+                await self._throttle()
+                self.counters["calls"] += 1
+                started = False
+                try:
+                    async for chunk in self.inner.chat_stream(messages):
+                        started = True
+                        yield chunk
+                    return
+                except Exception as e:
+                    if started:
+                        self.counters["failures"] += 1
+                        raise
+                    await self._backoff(e, attempt)
+                    attempt += 1
+
+    async def resolve_intent(self, query: str, skills: List[AgentSkill], perception_snapshot: str = "", **kwargs) -> Intent:
+        # on_skill_hint 只对发起底层请求的调用者生效；合并进来的调用者拿到完整意图后走常规审计
+        payload = json.dumps([query, skills_fingerprint(skills), perception_snapshot], ensure_ascii=False)
+        key = "intent:" + hashlib.sha1(payload.encode("utf-8")).hexdigest()
+        try:
+            return await self._coalesced(
+                key, lambda: self.inner.resolve_intent(query, skills, perception_snapshot=perception_snapshot, **kwargs)
+            )
+        except Exception as e:
+            if not is_rate_limited(e):
+                raise
+            # 与 OpenAIProvider 的降级策略一致：重试耗尽后返回空意图
+            return Intent(
+                raw_query=query,
+                thought_process=f"LLM 接口限流，重试 {self.max_retries} 次后仍失败: {e}",
+                target_skill_id=None,
+                parameters={},
+                confidence=0.0
+            )
+
+    def own_stats(self) -> dict:
+        return {
+            **self.counters,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "coalescing": len(self._flights),
+            "avg_queue_wait_ms": round(self._queue_wait_total / self._queue_waits * 1000, 2) if self._queue_waits else 0.0,
+            "max_queue_wait_ms": round(self.max_queue_wait * 1000, 2),
+            "throttle_wait_ms": round(self.throttle_wait_total * 1000, 2),
+        }
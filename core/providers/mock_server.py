@@ -0,0 +1,341 @@
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from ..schema import AgentSkill
+
+# 默认应答器识别的提示词标记 (见 core/prompts.py)
+_MANIFEST_MARKER = "## 可用技能清单:"
+_AUDIT_MARKER = "首席安全审计官"
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests", 500: "Internal Server Error"}
+
+
+class MockOpenAIServer:
+    """
+    本地 OpenAI 兼容模拟服务 (Offline stand-in for the chat-completions API)
+    只依赖标准库 asyncio，实现离线压测所需的最小接口：
+    - POST /v1/chat/completions: 普通与流式 (SSE) 响应，支持 response_format={"type": "json_object"}
+    - GET  /v1/models: 模型列表；GET /stats: 服务端统计
+    延迟 = latency_ms + 高斯抖动 (jitter_ms)，并以 tail_rate 的概率额外叠加 tail_ms (模拟长尾，便于测试对冲)；
+    以 error_rate / rate_limit_rate 的概率返回 500 / 429 (带 Retry-After)。
+    流式请求带 stream_options.include_usage 时在末尾追加 usage 分片；stream_usage=False 模拟不支持该参数的网关 (返回 400)。
+    script 为按顺序匹配的脚本化响应：[{"match": 正则, "response": 文本或 JSON 对象, "latency_ms"?, "status"?}]，
+    匹配对象为最后一条 user 消息与全部 system 提示词；未命中时由默认应答器生成意图 / 审计 / 闲聊响应。
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, latency_ms: float = 200.0,
+                 jitter_ms: float = 50.0, tail_rate: float = 0.0, tail_ms: float = 2000.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 1.0,
+                 chunk_chars: int = 8, chunk_interval_ms: float = 15.0,
+                 script: Optional[List[Dict[str, Any]]] = None, seed: Optional[int] = None,
+                 stream_usage: bool = True):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tail_rate = tail_rate
+        self.tail_ms = tail_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.chunk_chars = max(1, chunk_chars)
+        self.chunk_interval_ms = chunk_interval_ms
+        self.script = [dict(rule, pattern=re.compile(rule["match"])) for rule in (script or [])]
+        self.stream_usage = stream_usage
+        self._random = random.Random(seed)
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._connections = set()
+        self._prefixes = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.counters = {"requests": 0, "streams": 0, "scripted": 0, "errors": 0, "rate_limited": 0}
+
+    # --- 生命周期 ---
+
+    async def start(self) -> "MockOpenAIServer":
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]  # port=0 时取实际端口
+        return self
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            # 客户端的 keep-alive 空闲连接不会自行断开，主动关闭后 wait_closed 才能返回
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def stats(self) -> dict:
+        return {**self.counters, "in_flight": self.in_flight, "max_in_flight": self.max_in_flight}
+
+    # --- HTTP ---
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+                await self._route(method, path.split("?", 1)[0], body, writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _send(self, writer, status: int, payload: Any, extra_headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}", "Content-Type: application/json",
+                f"Content-Length: {len(body)}"]
+        head += [f"{k}: {v}" for k, v in (extra_headers or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    @staticmethod
+    def _error(message: str, kind: str) -> dict:
+        return {"error": {"message": message, "type": kind, "code": kind}}
+
+    async def _route(self, method: str, path: str, body: bytes, writer):
+        if method == "GET" and path.rstrip("/") in ("/v1/models", "/models"):
+            await self._send(writer, 200, {"object": "list", "data": [{"id": "mock-model", "object": "model", "owned_by": "janus"}]})
+        elif method == "GET" and path.rstrip("/") == "/stats":
+            await self._send(writer, 200, self.stats())
+        elif method == "POST" and path.rstrip("/") in ("/v1/chat/completions", "/chat/completions"):
+            try:
+                request = json.loads(body or b"{}")
+            except json.JSONDecodeError as e:
+                await self._send(writer, 400, self._error(f"Invalid JSON body: {e}", "invalid_request_error"))
+                return
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                await self._chat_completions(request, writer)
+            finally:
+                self.in_flight -= 1
+        else:
+            await self._send(writer, 404, self._error(f"Unknown endpoint {method} {path}", "not_found"))
+
+    # --- chat.completions ---
+
+    def _latency(self, rule: Optional[dict]) -> float:
+        if rule is not None and "latency_ms" in rule:
+            ms = float(rule["latency_ms"])
+        else:
+            ms = self._random.gauss(self.latency_ms, self.jitter_ms) if self.jitter_ms else self.latency_ms
+            if self.tail_rate and self._random.random() < self.tail_rate:
+                ms += self.tail_ms
+        return max(0.0, ms) / 1000
+
+    async def _chat_completions(self, request: dict, writer):
+        self.counters["requests"] += 1
+        messages = request.get("messages") or []
+        if "stream_options" in request and not self.stream_usage:
+            await self._send(writer, 400, self._error("Unrecognized request argument supplied: stream_options",
+                                                      "invalid_request_error"))
+            return
+        rule = self._match_script(messages)
+        await asyncio.sleep(self._latency(rule))
+
+        roll = self._random.random()
+        status = rule.get("status") if rule is not None else None
+        if status == 429 or (status is None and roll < self.rate_limit_rate):
+            self.counters["rate_limited"] += 1
+            await self._send(writer, 429, self._error("Rate limit reached (mock).", "rate_limit_exceeded"),
+                             {"Retry-After": f"{self.retry_after:g}"})
+            return
+        if (status is not None and status >= 400) or (status is None and roll < self.rate_limit_rate + self.error_rate):
+            self.counters["errors"] += 1
+            code = status if status is not None else 500
+            await self._send(writer, code, self._error("Injected failure (mock).", "server_error"))
+            return
+
+        json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+        if rule is not None:
+            self.counters["scripted"] += 1
+            content = rule["response"]
+            content = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+        else:
+            content = self.default_response(messages, json_mode)
+
+        model = request.get("model", "mock-model")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        usage = self._usage(messages, content)
+        if request.get("stream"):
+            self.counters["streams"] += 1
+            include_usage = (request.get("stream_options") or {}).get("include_usage", False)
+            await self._stream(writer, completion_id, model, content, usage if include_usage else None)
+            return
+        await self._send(writer, 200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    def _usage(self, messages: List[dict], content: str) -> dict:
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        # 模拟服务端前缀缓存：首条消息此前出现过则视为命中
+        prefix = str(messages[0].get("content", "")) if messages else ""
+        cached_tokens = len(prefix) // 4 if prefix in self._prefixes else 0
+        self._prefixes.add(prefix)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+
+    async def _stream(self, writer, completion_id: str, model: str, content: str, usage: Optional[dict] = None):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Transfer-Encoding: chunked\r\n\r\n")
+
+        async def event(data: str):
+            payload = f"data: {data}\n\n".encode("utf-8")
+            writer.write(f"{len(payload):x}\r\n".encode("latin-1") + payload + b"\r\n")
+            await writer.drain()
+
+        def chunk(delta: dict, finish: Optional[str] = None) -> str:
+            return json.dumps({
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }, ensure_ascii=False)
+
+        await event(chunk({"role": "assistant", "content": ""}))
+        for i in range(0, len(content), self.chunk_chars):
+            if i and self.chunk_interval_ms:
+                await asyncio.sleep(self.chunk_interval_ms / 1000)
+            await event(chunk({"content": content[i:i + self.chunk_chars]}))
+        await event(chunk({}, "stop"))
+        if usage is not None:
+            # 与 OpenAI 一致：usage 放在 choices 为空的最后一个分片中
+            await event(json.dumps({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                                    "model": model, "choices": [], "usage": usage}))
+        await event("[DONE]")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    # --- 应答生成 ---
+
+    def _match_script(self, messages: List[dict]) -> Optional[dict]:
+        if not self.script:
+            return None
+        user = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+        system = "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+        for rule in self.script:
+            if rule["pattern"].search(user) or rule["pattern"].search(system):
+                return rule
+        return None
+
+    @staticmethod
+    def default_response(messages: List[dict], json_mode: bool = False) -> str:
+        """
+        未命中脚本时的默认应答：
+        - 调度提示词：解析其中的技能清单，用本地快速通道打分生成意图 JSON (字段顺序与真实提示词一致)
+        - 审计提示词：返回 pass
+        - 其他：JSON 模式返回 {"reply": ...}，否则回显最后一条用户消息
+        """
+        from .antigravity import match_fast_path
+        system = "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+        user = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+
+        if _MANIFEST_MARKER in system:
+            skills = _parse_manifest(system)
+            match = match_fast_path(user, skills) if skills else None
+            skill_id = match.skill_id if match is not None else None
+            return json.dumps({
+                "target_skill_id": skill_id,
+                "parameters": match.parameters if skill_id else {},
+                "confidence": round(match.confidence, 2) if skill_id else 0.0,
+                "raw_query": user,
+                "thought_process": f"[mock] {match.thought}" if match is not None else "[mock] No skill matched.",
+            }, ensure_ascii=False)
+        if _AUDIT_MARKER in system:
+            return json.dumps({"status": "pass", "rationale": "[mock] 模拟审计通过。", "risk_level": 1}, ensure_ascii=False)
+        if json_mode:
+            return json.dumps({"reply": f"[mock] {user}"}, ensure_ascii=False)
+        return f"[mock] 收到: {user}"
+
+
+def _parse_manifest(system_prompt: str) -> List[AgentSkill]:
+    """从调度提示词中取出紧凑技能清单 (标记后的第一行 JSON 数组)"""
+    tail = system_prompt.split(_MANIFEST_MARKER, 1)[1]
+    line = next((l for l in tail.splitlines() if l.strip()), "")
+    try:
+        return [AgentSkill(**entry) for entry in json.loads(line)]
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return []
+
+
+def _load_script(path: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def _main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock server for offline load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="响应基础延迟 (流式为首包延迟)")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="延迟高斯抖动的标准差")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="长尾请求比例 (0 - 1)")
+    parser.add_argument("--tail-ms", type=float, default=2000.0, help="长尾请求额外延迟")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的比例 (0 - 1)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回 429 的比例 (0 - 1)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 响应的 Retry-After 秒数")
+    parser.add_argument("--chunk-chars", type=int, default=8, help="流式响应每个分片的字符数")
+    parser.add_argument("--chunk-interval-ms", type=float, default=15.0, help="流式分片间隔")
+    parser.add_argument("--script", default=None, help="脚本化响应 JSON 文件")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-stream-usage", action="store_true", help="模拟不支持 stream_options 的网关")
+    args = parser.parse_args(argv)
+
+    server = MockOpenAIServer(
+        host=args.host, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        tail_rate=args.tail_rate, tail_ms=args.tail_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after, chunk_chars=args.chunk_chars,
+        chunk_interval_ms=args.chunk_interval_ms, script=_load_script(args.script), seed=args.seed,
+        stream_usage=not args.no_stream_usage,
+    )
+    await server.start()
+    print(f"[模拟服务] OpenAI 兼容接口已启动: OPENAI_API_BASE={server.base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+        print(f"[模拟服务] 已停止: {json.dumps(server.stats(), ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
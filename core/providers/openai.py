@@ -1,22 +1,38 @@
 import json
 import os
-from typing import List
-from openai import AsyncOpenAI
+import time
+from typing import AsyncIterator, Callable, List, Optional
+from openai import AsyncOpenAI, BadRequestError
 from ..schema import Message, Intent, AgentSkill
 from ..provider import BaseProvider
+from ..jsonstream import IncrementalJSONObject
+from ..skill_retriever import SkillRetriever, compact_manifest
+from ..prompts import INTENT_PROMPT, record_usage
+from .middleware import is_rate_limited
 
 class OpenAIProvider(BaseProvider):
     """
     OpenAI 兼容的云端 AI 供给侧实现。
     支持 OpenAI, DeepSeek, Azure 等标准 API。
+    传入 retriever 时，意图解析只把检索出的候选技能放进提示词 (见 core/skill_retriever.py)。
+    stream=True 时意图解析走流式输出 + 增量 JSON 解析，target_skill_id / parameters 一旦闭合即回调 on_skill_hint。
     """
     
-    def __init__(self, model: str = "gpt-4-turbo-preview", base_url: str = None, api_key: str = None):
+    def __init__(self, model: str = "gpt-4-turbo-preview", base_url: str = None, api_key: str = None,
+                 retriever: Optional[SkillRetriever] = None, stream: bool = True,
+                 raise_on_rate_limit: bool = False):
         self.client = AsyncOpenAI(
             api_key=api_key or os.getenv("OPENAI_API_KEY"),
             base_url=base_url or os.getenv("OPENAI_API_BASE")
         )
+        # 外层有 LimitedProvider 负责 429 退避时置 True，让限流错误穿透降级逻辑
+        self.raise_on_rate_limit = raise_on_rate_limit
         self.model = model
+        self.retriever = retriever
+        self.last_prompt_tokens = 0
+        self.stream = stream
+        self.last_timings = {}
+        self._stream_usage = True  # 网关拒绝 stream_options 时自动关闭
 
     async def chat(self, messages: List[Message]) -> str:
         formatted_messages = [{"role": m.role, "content": m.content} for m in messages]
@@ -24,62 +40,63 @@ class OpenAIProvider(BaseProvider):
             model=self.model,
             messages=formatted_messages
         )
+        record_usage(formatted_messages, response.usage)
         return response.choices[0].message.content
 
-    async def resolve_intent(self, query: str, skills: List[AgentSkill], perception_snapshot: str = "") -> Intent:
+    @property
+    def streams_intent(self) -> bool:
+        return self.stream
+
+    async def chat_stream(self, messages: List[Message]) -> AsyncIterator[str]:
+        formatted_messages = [{"role": m.role, "content": m.content} for m in messages]
+        stream = await self._create_stream(model=self.model, messages=formatted_messages)
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                record_usage(formatted_messages, chunk.usage)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+    async def resolve_intent(self, query: str, skills: List[AgentSkill], perception_snapshot: str = "",
+                             on_skill_hint: Optional[Callable[[str, Optional[dict]], None]] = None) -> Intent:
         """
         利用 LLM 进行意图识别和参数提取，并注入感知环境上下文。
+        on_skill_hint(skill_id, parameters): 流式模式下 target_skill_id 与 parameters 每闭合一个即回调一次，
+        parameters 尚未闭合时为 None；回调须为同步函数且不得阻塞。
         """
-        skill_manifest = [s.dict() for s in skills]
+        if self.retriever is not None:
+            skills = self.retriever.select(query, skills)
         
-        system_prompt = f"""
-你现在是 JANUS Hub 的中枢调度员。
-你的任务是根据用户的输入，判断是否需要调用特定的技能库，并提取参数。
-
-## 当前环境感知快照 (Context):
-{perception_snapshot}
-
-## 可用技能清单:
-{json.dumps(skill_manifest, ensure_ascii=False, indent=2)}
-
-
-## 响应格式要求:
-你必须仅返回一个有效的 JSON 对象，包含以下字段：
-- raw_query: 原始查询
-- thought_process: 简短的调度逻辑思考
-- target_skill_id: 匹配的技能 ID，如果不匹配任何技能则为 null
-- parameters: 提取出的技能参数字典
-- confidence: 信心评分 (0.0 - 1.0)
-
-示例：
-{{
-  "raw_query": "列出数据目录下的文件",
-  "thought_process": "用户希望浏览文件，匹配 list_files 技能。",
-  "target_skill_id": "list_files",
-  "parameters": {{"pattern": "*分享*"}},
-  "confidence": 0.95
-}}
-"""
+        # 静态前缀 (调度规则 + 响应格式) 在前且逐字节不变，技能清单与感知快照作为第二条系统消息
+        messages = INTENT_PROMPT.render(
+            user=query,
+            manifest=compact_manifest(skills),
+            perception_snapshot=perception_snapshot
+        )
+        self.last_prompt_tokens = INTENT_PROMPT.prompt_tokens(messages)
+        response_format = { "type": "json_object" } if "gpt-4" in self.model or "gpt-3.5" in self.model else None
         
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": query}
-                ],
-                response_format={ "type": "json_object" } if "gpt-4" in self.model or "gpt-3.5" in self.model else None
-            )
-            
-            content = response.choices[0].message.content
-            # 处理可能的 Markdown 包裹
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            
-            data = json.loads(content)
+            started = time.perf_counter()
+            if self.stream:
+                data = await self._stream_intent(messages, response_format, on_skill_hint, started)
+            else:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    response_format=response_format
+                )
+                record_usage(messages, response.usage)
+                data = self._parse_json(response.choices[0].message.content)
+            self.last_timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            data.setdefault("raw_query", query)
             return Intent(**data)
             
         except Exception as e:
+            if self.raise_on_rate_limit and is_rate_limited(e):
+                raise
             # 降级处理：如果没有成功解析，返回通用意图
             return Intent(
                 raw_query=query,
@@ -88,3 +105,69 @@ class OpenAIProvider(BaseProvider):
                 parameters={},
                 confidence=0.0
             )
+
+    async def _stream_intent(self, messages, response_format, on_skill_hint, started: float) -> dict:
+        """流式读取意图 JSON，字段闭合即回调；返回完整对象"""
+        parser = IncrementalJSONObject()
+        text = []
+        self.last_timings = {}
+        stream = await self._create_stream(model=self.model, messages=messages, response_format=response_format)
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                record_usage(messages, chunk.usage)  # include_usage 时 usage 在末尾的空 choices 分片中
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if not text:
+                self.last_timings["first_token_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            text.append(delta)
+            for key in parser.feed(delta):
+                if key not in ("target_skill_id", "parameters"):
+                    continue
+                self.last_timings[f"{key}_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                skill_id = parser.fields.get("target_skill_id")
+                if on_skill_hint and skill_id:
+                    try:
+                        on_skill_hint(skill_id, parser.fields.get("parameters"))
+                    except Exception as e:
+                        print(f"[调度器] on_skill_hint 回调异常: {e}")
+        if parser.done:
+            return parser.value
+        return self._parse_json("".join(text))
+
+    async def _create_stream(self, **kwargs):
+        """
+        发起流式请求并附带 stream_options={"include_usage": True}，否则流式响应不含 usage，
+        前缀缓存命中统计永远为空。不支持该参数的网关返回 400 时去掉重试，成功后不再附带。
+        """
+        if self._stream_usage:
+            try:
+                return await self.client.chat.completions.create(
+                    stream=True, stream_options={"include_usage": True}, **kwargs
+                )
+            except BadRequestError as e:
+                first_error = e
+            try:
+                stream = await self.client.chat.completions.create(stream=True, **kwargs)
+            except BadRequestError:
+                raise first_error
+            self._stream_usage = False
+            print(f"[云端] 网关不支持 stream_options ({first_error})，流式调用将不再统计 usage。")
+            return stream
+        return await self.client.chat.completions.create(stream=True, **kwargs)
+
+    @staticmethod
+    def _parse_json(content: str) -> dict:
+        # 处理可能的 Markdown 包裹
+        if "```json" in content:
+            content = content.split("```json")[1].split("```")[0].strip()
+        return json.loads(content)
+
+    def stats(self) -> dict:
+        stats = {"model": self.model, "stream": self.stream, "last_prompt_tokens": self.last_prompt_tokens,
+                 "last_timings": self.last_timings}
+        if self.retriever is not None:
+            stats["skill_retriever"] = self.retriever.stats()
+        return {"OpenAIProvider": stats}
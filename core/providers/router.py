@@ -0,0 +1,156 @@
+import asyncio
+import random
+import time
+from typing import Dict, List, Optional
+from ..schema import AgentSkill, Intent
+from ..provider import BaseProvider, ProviderWrapper
+from .antigravity import match_fast_path
+
+
+class _RouteStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class RoutingProvider(ProviderWrapper):
+    """
+    意图路由 (Provider router)
+    1. local: 先跑 Antigravity 的本地快速通道打分 (match_fast_path)，置信度 >= threshold 直接采用
+    2. llm:   否则交给内层 provider (云端 LLM)
+    3. hedge: 配置了 hedge provider 时，内层在 hedge_after 秒内未返回即并发请求备用 provider，
+              先返回有效结果者胜出，另一方被取消
+    一致性统计：低于阈值的本地候选与 LLM 结论对比 (按置信度分档)，用于调整 threshold；
+    shadow_rate > 0 时按比例在后台让 LLM 复核本地直接采用的结果。
+    """
+    def __init__(self, inner: BaseProvider, hedge: Optional[BaseProvider] = None, threshold: float = 0.8,
+                 hedge_after: float = 2.0, shadow_rate: float = 0.0):
+        super().__init__(inner)
+        self.hedge = hedge
+        self.threshold = threshold
+        self.hedge_after = hedge_after
+        self.shadow_rate = shadow_rate
+        self.routes: Dict[str, _RouteStats] = {"local": _RouteStats(), "llm": _RouteStats(), "hedge": _RouteStats()}
+        self.hedges_started = 0
+        self.agreement: Dict[str, Dict[str, int]] = {}
+        self._shadow_tasks = set()
+
+    # --- 路由 ---
+
+    async def resolve_intent(self, query: str, skills: List[AgentSkill], perception_snapshot: str = "", **kwargs) -> Intent:
+        started = time.perf_counter()
+        match = match_fast_path(query, skills)
+        if match is not None and match.confidence >= self.threshold:
+            self.routes["local"].record(time.perf_counter() - started)
+            print(f"⚡ [路由] 本地快速通道命中: {match.skill_id} (置信度 {match.confidence:.2f})")
+            if self.shadow_rate and match.skill_id and random.random() < self.shadow_rate:
+                self._shadow(match, query, skills, perception_snapshot)
+            return Intent(
+                raw_query=query,
+                thought_process=f"[本地路由] {match.thought}",
+                target_skill_id=match.skill_id,
+                parameters=match.parameters,
+                confidence=match.confidence
+            )
+
+        intent, route = await self._resolve_remote(query, skills, perception_snapshot, kwargs)
+        self.routes[route].record(time.perf_counter() - started)
+        if match is not None:
+            self._record_agreement(match, intent)
+        return intent
+
+    async def _resolve_remote(self, query, skills, perception_snapshot, kwargs) -> tuple:
+        primary = asyncio.ensure_future(
+            self.inner.resolve_intent(query, skills, perception_snapshot=perception_snapshot, **kwargs)
+        )
+        if self.hedge is None:
+            return await primary, "llm"
+
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        if done:
+            return primary.result(), "llm"
+
+        self.hedges_started += 1
+        print(f"[路由] 主 provider 超过 {self.hedge_after}s 未返回，启动对冲请求。")
+        hedge_kwargs = kwargs if getattr(self.hedge, "streams_intent", False) else {}
+        backup = asyncio.ensure_future(
+            self.hedge.resolve_intent(query, skills, perception_snapshot=perception_snapshot, **hedge_kwargs)
+        )
+        labels = {primary: "llm", backup: "hedge"}
+        pending = {primary, backup}
+        fallback = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        continue
+                    intent = task.result()
+                    # 解析失败的降级意图 (confidence 0) 不算胜出，继续等另一方
+                    if intent.confidence > 0 or not pending:
+                        return intent, labels[task]
+                    fallback = fallback or (intent, labels[task])
+            if fallback is not None:
+                return fallback
+            return primary.result(), "llm"  # 两者都抛异常：抛出主 provider 的异常
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # --- 一致性统计 ---
+
+    @staticmethod
+    def _bucket(confidence: float) -> str:
+        lo = min(int(confidence * 10), 9) / 10
+        return f"{lo:.1f}-{lo + 0.1:.1f}"
+
+    def _record_agreement(self, match, intent: Intent):
+        entry = self.agreement.setdefault(self._bucket(match.confidence), {"compared": 0, "agreed": 0})
+        entry["compared"] += 1
+        if match.skill_id == intent.target_skill_id:
+            entry["agreed"] += 1
+
+    def _shadow(self, match, query, skills, perception_snapshot):
+        async def review():
+            try:
+                intent = await self.inner.resolve_intent(query, skills, perception_snapshot=perception_snapshot)
+            except Exception:
+                return
+            self._record_agreement(match, intent)
+        task = asyncio.create_task(review())
+        self._shadow_tasks.add(task)
+        task.add_done_callback(self._shadow_tasks.discard)
+
+    def own_stats(self) -> dict:
+        agreement = {
+            bucket: {**e, "rate": round(e["agreed"] / e["compared"], 3)}
+            for bucket, e in sorted(self.agreement.items()) if e["compared"]
+        }
+        return {
+            "threshold": self.threshold,
+            "routes": {name: s.as_dict() for name, s in self.routes.items()},
+            "hedges_started": self.hedges_started,
+            "agreement": agreement,
+        }
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        hedge_stats = getattr(self.hedge, "stats", None)
+        if callable(hedge_stats):
+            stats["hedge"] = hedge_stats()
+        return stats
@@ -0,0 +1,297 @@
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+from ..sensors.inotify import Inotify, IN_CLOSE_WRITE, IN_MOVED_TO, IN_Q_OVERFLOW, inotify_available
+
+
+class SignalWatcher:
+    """
+    信号目录监听器 (Signal directory watcher)
+    每个信号目录只有一个监听器，所有等待中的脑桥任务共享：
+    - Linux 上用 inotify 监听 IN_MOVED_TO (原子 rename 就位) 与 IN_CLOSE_WRITE (直接写入完成)，文件一落地即唤醒
+    - 其他平台退化为单个共享轮询协程 (poll_interval)，无论多少任务在等都只有一次 listdir
+    """
+    def __init__(self, directory: str, poll_interval: float = 0.25):
+        self.directory = os.path.abspath(directory)
+        self.poll_interval = poll_interval
+        self._waiters: Dict[str, Set[asyncio.Future]] = {}
+        self._prefix_waiters: Dict[str, Set[asyncio.Future]] = {}
+        self._inotify: Optional[Inotify] = None
+        self._poller: Optional[asyncio.Task] = None
+        self._loop = None
+        self.mode = "idle"
+        self.wakeups = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        os.makedirs(self.directory, exist_ok=True)
+        if inotify_available():
+            try:
+                self._inotify = Inotify()
+                self._inotify.add_watch(self.directory, IN_MOVED_TO | IN_CLOSE_WRITE)
+                loop.add_reader(self._inotify.fd, self._on_inotify)
+                self.mode = "inotify"
+                return
+            except OSError as e:
+                print(f"[脑桥] inotify 不可用 ({e})，改用共享轮询。")
+                if self._inotify is not None:
+                    self._inotify.close()
+                    self._inotify = None
+        self.mode = "poll"
+
+    def _on_inotify(self):
+        for event in self._inotify.read_events():
+            if event.mask & IN_Q_OVERFLOW:
+                self._check_all()  # 事件溢出：逐个核对等待中的文件
+            else:
+                self._wake(os.path.basename(event.path))
+
+    def _wake(self, name: str):
+        woken = list(self._waiters.pop(name, ()))
+        for prefix in [p for p in self._prefix_waiters if name.startswith(p)]:
+            woken.extend(self._prefix_waiters.pop(prefix))
+        for fut in woken:
+            if not fut.done():
+                self.wakeups += 1
+                fut.set_result(None)
+
+    def _check_all(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name in self._waiters or any(name.startswith(p) for p in self._prefix_waiters):
+                self._wake(name)
+
+    async def _poll(self):
+        while self._waiters or self._prefix_waiters:
+            await asyncio.sleep(self.poll_interval)
+            self._check_all()
+        self._poller = None
+
+    async def wait_for(self, name: str, timeout: Optional[float] = None, prefix: bool = False) -> bool:
+        """
+        等待信号目录中出现文件 name (prefix=True 时为任意以 name 开头的文件)；超时返回 False
+        """
+        self._ensure_started()
+        fut = self._loop.create_future()
+        registry = self._prefix_waiters if prefix else self._waiters
+        registry.setdefault(name, set()).add(fut)
+        # 注册之后再检查一次，避免文件在注册前就已落地而错过事件
+        if prefix:
+            self._check_all()
+        elif os.path.exists(os.path.join(self.directory, name)):
+            self._wake(name)
+        if not fut.done() and self.mode == "poll" and self._poller is None:
+            self._poller = asyncio.create_task(self._poll())
+        try:
+            await asyncio.wait_for(fut, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            waiters = registry.get(name)
+            if waiters is not None:
+                waiters.discard(fut)
+                if not waiters:
+                    del registry[name]
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(w) for w in self._waiters.values()) + sum(len(w) for w in self._prefix_waiters.values())
+
+    def close(self):
+        if self._inotify is not None:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        self._loop = None
+        self.mode = "idle"
+
+
+_watchers: Dict[str, SignalWatcher] = {}
+
+
+def get_signal_watcher(directory: str) -> SignalWatcher:
+    """同一信号目录共享一个监听器"""
+    key = os.path.abspath(directory)
+    watcher = _watchers.get(key)
+    if watcher is None:
+        watcher = _watchers[key] = SignalWatcher(key)
+    return watcher
+
+
+def cleanup_orphaned_requests(directory: str, max_age: float, active: Set[str] = frozenset()) -> int:
+    """删除超过 max_age 秒且没有任务在等待的 pending_*.request 申请单，返回删除数量"""
+    now = time.time()
+    removed = 0
+    for path in glob.glob(os.path.join(directory, "pending_*.request")):
+        if os.path.basename(path) in active:
+            continue
+        try:
+            if now - os.path.getmtime(path) > max_age:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def _atomic_write(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class JournalBridge:
+    """
+    日志式脑桥协议 (Append-only journal protocol)
+    每次求援只写入请求自身的负载，技能清单与响应都做了批量化：
+    - manifests/<sha>.json  技能清单按内容哈希命名，只在清单变化时写一次；请求中以 "manifest": <sha> 引用
+    - requests.jsonl        追加写入的求援日志，每行一个紧凑 JSON 请求；
+                            任务结束时追加一行关闭记录 {"task_id", "status": "ANSWERED" | "EXPIRED"}
+    - responses_*.jsonl     大脑批量写回的响应，每行一个 {"task_id": ..., ...}；须先写临时文件再原子改名
+    JANUS 侧只有一个消费协程：被唤醒后一次性读完所有批次文件，按 task_id 分发给等待中的任务并删除已消费文件。
+    日志在空闲 (无未决请求) 且超过 rotate_bytes 时轮转为 requests.jsonl.1。
+    """
+    JOURNAL_NAME = "requests.jsonl"
+    RESPONSE_PREFIX = "responses_"
+
+    def __init__(self, directory: str, rotate_bytes: int = 1 << 20, backstop: float = 5.0):
+        self.directory = os.path.abspath(directory)
+        self.journal_path = os.path.join(self.directory, self.JOURNAL_NAME)
+        self.manifest_dir = os.path.join(self.directory, "manifests")
+        self.rotate_bytes = rotate_bytes
+        self.backstop = backstop  # 兜底唤醒间隔，防止漏掉事件
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._manifests: Set[str] = set()
+        self._consumer: Optional[asyncio.Task] = None
+        self.counters = {"requests": 0, "answered": 0, "expired": 0, "unknown_responses": 0, "batches": 0,
+                         "manifests_written": 0, "bytes_written": 0, "rotations": 0}
+        os.makedirs(self.manifest_dir, exist_ok=True)
+
+    # --- 请求侧 ---
+
+    def publish_manifest(self, manifest: List[Dict[str, Any]]) -> str:
+        """按内容哈希发布技能清单，返回引用用的摘要；相同清单只落盘一次"""
+        payload = json.dumps(manifest, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        digest = hashlib.sha256(payload).hexdigest()[:16]
+        if digest not in self._manifests:
+            path = os.path.join(self.manifest_dir, f"{digest}.json")
+            if not os.path.exists(path):
+                _atomic_write(path, payload)
+                self.counters["manifests_written"] += 1
+                self.counters["bytes_written"] += len(payload)
+            self._manifests.add(digest)
+        return digest
+
+    def _append(self, record: Dict[str, Any]):
+        # 整行一次 write (O_APPEND)，大脑侧只处理以换行结尾的完整行
+        data = (json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+        with open(self.journal_path, "ab") as f:
+            f.write(data)
+        self.counters["bytes_written"] += len(data)
+
+    def _maybe_rotate(self):
+        if self._pending:
+            return
+        try:
+            if os.path.getsize(self.journal_path) < self.rotate_bytes:
+                return
+            os.replace(self.journal_path, f"{self.journal_path}.1")
+            self.counters["rotations"] += 1
+        except OSError:
+            pass
+
+    def submit(self, request: Dict[str, Any]) -> asyncio.Future:
+        """追加一条请求，返回在响应到达时完成的 future (结果为响应记录)"""
+        self._maybe_rotate()
+        future = asyncio.get_running_loop().create_future()
+        # 先登记再写日志：响应不可能早于登记到达
+        self._pending[request["task_id"]] = future
+        self._append(request)
+        self.counters["requests"] += 1
+        if self._consumer is None or self._consumer.done():
+            self._consumer = asyncio.create_task(self._consume())
+        return future
+
+    def close(self, task_id: str, status: str):
+        """追加关闭记录，大脑侧据此跳过已结束的请求"""
+        future = self._pending.pop(task_id, None)
+        if future is not None and not future.done():
+            future.cancel()
+        self._append({"task_id": task_id, "status": status})
+        self.counters["answered" if status == "ANSWERED" else "expired"] += 1
+        if not self._pending and self._consumer is not None:
+            self._consumer.cancel()
+            self._consumer = None
+
+    # --- 响应侧 ---
+
+    def drain(self) -> int:
+        """消费所有已就位的响应批次文件，返回分发给等待任务的响应数"""
+        delivered = 0
+        for path in sorted(glob.glob(os.path.join(self.directory, f"{self.RESPONSE_PREFIX}*.jsonl"))):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    records = [json.loads(line) for line in f if line.strip()]
+            except json.JSONDecodeError:
+                continue  # 非原子写入的半成品：下次再读
+            except OSError:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.counters["batches"] += 1
+            for record in records:
+                future = self._pending.pop(record.get("task_id"), None)
+                if future is None:
+                    self.counters["unknown_responses"] += 1  # 已超时或来自上一次进程
+                    continue
+                if not future.done():
+                    future.set_result(record)
+                    delivered += 1
+        return delivered
+
+    async def _consume(self):
+        watcher = get_signal_watcher(self.directory)
+        woken = False
+        while self._pending:
+            if self.drain() == 0 and woken:
+                # 临时文件或半成品也会触发前缀唤醒，没有收获时稍作停顿避免空转
+                await asyncio.sleep(watcher.poll_interval)
+            if self._pending:
+                woken = await watcher.wait_for(self.RESPONSE_PREFIX, timeout=self.backstop, prefix=True)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        return {**self.counters, "pending": self.pending}
+
+
+_journals: Dict[str, JournalBridge] = {}
+
+
+def get_journal_bridge(directory: str) -> JournalBridge:
+    """同一信号目录共享一份求援日志"""
+    key = os.path.abspath(directory)
+    journal = _journals.get(key)
+    if journal is None:
+        journal = _journals[key] = JournalBridge(key)
+    return journal
@@ -0,0 +1,80 @@
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """
+    令牌桶限流器 (Token Bucket)
+    容量为 tokens，每 period 秒匀速回填 tokens 个令牌。
+    """
+    def __init__(self, tokens: float = 1, period: float = 5.0, clock=time.monotonic):
+        self.capacity = float(tokens)
+        self.period = float(period)
+        self.rate = self.capacity / self.period if self.period > 0 else float("inf")
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """非阻塞获取令牌，成功返回 True"""
+        self._refill(self._clock())
+        if self._tokens >= amount:
+            self._tokens -= amount
+            return True
+        return False
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """距离可获取 amount 个令牌还需等待的秒数"""
+        self._refill(self._clock())
+        deficit = amount - self._tokens
+        if deficit <= 0:
+            return 0.0
+        return deficit / self.rate
+
+    def is_full(self, now: Optional[float] = None) -> bool:
+        self._refill(self._clock() if now is None else now)
+        return self._tokens >= self.capacity
+
+
+class BucketTable:
+    """
+    自动过期的令牌桶表 (Self-expiring bucket table)
+    已回满的桶与新建的桶等价，因此闲置超过回满时间后即可丢弃，表的大小只与近期活跃的 key 数量有关。
+    """
+    def __init__(self, sweep_interval: float = 60.0, clock=time.monotonic):
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._clock = clock
+        self.sweep_interval = sweep_interval
+        self._last_sweep = clock()
+
+    def get(self, key: str, tokens: float, period: float) -> TokenBucket:
+        self._maybe_sweep()
+        bucket = self._buckets.get(key)
+        # 规则配置被修改后重建对应的桶
+        if bucket is None or bucket.capacity != float(tokens) or bucket.period != float(period):
+            bucket = TokenBucket(tokens, period, clock=self._clock)
+            self._buckets[key] = bucket
+        return bucket
+
+    def try_acquire(self, key: str, tokens: float, period: float) -> bool:
+        return self.get(key, tokens, period).try_acquire()
+
+    def _maybe_sweep(self):
+        now = self._clock()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        expired = [k for k, b in self._buckets.items() if b.is_full(now)]
+        for k in expired:
+            del self._buckets[k]
+
+    def clear(self):
+        self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
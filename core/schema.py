@@ -34,6 +34,15 @@ class AuditStatus(str, Enum):
     WARN = "warn"
     FAIL = "fail"
 
+class RiskTier(str, Enum):
+    """
+    Declared risk tier of a skill (技能风险等级)
+    """
+    READ_ONLY = "read_only"       # 只读查询
+    LOCAL_WRITE = "local_write"   # 修改本地文件 / 记忆 / 运行状态
+    DESTRUCTIVE = "destructive"   # 删除或不可逆操作
+    EXTERNAL = "external"         # 访问外部系统 (远程仓库、大脑救援等)
+
 # --- Core Models (核心模型) ---
 
 class AuditResult(BaseModel):
@@ -44,6 +53,8 @@ class AuditResult(BaseModel):
     rationale: str = Field(..., description="审计理由")
     suggested_changes: Optional[str] = None
     risk_level: int = Field(0, ge=0, le=10) # 0-10 风险等级
+    audit_trail: List[str] = Field(default_factory=list, description="审计决策轨迹 (各审计器结论、跳过与升级原因)")
+    cacheable: bool = Field(True, description="结论可否复用 (审计器超时或故障得出的结论不可缓存)")
 
 class AgentSkill(BaseModel):
     """
@@ -55,9 +66,26 @@ class AgentSkill(BaseModel):
     description: str = Field(..., description="Detailed description for the orchestrator")
     tags: List[str] = Field(default_factory=list)
     examples: List[str] = Field(default_factory=list, description="Usage examples for AI reasoning")
+    keywords: List[str] = Field(default_factory=list, description="Intent keywords for the local fast-path matcher (意图关键词)")
+    risk_tier: Optional[RiskTier] = Field(None, description="Declared risk tier; undeclared skills always get full review (风险等级)")
     input_schema: Dict[str, Any] = Field(default_factory=dict, description="JSON Schema for inputs")
     output_schema: Dict[str, Any] = Field(default_factory=dict, description="JSON Schema for outputs")
 
+class SensorManifest(BaseModel):
+    """
+    Declaration of a pluggable sensor (传感器插件清单)
+    Lives next to its module in core/dynamic_sensors/<id>.json.
+    """
+    id: str = Field(..., description="Unique ID, also the module file name")
+    name: str = Field(..., description="Human-readable name")
+    description: str = ""
+    entry: str = Field("sense", description="Entry function: sense(params, state) -> event | [events] | None")
+    isolation: str = Field("inline", description="inline | thread | process")
+    interval: float = Field(10.0, gt=0, description="Seconds between sense() calls")
+    params: Dict[str, Any] = Field(default_factory=dict)
+    enabled: bool = True
+    max_restarts: int = Field(5, ge=0, description="Consecutive failures before the sensor is disabled")
+
 class Message(BaseModel):
     """
     A single exchange in a conversation (单个会话消息)
@@ -1,22 +1,122 @@
+import asyncio
+import os
+import time
 from .system_sensor import SystemSensor
 from .file_sensor import FileSensor
+from .chronos import ChronosSensor
+from .plugin import PluginSensor, discover_sensor_plugins
+from .watchset import WatchSetConfig
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 监控集配置默认位置 (可用 JANUS_WATCHSETS 覆盖)，修改后 FileSensor 热加载
+DEFAULT_WATCHSET_PATH = os.path.join(_PROJECT_ROOT, ".janus", "watchsets.json")
+# 传感器插件目录 (与 dynamic_skills 对应：<id>.json 清单 + <id>.py 模块)
+DEFAULT_PLUGIN_DIR = os.path.join(_PROJECT_ROOT, "core", "dynamic_sensors")
 
 class SensorManager:
-    """感知管理器 (Manager for all active sensors)"""
-    def __init__(self, dispatcher):
+    """
+    感知管理器 (Manager for all active sensors)
+    除内置传感器外，从插件目录按清单加载传感器；监督协程定期巡检，
+    主循环因异常退出的传感器按指数退避自动重启，并记录事件循环延迟。
+    """
+    def __init__(self, dispatcher, supervise_interval: float = 5.0):
         self.dispatcher = dispatcher
         self.bus = dispatcher.perception
         self.sensors = []
+        dispatcher.sensor_manager = self
+        self.supervise_interval = supervise_interval
+        self._supervisor = None
+        self._crashes = {}        # sensor name -> 连续崩溃次数
+        self._restart_at = {}     # sensor name -> 计划重启时刻 (monotonic)
+        self._started_at = {}
+        self.loop_lag_ms = 0.0
+        self.max_loop_lag_ms = 0.0
+
+    def register(self, sensor):
+        self.sensors.append(sensor)
 
-    def setup_default_sensors(self, watch_path: str = "."):
-        self.sensors.append(SystemSensor(self.bus))
+    def setup_default_sensors(self, watch_path: str = ".", watchset_path: str = None):
+        self.register(SystemSensor(self.bus))
+        self.register(ChronosSensor(self.bus))
         if watch_path:
-            self.sensors.append(FileSensor(self.bus, watch_path))
+            watchset = WatchSetConfig(watchset_path or os.getenv("JANUS_WATCHSETS") or DEFAULT_WATCHSET_PATH, default_root=watch_path)
+            self.register(FileSensor(self.bus, watch_path, watchset=watchset))
+        self.load_plugins()
+
+    def load_plugins(self, plugin_dir: str = DEFAULT_PLUGIN_DIR) -> int:
+        """扫描插件目录并注册启用的传感器插件，返回新增数量"""
+        known = {s.name for s in self.sensors}
+        count = 0
+        for manifest, module_path in discover_sensor_plugins(plugin_dir):
+            try:
+                sensor = PluginSensor(self.bus, manifest, module_path)
+            except ValueError as e:
+                print(f"[感知器] 传感器插件 {manifest.id} 清单无效: {e}")
+                continue
+            if sensor.name in known:
+                continue
+            self.register(sensor)
+            count += 1
+            print(f"[感知器] 发现传感器插件: {manifest.name} ({manifest.id}, {manifest.isolation})")
+        return count
 
     async def start_all(self):
         for s in self.sensors:
             await s.start()
+            self._started_at[s.name] = time.monotonic()
+        if self._supervisor is None:
+            self._supervisor = asyncio.create_task(self._supervise())
+
+    async def _supervise(self):
+        """巡检传感器健康状态；顺带测量事件循环延迟 (休眠超时即为被阻塞的时长)"""
+        while True:
+            expected = time.monotonic() + self.supervise_interval
+            await asyncio.sleep(self.supervise_interval)
+            lag = max(0.0, time.monotonic() - expected) * 1000
+            self.loop_lag_ms = round(lag, 2)
+            self.max_loop_lag_ms = max(self.max_loop_lag_ms, self.loop_lag_ms)
+
+            now = time.monotonic()
+            for s in self.sensors:
+                task = s._task
+                if not s.running or task is None or not task.done() or task.cancelled():
+                    continue
+                error = task.exception()
+                if error is None:
+                    continue  # 主循环正常结束 (如插件已停用)，不再重启
+
+                restart_at = self._restart_at.get(s.name)
+                if restart_at is None:
+                    # 稳定运行 5 分钟以上的传感器崩溃时重新计数
+                    if now - self._started_at.get(s.name, now) > 300:
+                        self._crashes[s.name] = 0
+                    self._crashes[s.name] = self._crashes.get(s.name, 0) + 1
+                    delay = min(2 ** (self._crashes[s.name] - 1), 300)
+                    self._restart_at[s.name] = now + delay
+                    print(f"[感知器] {s.name} 主循环崩溃 ({type(error).__name__}: {error})，{delay}s 后重启。")
+                elif now >= restart_at:
+                    del self._restart_at[s.name]
+                    await s.start()
+                    self._started_at[s.name] = now
+
+    def stats(self) -> dict:
+        """各传感器的当前间隔、占空比与重启次数，以及事件循环延迟"""
+        stats = {}
+        for s in self.sensors:
+            entry = s.stats()
+            entry["crashes"] = self._crashes.get(s.name, 0)
+            stats[s.name] = entry
+        stats["_supervisor"] = {"loop_lag_ms": self.loop_lag_ms, "max_loop_lag_ms": self.max_loop_lag_ms}
+        return stats
 
     async def stop_all(self):
+        if self._supervisor:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+            self._supervisor = None
         for s in self.sensors:
             await s.stop()
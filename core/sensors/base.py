@@ -1,16 +1,38 @@
 import asyncio
+import time
 from abc import ABC, abstractmethod
+from typing import Optional
 
 class BaseSensor(ABC):
-    """感知传感器基类 (Base class for all sensors)"""
-    def __init__(self, name: str, bus):
+    """
+    感知传感器基类 (Base class for all sensors)
+    自适应间隔 (Adaptive interval)：需显式传入 max_interval 开启 (opt-in)。周期内没有发射任何事件时，
+    下次间隔按 backoff 倍数退避，直至 max_interval；一旦有活动立即回到 interval。
+    未传入 max_interval 的传感器保持固定间隔。本周期的扫描耗时会从休眠时间中扣除。
+    """
+    def __init__(self, name: str, bus, interval: Optional[float] = None, max_interval: Optional[float] = None,
+                 backoff: float = 2.0):
         self.name = name
         self.bus = bus
         self.running = False
         self._task = None
 
+        # --- 自适应调度 ---
+        self.interval = interval
+        self.max_interval = max(max_interval or 0, interval or 0) or None
+        self.backoff = max(1.0, backoff)
+        self.current_interval = interval
+        self._active = False
+
+        # --- 占空比统计 (Duty cycle) ---
+        self.cycles = 0
+        self.busy_seconds = 0.0
+        self.last_busy = 0.0
+        self._started_at = None
+
     async def start(self):
         self.running = True
+        self._started_at = time.monotonic()
         self._task = asyncio.create_task(self._run())
         # print(f"[感知器] {self.name} 已启动。") # 保持后台静默
 
@@ -23,8 +45,53 @@ class BaseSensor(ABC):
                 await self._task
             except asyncio.CancelledError:
                 pass
+            except Exception:
+                pass  # 已崩溃的主循环，异常由 SensorManager 监督协程上报
         print(f"[感知器] {self.name} 已停止。")
 
+    async def emit(self, source: str, data, importance: float = 0.5):
+        """向总线发射信号，并记为本周期有活动"""
+        self._active = True
+        await self.bus.emit(source=source, data=data, importance=importance)
+
+    def mark_activity(self):
+        """未发射事件但仍需保持快速节奏时 (如告警临界) 调用"""
+        self._active = True
+
+    def _next_interval(self) -> Optional[float]:
+        """根据上一周期是否有活动计算下次间隔"""
+        if self.interval is None:
+            return None
+        if self._active:
+            self.current_interval = self.interval
+        else:
+            self.current_interval = min(self.current_interval * self.backoff, self.max_interval)
+        self._active = False
+        return self.current_interval
+
+    def _record_cycle(self, busy: float):
+        self.cycles += 1
+        self.busy_seconds += busy
+        self.last_busy = busy
+
+    async def _cycle_sleep(self, busy: float):
+        """记录本周期耗时并休眠到下一周期 (扣除扫描耗时，保持节奏不漂移)"""
+        self._record_cycle(busy)
+        await asyncio.sleep(max(0.0, self._next_interval() - busy))
+
+    def stats(self) -> dict:
+        wall = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "running": self.running,
+            "interval": self.current_interval,
+            "base_interval": self.interval,
+            "max_interval": self.max_interval,
+            "cycles": self.cycles,
+            "avg_busy_ms": round(self.busy_seconds / self.cycles * 1000, 2) if self.cycles else 0.0,
+            "last_busy_ms": round(self.last_busy * 1000, 2),
+            "duty_cycle_pct": round(self.busy_seconds / wall * 100, 3) if wall > 0 else 0.0,
+        }
+
     @abstractmethod
     async def _run(self):
         """主循环：采集数据并 emit 到总线"""
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from .base import BaseSensor
+from .cron import CronExpression
+
+# 单次休眠上限：到点前分段休眠，醒来后用墙上时钟重新核对，
+# 使系统挂起 / 手动调时后不会错过或提前触发
+_MAX_SLEEP = 300.0
+
+
+class ScheduledJob:
+    """
+    定时任务 (Scheduled job)
+    - event: 到点时向总线发射的 chronos 事件文案 (可含 {time} 占位符)，为空则不发射
+    - skill_id / params: 到点时以后台任务执行的技能 (经 dispatcher.run_unattended 审计，PASS 才执行)
+    - catch_up: 错过的触发 (挂起 / 停机) 在 catch_up_window 秒内是否补跑一次
+    """
+    def __init__(self, name: str, cron: str, skill_id: Optional[str] = None, params: Optional[Dict[str, Any]] = None,
+                 event: Optional[str] = None, importance: float = 0.9, catch_up: bool = True,
+                 catch_up_window: float = 12 * 3600):
+        self.name = name
+        self.cron = CronExpression(cron)
+        self.skill_id = skill_id
+        self.params = params or {}
+        self.event = event
+        self.importance = importance
+        self.catch_up = catch_up
+        self.catch_up_window = catch_up_window
+        self.last_run: Optional[datetime] = None
+        self.next_run: Optional[datetime] = None
+        self.runs = 0
+        self.missed = 0
+
+
+# 默认日程：午夜自省 (记忆蒸馏) 与日志归档
+DEFAULT_JOBS = [
+    dict(name="midnight_reflection", cron="0 2 * * *", skill_id="memory_distiller", params={"action": "distill"},
+         event="午夜钟声响起 ({time})，系统进入沉思模式。"),
+    dict(name="mirror_archive", cron="30 3 * * *", skill_id="memory_archiver", params={"threshold": 5},
+         event=None, importance=0.3),
+]
+
+
+class ChronosSensor(BaseSensor):
+    """
+    时间意识传感器 (Cron-style Scheduler)
+    按 cron 表达式计算每个任务的下次触发时刻，并精确休眠到最早的那个时刻；
+    不再按固定间隔轮询“现在是不是 02:00”。
+    各任务的上次运行时间持久化到 state_path，重启或挂起恢复后对错过的触发补跑一次 (多次错过只补一次)。
+    """
+    def __init__(self, bus, jobs: Optional[List[ScheduledJob]] = None,
+                 state_path: str = os.path.join("logs", "chronos_state.json")):
+        super().__init__("ChronosSensor", bus)
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.state_path = state_path
+        for job in (jobs if jobs is not None else [ScheduledJob(**spec) for spec in DEFAULT_JOBS]):
+            self.add_job(job)
+
+    def add_job(self, job: ScheduledJob):
+        self.jobs[job.name] = job
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name, iso in data.items():
+            if name in self.jobs:
+                try:
+                    self.jobs[name].last_run = datetime.fromisoformat(iso)
+                except (TypeError, ValueError):
+                    continue
+
+    def _save_state(self):
+        data = {name: job.last_run.isoformat() for name, job in self.jobs.items() if job.last_run}
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            tmp = f"{self.state_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            print(f"[感知器] ChronosSensor 状态保存失败: {e}")
+
+    def _plan(self, now: datetime):
+        """为每个任务计算下次触发时刻；首次运行的任务从现在开始计时 (不补跑)"""
+        for job in self.jobs.values():
+            job.next_run = job.cron.next_after(job.last_run or now)
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": job.name,
+                "cron": job.cron.expr,
+                "skill": job.skill_id,
+                "next_run": job.next_run.isoformat() if job.next_run else None,
+                "last_run": job.last_run.isoformat() if job.last_run else None,
+                "runs": job.runs,
+                "missed": job.missed,
+            }
+            for job in self.jobs.values()
+        ]
+
+    async def _fire(self, job: ScheduledJob, scheduled: datetime, now: datetime):
+        late = (now - scheduled).total_seconds()
+        if late > 60:
+            # 错过的触发 (挂起 / 停机)：窗口内补跑一次，否则跳过
+            if not job.catch_up or late > job.catch_up_window:
+                job.missed += 1
+                print(f"[感知器] 定时任务 {job.name} 错过了 {scheduled.strftime('%m-%d %H:%M')} 的触发，已跳过。")
+                return
+            print(f"[感知器] 定时任务 {job.name} 补跑 ({scheduled.strftime('%m-%d %H:%M')} 的触发)。")
+
+        job.runs += 1
+        if job.event:
+            await self.emit(
+                source="chronos",
+                data=job.event.format(time=scheduled.strftime("%H:%M")),
+                importance=job.importance
+            )
+
+        dispatcher = getattr(self.bus, "dispatcher", None)
+        if job.skill_id and dispatcher is not None:
+            from ..schema import TaskContext, TaskStatus, Message, MessageRole
+            context = TaskContext(
+                task_id=f"chronos_{uuid.uuid4().hex[:6]}",
+                status=TaskStatus.RUNNING,
+                messages=[Message(role=MessageRole.SYSTEM, content=f"[时间意识] 定时任务 {job.name} ({job.cron.expr}) 到点执行。")],
+                metadata={
+                    "is_background": True,
+                    "scheduled_job": job.name,
+                    "scheduled_for": scheduled.isoformat(),
+                    "intent": {"target_skill_id": job.skill_id, "parameters": dict(job.params)}
+                }
+            )
+            dispatcher.track_task(context)
+            # 定时任务无人值守，同样必须经过审计管线 (WARN 无人确认，视为未放行)
+            await dispatcher.run_unattended(context)
+
+    async def _run(self):
+        self._load_state()
+        self._plan(datetime.now())
+
+        while self.running:
+            if not self.jobs:
+                await asyncio.sleep(_MAX_SLEEP)
+                continue
+            now = datetime.now()
+            due_at = min(job.next_run for job in self.jobs.values())
+            delay = (due_at - now).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(min(delay, _MAX_SLEEP))
+                continue
+
+            for job in self.jobs.values():
+                if job.next_run > now:
+                    continue
+                scheduled = job.next_run
+                # 多次错过时只保留最近的一次触发
+                latest = job.cron.next_after(scheduled)
+                while latest <= now:
+                    job.missed += 1
+                    scheduled, latest = latest, job.cron.next_after(latest)
+                started = time.perf_counter()
+                try:
+                    await self._fire(job, scheduled, now)
+                except Exception as e:
+                    print(f"[感知器] 定时任务 {job.name} 执行异常: {type(e).__name__}: {str(e)}")
+                self._record_cycle(time.perf_counter() - started)
+                job.last_run = scheduled
+                job.next_run = latest
+            self._save_state()
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+from typing import FrozenSet, List, Optional
+
+_MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+_MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+_DAYS = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+
+# (最小值, 最大值, 名称别名)
+_FIELDS = [
+    (0, 59, None),        # minute
+    (0, 23, None),        # hour
+    (1, 31, None),        # day of month
+    (1, 12, _MONTHS),     # month
+    (0, 7, _DAYS),        # day of week (0 与 7 都表示周日)
+]
+
+
+def _parse_value(token: str, names: Optional[List[str]]) -> int:
+    if names and token.lower() in names:
+        return names.index(token.lower()) + (1 if names is _MONTHS else 0)
+    return int(token)
+
+
+def _parse_field(text: str, low: int, high: int, names: Optional[List[str]]) -> FrozenSet[int]:
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"invalid step in cron field: {text!r}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            a, b = part.split("-", 1)
+            start, end = _parse_value(a, names), _parse_value(b, names)
+        else:
+            start = _parse_value(part, names)
+            end = high if step > 1 else start  # "5/15" 等价于 "5-max/15"
+        if start < low or end > high or start > end:
+            raise ValueError(f"cron field out of range: {text!r}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronExpression:
+    """
+    标准 5 字段 cron 表达式 (分 时 日 月 周)
+    支持 *, 列表 (1,15), 范围 (1-5), 步长 (*/10), 月份/星期英文缩写及 @daily 等宏。
+    日与周同时受限时按 cron 惯例取并集。
+    """
+    def __init__(self, expr: str):
+        self.expr = expr.strip()
+        fields = _MACROS.get(self.expr.lower(), self.expr).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expr!r}")
+        parsed = [_parse_field(f, *spec) for f, spec in zip(fields, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, dow = parsed
+        self.weekdays = frozenset(d % 7 for d in dow)
+        self._dom_any = fields[2] == "*"
+        self._dow_any = fields[4] == "*"
+
+    def __repr__(self):
+        return f"CronExpression({self.expr!r})"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        dom = dt.day in self.days
+        dow = (dt.weekday() + 1) % 7 in self.weekdays  # Python: 周一=0；cron: 周日=0
+        if self._dom_any or self._dow_any:
+            return dom and dow
+        return dom or dow
+
+    def matches(self, dt: datetime) -> bool:
+        return (dt.minute in self.minutes and dt.hour in self.hours
+                and dt.month in self.months and self._day_matches(dt))
+
+    def next_after(self, dt: datetime) -> datetime:
+        """严格晚于 dt 的下一个触发时刻 (精确到分钟)，逐级跳过不匹配的月/日/时"""
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                year, month = (t.year + 1, 1) if t.month == 12 else (t.year, t.month + 1)
+                t = t.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            if t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+                continue
+            return t
+        raise ValueError(f"cron expression never fires: {self.expr!r}")
@@ -1,108 +1,725 @@
 import asyncio
+import errno
 import os
 import hashlib
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
 from .base import BaseSensor
+from .state_cache import FileRecord, load_file_index, save_file_index
+from .watchset import WatchRoot, WatchSetConfig
+from .inotify import (
+    Inotify, inotify_available,
+    IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE,
+    IN_DELETE, IN_DELETE_SELF, IN_MOVE_SELF, IN_Q_OVERFLOW, IN_ONLYDIR, IN_DONT_FOLLOW, IN_EXCL_UNLINK,
+)
+
+_WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+    | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+)
+_GONE_MASK = IN_DELETE | IN_MOVED_FROM
+_APPEAR_MASK = IN_CREATE | IN_MOVED_TO
+
+HASH_MODES = ("sha256", "blake2b")
+_READ_BUFFER = 1024 * 1024
+_PARTIAL_SPAN = 64 * 1024
+
+
+def _new_hasher(mode: str):
+    return hashlib.blake2b(digest_size=20) if mode == "blake2b" else hashlib.sha256()
+
+
+def compute_fingerprint(fpath: str, mode: str = "sha256", partial_threshold: int = 5 * 1024 * 1024) -> Optional[str]:
+    """
+    计算文件内容指纹 (在工作线程中执行)。
+    - 小于 partial_threshold 的文件：全量哈希 (sha256 / blake2b)
+    - 大文件：头部 + 尾部各 64KB 再加文件大小的部分指纹，以 "partial:" 前缀区分
+    """
+    try:
+        hasher = _new_hasher(mode)
+        with open(fpath, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size > partial_threshold:
+                hasher.update(size.to_bytes(8, "little"))
+                hasher.update(f.read(_PARTIAL_SPAN))
+                f.seek(max(size - _PARTIAL_SPAN, _PARTIAL_SPAN))
+                hasher.update(f.read(_PARTIAL_SPAN))
+                return "partial:" + hasher.hexdigest()
+            for chunk in iter(lambda: f.read(_READ_BUFFER), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+    except OSError:
+        return None
+
+
+class _DirSnapshot(NamedTuple):
+    """轮询模式下缓存的目录列表 (Cached scandir listing)"""
+    mtime_ns: int
+    subdirs: List[str]
+    files: List[str]
+
+
+class _WatchedRoot:
+    """单个监控根目录的运行时状态：匹配规则、文件索引、目录缓存与扫描耗时"""
+    def __init__(self, spec: WatchRoot, state_path: str):
+        self.path = spec.path
+        self.matcher = spec.matcher
+        self.signature = spec.signature
+        self.state_path = state_path
+        self.index: Dict[str, FileRecord] = {}
+        self.dir_cache: Dict[str, _DirSnapshot] = {}
+        self.ready = False        # 初始扫描已完成
+        self.warm = False         # 索引来自持久化缓存
+        self.dirty = False
+        self.saved_at = 0.0
+        self.scans = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.total_ms = 0.0
+
+    def rel(self, path: str) -> str:
+        """以 / 分隔的相对路径 (匹配规则使用)"""
+        if path == self.path:
+            return ""
+        rel = path[len(self.path) + 1:]
+        return rel.replace(os.sep, "/") if os.sep != "/" else rel
+
+    def contains(self, path: str) -> bool:
+        return path == self.path or path.startswith(self.path.rstrip(os.sep) + os.sep)
+
+    def record_scan(self, seconds: float):
+        ms = seconds * 1000
+        self.scans += 1
+        self.last_ms = ms
+        self.max_ms = max(self.max_ms, ms)
+        self.total_ms += ms
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self.index),
+            "dirs_cached": len(self.dir_cache),
+            "scans": self.scans,
+            "last_ms": round(self.last_ms, 2),
+            "avg_ms": round(self.total_ms / self.scans, 2) if self.scans else 0.0,
+            "max_ms": round(self.max_ms, 2),
+        }
+
 
 class FileSensor(BaseSensor):
     """
     文件变更传感器 (File Watcher Sensor)
     智能监听特定目录的变更，建立“内容级开发意识”。
+    watchset: 监控集配置 (WatchSetConfig)，可声明多个根目录及各自的 include/exclude glob 与扩展名，
+    配置文件修改后在下一轮循环内热加载，无需重启；未提供时仅监控 watch_path (使用内置排除清单)。
+    backend:
+    - "inotify": Linux 下事件驱动，增量接收创建/修改/删除事件
+    - "poll": 周期性增量扫描 (目录 mtime 未变则复用缓存列表)
+    - "auto": 优先 inotify，不可用时退回轮询；watch 数量耗尽的子树单独轮询
+    sweep_batch: 轮询时每轮对未变化目录中的文件逐一 stat 的数量上限，按目录轮转抽查，
+    用于捕获不改变目录 mtime 的原地写入；每轮开销固定，不随工作区规模增长
+    (文件数不超过 sweep_batch 的小目录树每轮都被完整抽查，更大的树在 ceil(文件数 / sweep_batch) 轮内覆盖一遍)。
+    hash_mode: "sha256" (默认) 或更快的 "blake2b"；超过 partial_threshold 的大文件使用头尾部分指纹。
+    hash_workers: 哈希线程池并发上限，哈希计算不再占用事件循环。
+    interval / max_interval: 轮询间隔 (及 inotify 模式下的兜底检查间隔)。轮询模式默认固定间隔，显式传入 max_interval 才退避；
+    inotify 模式下事件即时唤醒，兜底检查无变更时退避到 max_interval (默认 interval*8)，存在退回轮询的子树时保持 interval。
+    state_dir: 各根目录文件索引 (path -> mtime, size, inode, hash) 的持久化目录，停止时及每 state_save_interval 秒保存；
+    启动时加载后只重新哈希 stat 发生变化的文件，停机期间的变更会作为真实事件上报。
     """
-    def __init__(self, bus, watch_path: str, interval: int = 5):
-        super().__init__("FileSensor", bus)
-        self.watch_path = watch_path
-        self.interval = interval
-        self.last_mtimes = {}
-        self.last_hashes = {} # 内容级校验 (Content-level check)
+    def __init__(self, bus, watch_path: Optional[str] = None, interval: int = 5, backend: str = "auto",
+                 debounce: float = 0.2, sweep_batch: int = 256, hash_mode: str = "sha256", hash_workers: int = 4,
+                 partial_threshold: int = 5 * 1024 * 1024, state_dir: Optional[str] = None,
+                 state_save_interval: float = 300.0, watchset: Optional[WatchSetConfig] = None,
+                 max_interval: Optional[float] = None):
+        super().__init__("FileSensor", bus, interval=interval, max_interval=max_interval)
+        self._inotify_max_interval = max(max_interval or interval * 8, interval)
+        if watchset is None:
+            if watch_path is None:
+                raise ValueError("FileSensor requires watch_path or watchset")
+            watchset = WatchSetConfig(None, default_root=watch_path)
+        self.watchset = watchset
+        self.watch_path = os.path.abspath(watch_path) if watch_path else watchset.default_root
+        self.roots: Dict[str, _WatchedRoot] = {}
+        self.backend = backend
+        self.debounce = debounce
+        self.initial_scan_done = False
+        self.active_backend = None
+        self._silent = False  # 规则热加载后的重扫不上报事件
+
+        # --- 哈希线程池 ---
+        if hash_mode not in HASH_MODES:
+            raise ValueError(f"unknown hash_mode: {hash_mode}")
+        self.hash_mode = hash_mode
+        self.hash_workers = max(1, hash_workers)
+        self.partial_threshold = partial_threshold
+        self._hash_pool = None
+        self._to_check: List[Tuple[_WatchedRoot, str, os.stat_result]] = []
+
+        # --- 持久化索引 (Warm start) ---
+        self.state_dir = state_dir or os.path.join("logs", "sensor_state")
+        self.state_save_interval = state_save_interval
+
+        # --- 增量轮询状态 ---
+        self.sweep_batch = max(1, sweep_batch)
+        self._sweep_queues: Dict[str, Deque[str]] = {}  # 子树 -> 本轮抽查尚未轮到的目录
+
+        # --- inotify 状态 ---
+        self._inotify = None
+        self._polled_roots = set()  # watch 耗尽后退回轮询的子树
+        self._pending_files = set()
+        self._pending_dirs = set()
+        self._removed_dirs = set()
+        self._rescan_all = False
+        self._wakeup = asyncio.Event()
+
+    @property
+    def index(self) -> Dict[str, FileRecord]:
+        """全部根目录的文件索引合并视图 (只读用途)"""
+        if len(self.roots) == 1:
+            return next(iter(self.roots.values())).index
+        return {p: rec for root in self.roots.values() for p, rec in root.index.items()}
+
+    def scan_stats(self) -> Dict[str, dict]:
+        """各监控根目录的扫描耗时与文件数 (Per-root scan timings)"""
+        return {path: root.stats() for path, root in self.roots.items()}
 
     def _compute_hash(self, fpath: str) -> str:
-        """计算文件的 SHA256 哈希值 (Compute content hash)"""
+        """计算文件的内容指纹 (Compute content hash)"""
+        return compute_fingerprint(fpath, self.hash_mode, self.partial_threshold)
+
+    async def _hash_many(self, paths: List[str]) -> List[Optional[str]]:
+        """在线程池中并行计算一批文件指纹"""
+        if self._hash_pool is None:
+            self._hash_pool = ThreadPoolExecutor(max_workers=self.hash_workers, thread_name_prefix="janus-hash")
+        loop = asyncio.get_running_loop()
+        # 按 worker 数切片，每个线程顺序处理一片，摊薄小文件的调度开销
+        step = -(-len(paths) // self.hash_workers)
+        chunks = [paths[i:i + step] for i in range(0, len(paths), step)]
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self._hash_pool, lambda c=c: [self._compute_hash(p) for p in c]) for c in chunks
+        ))
+        return [h for chunk in results for h in chunk]
+
+    async def stop(self):
+        await super().stop()
+        if self._hash_pool:
+            self._hash_pool.shutdown(wait=False, cancel_futures=True)
+            self._hash_pool = None
+        await self._save_states()
+
+    # --- 索引持久化 (State cache) ---
+
+    def _state_meta(self) -> dict:
+        return {"hash_mode": self.hash_mode, "partial_threshold": self.partial_threshold}
+
+    def _state_path_for(self, root_path: str) -> str:
+        root_tag = hashlib.sha1(root_path.encode("utf-8")).hexdigest()[:10]
+        return os.path.join(self.state_dir, f"file_sensor_{root_tag}.json.gz")
+
+    async def _load_state(self, root: _WatchedRoot):
+        index = await asyncio.to_thread(load_file_index, root.state_path, root.path, self._state_meta())
+        if index:
+            root.index = index
+            root.warm = True
+            print(f"[感知器] FileSensor 已从缓存恢复 {root.path} 的 {len(index)} 个文件指纹 (热启动)。")
+        root.saved_at = time.monotonic()
+
+    async def _save_state(self, root: _WatchedRoot, force: bool = True):
+        if not root.dirty:
+            return
+        if not force and time.monotonic() - root.saved_at < self.state_save_interval:
+            return
+        snapshot = dict(root.index)
+        root.dirty = False
+        root.saved_at = time.monotonic()
         try:
-            # 性能优化：大于 5MB 的文件跳过哈希，仅记录时间戳
-            if os.path.getsize(fpath) > 5 * 1024 * 1024:
-                return "large_file_skip_hash"
-                
-            hash_sha256 = hashlib.sha256()
-            with open(fpath, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_sha256.update(chunk)
-            return hash_sha256.hexdigest()
-        except:
-            return None
+            await asyncio.to_thread(save_file_index, root.state_path, root.path, self._state_meta(), snapshot)
+        except OSError as e:
+            root.dirty = True
+            print(f"[感知器] FileSensor 索引保存失败: {e}")
 
-    async def _run(self):
-        if not os.path.exists(self.watch_path):
-            print(f"[感知器] 错误: 路径 {self.watch_path} 不存在，停止监听。")
+    async def _save_states(self, force: bool = True):
+        for root in list(self.roots.values()):
+            await self._save_state(root, force=force)
+
+    def _report_changes(self, root: _WatchedRoot) -> bool:
+        """初始扫描默认静默；热启动时停机期间的变更需要如实上报"""
+        return not self._silent and (root.ready or root.warm)
+
+    def _rel(self, root: _WatchedRoot, fpath: str) -> str:
+        rel = os.path.relpath(fpath, root.path)
+        # 多根目录时带上根目录名，避免同名相对路径混淆
+        return rel if len(self.roots) <= 1 else os.path.join(os.path.basename(root.path), rel)
+
+    def _root_for(self, path: str) -> Optional[_WatchedRoot]:
+        """路径所属的监控根目录 (根目录嵌套时取最长前缀)"""
+        best = None
+        for root in self.roots.values():
+            if root.contains(path) and (best is None or len(root.path) > len(best.path)):
+                best = root
+        return best
+
+    async def _check_file(self, root: _WatchedRoot, fpath: str, st: os.stat_result):
+        """stat 变化的文件进入待校验队列，攒够一批后统一并行哈希"""
+        rec = root.index.get(fpath)
+        if rec is not None and rec.mtime == st.st_mtime and rec.size == st.st_size and rec.ino == st.st_ino:
+            return
+        self._to_check.append((root, fpath, st))
+        if len(self._to_check) >= self.hash_workers * 16:
+            await self._flush_checks()
+
+    async def _flush_checks(self):
+        # [AI-SAFEGUARD]: 内容感知双检逻辑锁定
+        # 严禁改为纯 mtime 检查。mtime 在某些环境下（如 Git 切换）不可靠。
+        # 必须保持 (mtime 触发 -> 哈希校验 -> 最终确认) 的双重过滤路径。
+        batch, self._to_check = self._to_check, []
+        if not batch:
+            return
+        hashes = await self._hash_many([fpath for _, fpath, _ in batch])
+
+        for (root, fpath, st), current_hash in zip(batch, hashes):
+            rec = root.index.get(fpath)
+            last_hash = rec.hash if rec else None
+
+            # 内容确实发生了改变 (Actual content change)
+            if last_hash and current_hash != last_hash and not self._silent:
+                await self.emit(
+                    source="visual",
+                    data=f"检测到活动文件变更: {self._rel(root, fpath)}",
+                    importance=0.4
+                )
+            # 新文件创建 (New file creation)
+            elif self._report_changes(root) and rec is None:
+                await self.emit(
+                    source="visual",
+                    data=f"检测到新文件创建: {self._rel(root, fpath)}",
+                    importance=0.5
+                )
+            # 静默启动：冷启动的初始扫描不触发感知事件，避免启动时阻塞
+
+            # 更新缓存
+            root.index[fpath] = FileRecord(st.st_mtime, st.st_size, st.st_ino, current_hash)
+            root.dirty = True
+
+    async def _handle_deleted(self, root: _WatchedRoot, fpath: str):
+        if root.index.pop(fpath, None) is None:
+            return
+        root.dirty = True
+        if self._report_changes(root):
+            await self.emit(
+                source="visual",
+                data=f"检测到文件删除: {self._rel(root, fpath)}",
+                importance=0.3
+            )
+
+    async def _handle_tree_removed(self, root: _WatchedRoot, top: str):
+        prefix = top.rstrip(os.sep) + os.sep
+        for fpath in [p for p in root.index if p.startswith(prefix)]:
+            await self._handle_deleted(root, fpath)
+
+    async def _scan_tree(self, root: _WatchedRoot, top: str, add_watches: bool = False):
+        """扫描 top 子树：比对文件变更并检测删除；add_watches=True 时同时为目录注册 inotify 监听"""
+        matcher = root.matcher
+        seen = set()
+        stack = [(top, root.rel(top), add_watches)]
+        while stack:
+            dirpath, rel_dir, watch = stack.pop()
+            if watch and not self._watch_dir(dirpath):
+                watch = False  # 该子树退回轮询
+            try:
+                with os.scandir(dirpath) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not matcher.dir_excluded(rel, entry.name):
+                            stack.append((entry.path, rel, watch))
+                        continue
+                    if not matcher.file_included(rel, entry.name):
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                seen.add(entry.path)
+                await self._check_file(root, entry.path, st)
+        await self._flush_checks()
+
+        prefix = top.rstrip(os.sep) + os.sep
+        for fpath in [p for p in root.index if p.startswith(prefix) and p not in seen]:
+            await self._handle_deleted(root, fpath)
+
+    async def _reconcile_index(self, root: _WatchedRoot):
+        """热启动或规则变化后的首轮轮询：索引中存在但本轮未列出的文件即为已删除 (或已移出监控范围) 的文件"""
+        listed = {os.path.join(d, name) for d, snap in root.dir_cache.items() for name in snap.files}
+        for fpath in [p for p in root.index if p not in listed]:
+            await self._handle_deleted(root, fpath)
+
+    @staticmethod
+    def _forget_dir_cache(root: _WatchedRoot, top: str):
+        prefix = top.rstrip(os.sep) + os.sep
+        for d in [d for d in root.dir_cache if d == top or d.startswith(prefix)]:
+            del root.dir_cache[d]
+
+    async def _poll_tree(self, root: _WatchedRoot, top: str, full_sweep: bool = False):
+        """
+        增量轮询 top 子树：每个目录只做一次 stat，仅重新列出 mtime 变化的目录；
+        文件 mtime 直接取自 DirEntry.stat()，不再额外调用 getmtime。
+        """
+        stack = [top]
+        while stack:
+            dirpath = stack.pop()
+            try:
+                dir_mtime = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                self._forget_dir_cache(root, dirpath)
+                await self._handle_tree_removed(root, dirpath)
+                continue
+
+            snap = root.dir_cache.get(dirpath)
+            if snap is None or snap.mtime_ns != dir_mtime:
+                snap = await self._relist_dir(root, dirpath, dir_mtime, snap)
+            elif full_sweep:
+                await self._stat_files(root, dirpath, snap)
+
+            stack.extend(os.path.join(dirpath, d) for d in snap.subdirs)
+        await self._flush_checks()
+
+    async def _stat_files(self, root: _WatchedRoot, dirpath: str, snap: _DirSnapshot):
+        """逐一 stat 未变化目录中的文件，捕获不改变目录 mtime 的原地写入"""
+        for name in snap.files:
+            fpath = os.path.join(dirpath, name)
+            try:
+                st = os.stat(fpath)
+            except FileNotFoundError:
+                await self._handle_deleted(root, fpath)
+                continue
+            except OSError:
+                continue
+            await self._check_file(root, fpath, st)
+
+    async def _sweep_slice(self, root: _WatchedRoot, top: str, budget: int) -> int:
+        """
+        轮转抽查 top 子树：从目录队列中依次取出目录并 stat 其中的文件，直到用完 budget，返回剩余额度。
+        队列耗尽时按当前目录缓存重新装填，每次调用最多装填一次 (小目录树每轮恰好抽查一遍)。
+        """
+        queue = self._sweep_queues.get(top)
+        prefix = top.rstrip(os.sep) + os.sep
+        refilled = False
+        while budget > 0:
+            if not queue:
+                if refilled:
+                    break
+                queue = self._sweep_queues[top] = deque(d for d in root.dir_cache if d == top or d.startswith(prefix))
+                refilled = True
+                if not queue:
+                    break
+            dirpath = queue.popleft()
+            snap = root.dir_cache.get(dirpath)
+            if snap is None:
+                continue  # 目录已删除
+            budget -= len(snap.files)
+            await self._stat_files(root, dirpath, snap)
+        await self._flush_checks()
+        return budget
+
+    async def _relist_dir(self, root: _WatchedRoot, dirpath: str, dir_mtime: int, old: _DirSnapshot) -> _DirSnapshot:
+        matcher = root.matcher
+        rel_dir = root.rel(dirpath)
+        subdirs, files = [], []
+        try:
+            with os.scandir(dirpath) as it:
+                entries = list(it)
+        except OSError:
+            entries = []
+        for entry in entries:
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not matcher.dir_excluded(rel, entry.name):
+                        subdirs.append(entry.name)
+                    continue
+                if not matcher.file_included(rel, entry.name):
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            files.append(entry.name)
+            await self._check_file(root, entry.path, st)
+
+        if old is not None:
+            for name in set(old.files).difference(files):
+                await self._handle_deleted(root, os.path.join(dirpath, name))
+            for name in set(old.subdirs).difference(subdirs):
+                gone = os.path.join(dirpath, name)
+                self._forget_dir_cache(root, gone)
+                await self._handle_tree_removed(root, gone)
+
+        snap = _DirSnapshot(dir_mtime, subdirs, files)
+        root.dir_cache[dirpath] = snap
+        return snap
+
+    # --- 监控集管理 (Watch-set roots & hot reload) ---
+
+    async def _full_scan(self, root: _WatchedRoot):
+        """对整个根目录做一次完整比对 (初始扫描 / 规则变化后重扫)"""
+        t = time.perf_counter()
+        if self._inotify:
+            await self._scan_tree(root, root.path, add_watches=True)
+        else:
+            await self._poll_tree(root, root.path, full_sweep=True)
+            await self._reconcile_index(root)
+        root.record_scan(time.perf_counter() - t)
+
+    async def _activate_root(self, spec: WatchRoot):
+        if not os.path.isdir(spec.path):
+            print(f"[感知器] 错误: 路径 {spec.path} 不存在，跳过该监控根目录。")
+            return
+        root = _WatchedRoot(spec, self._state_path_for(spec.path))
+        self.roots[root.path] = root
+        await self._load_state(root)
+        await self._full_scan(root)
+        root.ready = True
+        # 初始扫描完成后立即落盘一次，之后按 state_save_interval 节流
+        await self._save_state(root)
+        print(f"[感知器] FileSensor 正在监控 {root.path} ({len(root.index)} 个文件，{root.last_ms:.0f} ms)。")
+
+    async def _deactivate_root(self, path: str):
+        root = self.roots.pop(path, None)
+        if root is None:
             return
+        await self._save_state(root)
+        if self._inotify:
+            self._inotify.forget_tree(path)
+        self._polled_roots = {r for r in self._polled_roots if not root.contains(r)}
+        for top in [t for t in self._sweep_queues if root.contains(t)]:
+            del self._sweep_queues[top]
+        print(f"[感知器] FileSensor 已停止监控 {path}。")
+
+    async def _reload_watchset(self):
+        """监控集配置变化时热加载：增删根目录，规则变化的根目录静默重扫"""
+        if not self.watchset.changed():
+            return
+        specs = {spec.path: spec for spec in self.watchset.load()}
+        print(f"[感知器] 监控集配置已变更，重新加载 ({len(specs)} 个根目录)。")
+
+        for path in [p for p in self.roots if p not in specs]:
+            await self._deactivate_root(path)
+
+        for path, spec in specs.items():
+            root = self.roots.get(path)
+            if root is None:
+                # 新增根目录的既有文件不视为“新建”
+                self._silent = True
+                try:
+                    await self._activate_root(spec)
+                finally:
+                    self._silent = False
+            elif root.signature != spec.signature:
+                root.matcher, root.signature = spec.matcher, spec.signature
+                root.dir_cache.clear()
+                self._silent = True
+                try:
+                    await self._full_scan(root)
+                finally:
+                    self._silent = False
+
+    def _reset_backend(self):
+        """丢弃上一次主循环遗留的 inotify 实例与待处理事件 (崩溃后由监督协程重启时)"""
+        if self._inotify is not None:
+            try:
+                asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            except (ValueError, OSError):
+                pass
+            self._inotify.close()
+            self._inotify = None
+        self._polled_roots.clear()
+        self._sweep_queues.clear()
+        self._pending_files.clear()
+        self._pending_dirs.clear()
+        self._removed_dirs.clear()
+        self._rescan_all = False
+        self._wakeup.clear()
 
-        initial_scan_done = False
-        import sys
-        import time
-        
+    async def _run(self):
+        self._reset_backend()
+        if self.backend in ("auto", "inotify") and inotify_available():
+            try:
+                self._inotify = Inotify()
+            except OSError as e:
+                print(f"[感知器] inotify 初始化失败 ({e})，退回轮询模式。")
+        elif self.backend == "inotify":
+            print(f"[感知器] 当前平台不支持 inotify，退回轮询模式。")
+        self.active_backend = "inotify" if self._inotify else "poll"
+        if self._inotify:
+            # 事件驱动时计时器只做兜底，可放心退避；轮询模式退避会直接拉长变更发现延迟
+            self.max_interval = self._inotify_max_interval
+
+        loop = asyncio.get_running_loop()
+        if self._inotify:
+            loop.add_reader(self._inotify.fd, self._on_inotify_readable)
+        try:
+            t = time.perf_counter()
+            if not self.initial_scan_done:
+                for spec in self.watchset.load():
+                    await self._activate_root(spec)
+                self.initial_scan_done = True
+            else:
+                # 重启：新的 inotify 实例没有任何 watch，为已有根目录重新注册监听，并对账停机期间的变更
+                for root in list(self.roots.values()):
+                    await self._full_scan(root)
+            if not self.roots:
+                print(f"[感知器] 警告: 没有可用的监控根目录，等待监控集配置更新。")
+            busy = time.perf_counter() - t
+
+            if self._inotify:
+                await self._run_inotify(busy)
+            else:
+                await self._run_poll(busy)
+        finally:
+            if self._inotify:
+                loop.remove_reader(self._inotify.fd)
+                self._inotify.close()
+                self._inotify = None
+
+    async def _poll_once(self):
+        """轮询模式的一轮：增量轮询各根目录，再按 sweep_batch 轮转抽查未变化目录中的文件"""
+        await self._reload_watchset()
+        budget = self.sweep_batch
+        for root in list(self.roots.values()):
+            t = time.perf_counter()
+            await self._poll_tree(root, root.path)
+            budget = await self._sweep_slice(root, root.path, budget)
+            root.record_scan(time.perf_counter() - t)
+        await self._save_states(force=False)
+
+    async def _run_poll(self, busy: float):
+        while self.running:
+            await self._cycle_sleep(busy)
+            started = time.perf_counter()
+            try:
+                await self._poll_once()
+            except Exception as e:
+                print(f"[感知器] FileSensor 运行时严重异常: {type(e).__name__}: {str(e)}")
+                sys.stdout.flush()
+            busy = time.perf_counter() - started
+
+    # --- inotify 后端 (Event-driven backend) ---
+
+    def _watch_dir(self, dirpath: str) -> bool:
+        try:
+            self._inotify.add_watch(dirpath, _WATCH_MASK)
+            return True
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                if not self._polled_roots:
+                    print(f"[感知器] inotify watch 数量已耗尽 (fs.inotify.max_user_watches)，剩余子树退回轮询。")
+                self._polled_roots.add(dirpath)
+            return False
+
+    def _on_inotify_readable(self):
+        for event in self._inotify.read_events():
+            if event.mask & IN_Q_OVERFLOW:
+                self._rescan_all = True
+                continue
+            if event.mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if event.path in self.roots:
+                    self._rescan_all = True
+                continue
+            root = self._root_for(event.path)
+            if root is None:
+                continue
+            name = os.path.basename(event.path)
+            rel = root.rel(event.path)
+            if event.is_dir:
+                if root.matcher.dir_excluded(rel, name):
+                    continue
+                if event.mask & _APPEAR_MASK:
+                    self._pending_dirs.add(event.path)
+                elif event.mask & _GONE_MASK:
+                    self._removed_dirs.add(event.path)
+            elif root.matcher.file_included(rel, name):
+                self._pending_files.add(event.path)
+        self._wakeup.set()
+
+    async def _run_inotify(self, busy: float):
         while self.running:
+            # 事件到达即刻唤醒；超时只用于兜底轮询与配置热加载，空闲时逐步退避
+            self._record_cycle(busy)
+            interval = self._next_interval()
+            if self._polled_roots:
+                # watch 耗尽的子树只能靠本计时器轮询，不退避
+                interval = self.current_interval = self.interval
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, interval - busy))
+                await asyncio.sleep(self.debounce)  # 合并突发写入
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            started = time.perf_counter()
             try:
-                # 强制排除项
-                exclude_dirs = {
-                    'logs', '.git', '__pycache__', '.venv', 'dist', 'build', 
-                    'instance', 'memory', 'node_modules', '.idea', '.vscode', 'tmp'
-                }
-                exclude_files = {'knowledge.json', '.DS_Store', 'uv.lock', '.janus_history'}
-                
-                current_files = []
-                now = time.time()
-                
-                for root, dirs, files in os.walk(self.watch_path):
-                    dirs[:] = [d for d in dirs if d not in exclude_dirs]
-                    
-                    for f in files:
-                        if f in exclude_files: continue
-                        if f.endswith(('.py', '.js', '.md', '.json', '.html', '.css', '.sh')):
-                            current_files.append(os.path.join(root, f))
-                
-                for fpath in current_files:
-                    try:
-                        mtime = os.path.getmtime(fpath)
-                    except (OSError, FileNotFoundError): continue
-                        
-                    rel_path = os.path.relpath(fpath, self.watch_path)
-                    
-                    # [AI-SAFEGUARD]: 内容感知双检逻辑锁定
-                    # 严禁改为纯 mtime 检查。mtime 在某些环境下（如 Git 切换）不可靠。
-                    # 必须保持 (mtime 触发 -> 哈希校验 -> 最终确认) 的双重过滤路径。
-                    changed_mtime = fpath not in self.last_mtimes or mtime > self.last_mtimes[fpath]
-                    
-                    if changed_mtime:
-                        current_hash = self._compute_hash(fpath)
-                        last_hash = self.last_hashes.get(fpath)
-                        
-                        # 内容确实发生了改变 (Actual content change)
-                        if last_hash and current_hash != last_hash:
-                            await self.bus.emit(
-                                source="visual",
-                                data=f"检测到活动文件变更: {rel_path}",
-                                importance=0.4
-                            )
-                        # 新文件创建 (New file creation)
-                        elif initial_scan_done and not last_hash:
-                            await self.bus.emit(
-                                source="visual",
-                                data=f"检测到新文件创建: {rel_path}",
-                                importance=0.5
-                            )
-                        # 初始扫描的活跃文件 (Initial scan activity)
-                        # 静默启动：初始扫描时不触发感知事件，避免启动时阻塞
-                        elif not initial_scan_done and now - mtime < 120:
-                            pass  # 静默记录，不触发感知事件
-                        
-                        # 更新缓存
-                        self.last_hashes[fpath] = current_hash
-                        self.last_mtimes[fpath] = mtime
-                
-                initial_scan_done = True
-                
+                await self._reload_watchset()
+                await self._drain_inotify()
+                # watch 耗尽的子树仍按固定间隔 (增量) 轮询
+                if self._polled_roots:
+                    budget = self.sweep_batch
+                    for top in list(self._polled_roots):
+                        root = self._root_for(top)
+                        if root is None or not os.path.isdir(top):
+                            self._polled_roots.discard(top)
+                        if root is not None:
+                            t = time.perf_counter()
+                            await self._poll_tree(root, top)
+                            budget = await self._sweep_slice(root, top, budget)
+                            root.record_scan(time.perf_counter() - t)
+                await self._save_states(force=False)
             except Exception as e:
                 print(f"[感知器] FileSensor 运行时严重异常: {type(e).__name__}: {str(e)}")
                 sys.stdout.flush()
-            
-            await asyncio.sleep(self.interval)
+            busy = time.perf_counter() - started
+
+    async def _drain_inotify(self):
+        if self._rescan_all:
+            # 内核事件队列溢出：无法得知丢失了什么，做一次全量对账
+            self._rescan_all = False
+            self._pending_files.clear()
+            self._pending_dirs.clear()
+            self._removed_dirs.clear()
+            for root in list(self.roots.values()):
+                await self._full_scan(root)
+            return
 
+        removed, self._removed_dirs = self._removed_dirs, set()
+        for dirpath in removed:
+            self._inotify.forget_tree(dirpath)
+            self._polled_roots = {r for r in self._polled_roots if not (r == dirpath or r.startswith(dirpath + os.sep))}
+            root = self._root_for(dirpath)
+            if root is not None:
+                self._forget_dir_cache(root, dirpath)
+                await self._handle_tree_removed(root, dirpath)
+
+        created, self._pending_dirs = self._pending_dirs, set()
+        for dirpath in created:
+            root = self._root_for(dirpath)
+            if root is not None and os.path.isdir(dirpath):
+                await self._scan_tree(root, dirpath, add_watches=True)
+
+        files, self._pending_files = self._pending_files, set()
+        for fpath in files:
+            root = self._root_for(fpath)
+            if root is None:
+                continue
+            try:
+                st = os.stat(fpath)
+            except FileNotFoundError:
+                await self._handle_deleted(root, fpath)
+                continue
+            except OSError:
+                continue
+            await self._check_file(root, fpath, st)
+        await self._flush_checks()
@@ -0,0 +1,159 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+import sys
+from typing import Dict, List, NamedTuple
+
+# --- inotify 常量 (linux/inotify.h) ---
+IN_ACCESS = 0x00000001
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+_libc = None
+
+
+def _load_libc():
+    """通过 ctypes 绑定 libc 的 inotify 接口，不可用时返回 None"""
+    global _libc
+    if _libc is not None:
+        return _libc or None
+    _libc = False
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_init1.restype = ctypes.c_int
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_add_watch.restype = ctypes.c_int
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        libc.inotify_rm_watch.restype = ctypes.c_int
+    except (OSError, AttributeError):
+        return None
+    _libc = libc
+    return libc
+
+
+def inotify_available() -> bool:
+    return _load_libc() is not None
+
+
+def _raise_errno():
+    err = ctypes.get_errno()
+    raise OSError(err, os.strerror(err))
+
+
+class InotifyEvent(NamedTuple):
+    path: str       # 事件对应的完整路径 (目录自身事件时为被监听目录)
+    mask: int
+    cookie: int
+
+    @property
+    def is_dir(self) -> bool:
+        return bool(self.mask & IN_ISDIR)
+
+
+class Inotify:
+    """
+    最小化的 inotify 封装 (ctypes, 无第三方依赖)
+    fd 为非阻塞模式，可直接交给 asyncio loop.add_reader 使用。
+    """
+    def __init__(self):
+        libc = _load_libc()
+        if libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+        self._libc = libc
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            _raise_errno()
+        self.fd = fd
+        self._wd_to_path: Dict[int, str] = {}
+        self._path_to_wd: Dict[str, int] = {}
+
+    @property
+    def watch_count(self) -> int:
+        return len(self._wd_to_path)
+
+    def add_watch(self, path: str, mask: int) -> int:
+        """添加监听；watch 数量耗尽时抛出 errno=ENOSPC 的 OSError"""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            _raise_errno()
+        self._wd_to_path[wd] = path
+        self._path_to_wd[path] = wd
+        return wd
+
+    def rm_watch(self, path: str):
+        wd = self._path_to_wd.pop(path, None)
+        if wd is None:
+            return
+        self._wd_to_path.pop(wd, None)
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def forget_tree(self, top: str):
+        """移除 top 及其子目录的全部监听 (目录被移出监控范围时使用)"""
+        prefix = top.rstrip(os.sep) + os.sep
+        for path in [p for p in self._path_to_wd if p == top or p.startswith(prefix)]:
+            self.rm_watch(path)
+
+    def read_events(self) -> List[InotifyEvent]:
+        """读空内核缓冲区并解析事件 (非阻塞)"""
+        events = []
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buf):
+                wd, mask, cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                name = buf[offset:offset + length].rstrip(b"\0")
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    events.append(InotifyEvent("", mask, cookie))
+                    continue
+
+                dirpath = self._wd_to_path.get(wd)
+                if mask & IN_IGNORED:
+                    # 内核已自动移除该 watch (目录删除 / rm_watch)
+                    if dirpath is not None:
+                        self._wd_to_path.pop(wd, None)
+                        if self._path_to_wd.get(dirpath) == wd:
+                            del self._path_to_wd[dirpath]
+                    continue
+                if dirpath is None:
+                    continue
+                path = os.path.join(dirpath, os.fsdecode(name)) if name else dirpath
+                events.append(InotifyEvent(path, mask, cookie))
+        return events
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+            self._wd_to_path.clear()
+            self._path_to_wd.clear()
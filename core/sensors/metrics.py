@@ -0,0 +1,76 @@
+import collections
+import threading
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+class MetricsRegistry:
+    """
+    进程内的小型时间序列存储 (In-memory metric time series)
+    每个指标保留最近 maxlen 个采样点 (timestamp, value)，供 health_monitor / system_stats 直接读取，
+    无需再 fork df / du 等外部命令。
+    """
+    def __init__(self, maxlen: int = 360):
+        self.maxlen = maxlen
+        self._series: Dict[str, Deque[Tuple[float, float]]] = {}
+        self._lock = threading.Lock()  # 动态技能可能在线程中读取
+
+    def record(self, name: str, value: float, ts: Optional[float] = None):
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = collections.deque(maxlen=self.maxlen)
+            series.append((ts, value))
+
+    def latest(self, name: str, default: Optional[float] = None) -> Optional[float]:
+        series = self._series.get(name)
+        return series[-1][1] if series else default
+
+    def series(self, name: str, window: Optional[float] = None) -> List[Tuple[float, float]]:
+        """返回采样点列表；给出 window (秒) 时只返回最近这段时间的采样"""
+        with self._lock:
+            points = list(self._series.get(name, ()))
+        if window is not None and points:
+            cutoff = points[-1][0] - window
+            points = [p for p in points if p[0] >= cutoff]
+        return points
+
+    def summary(self, name: str, window: Optional[float] = None) -> Optional[Dict[str, float]]:
+        points = self.series(name, window)
+        if not points:
+            return None
+        values = [v for _, v in points]
+        return {
+            "last": values[-1],
+            "min": min(values),
+            "avg": round(sum(values) / len(values), 3),
+            "max": max(values),
+            "samples": len(values),
+        }
+
+    def slope(self, name: str, window: float) -> Optional[float]:
+        """最小二乘估计的变化率 (单位/秒)，采样不足时返回 None"""
+        points = self.series(name, window)
+        if len(points) < 3:
+            return None
+        t0 = points[0][0]
+        xs = [t - t0 for t, _ in points]
+        ys = [v for _, v in points]
+        mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+        var = sum((x - mx) ** 2 for x in xs)
+        if var == 0:
+            return None
+        return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / var
+
+    def snapshot(self) -> Dict[str, float]:
+        """所有指标的最新值"""
+        with self._lock:
+            return {name: series[-1][1] for name, series in self._series.items() if series}
+
+    def names(self) -> List[str]:
+        return sorted(self._series)
+
+
+# 全局系统指标表：由 SystemSensor 写入，技能与诊断模块只读
+SYSTEM_METRICS = MetricsRegistry()
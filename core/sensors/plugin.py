@@ -0,0 +1,316 @@
+import asyncio
+import importlib.util
+import inspect
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from .base import BaseSensor
+from ..schema import SensorManifest
+
+ISOLATION_MODES = ("inline", "thread", "process")
+
+# 内联 sense() 单次阻塞超过该时长即视为拖慢事件循环，连续 3 次后自动改用线程隔离
+_BLOCK_THRESHOLD = 0.05
+_BLOCK_STRIKES = 3
+_QUEUE_SIZE = 1000
+
+
+def load_sensor_module(module_path: str, manifest_id: str):
+    spec = importlib.util.spec_from_file_location(f"dynamic_sensor_{manifest_id}", module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _normalize_events(result) -> List[Dict[str, Any]]:
+    """sense() 可返回单个事件、事件列表、字符串或 None"""
+    if result is None:
+        return []
+    if isinstance(result, (str, dict)):
+        result = [result]
+    events = []
+    for item in result:
+        if isinstance(item, str):
+            item = {"data": item}
+        events.append({
+            "source": str(item.get("source", "plugin")),
+            "data": item.get("data"),
+            "importance": float(item.get("importance", 0.5)),
+        })
+    return events
+
+
+def _worker_loop(module_path: str, manifest: Dict[str, Any], out, stop: Optional[threading.Event], gen: int):
+    """
+    隔离模式的工作循环 (线程与子进程共用)：周期性调用 sense() 并把事件 / 心跳 / 异常写入队列。
+    """
+    def put(msg):
+        try:
+            out.put_nowait(msg)
+        except queue.Full:
+            pass  # 宿主消费跟不上时丢弃新事件，避免子进程无限占用内存
+
+    try:
+        module = load_sensor_module(module_path, manifest["id"])
+        sense = getattr(module, manifest["entry"])
+    except Exception as e:
+        put(("error", gen, f"{type(e).__name__}: {e}"))
+        return
+
+    state: Dict[str, Any] = {}
+    interval = manifest["interval"]
+    while stop is None or not stop.is_set():
+        started = time.monotonic()
+        try:
+            result = sense(manifest["params"], state)
+            if inspect.isawaitable(result):
+                result = asyncio.run(result)
+            for event in _normalize_events(result):
+                put(("event", gen, event))
+            put(("beat", gen, time.monotonic() - started))
+        except Exception as e:
+            put(("error", gen, f"{type(e).__name__}: {e}"))
+            return
+        remaining = interval - (time.monotonic() - started)
+        if remaining > 0:
+            if stop is not None:
+                stop.wait(remaining)
+            else:
+                time.sleep(remaining)
+
+
+def _process_main(module_path: str, manifest: Dict[str, Any], out, gen: int):
+    """子进程入口 (spawn 模式下需为模块级函数)"""
+    _worker_loop(module_path, manifest, out, None, gen)
+
+
+class PluginSensor(BaseSensor):
+    """
+    插件传感器 (Manifest-declared sensor)
+    清单中 isolation 决定 sense() 的运行位置：
+    - "inline": 直接在事件循环中调用 (sense 可为 async)；同步 sense 持续阻塞时自动降级为线程隔离
+    - "thread": 独立守护线程，事件经线程安全队列转发到总线
+    - "process": 独立子进程 (spawn)，事件经 multiprocessing 队列转发；崩溃或卡死不影响主进程
+    监督 (Supervision)：工作者异常退出或心跳超时即视为失败，按指数退避重启；
+    连续失败 max_restarts 次后停用，直到手动重启。
+    """
+    def __init__(self, bus, manifest: SensorManifest, module_path: str, backoff_base: float = 1.0,
+                 backoff_max: float = 300.0):
+        super().__init__(f"Plugin:{manifest.id}", bus)
+        if manifest.isolation not in ISOLATION_MODES:
+            raise ValueError(f"unknown isolation mode: {manifest.isolation}")
+        self.manifest = manifest
+        self.module_path = module_path
+        self.isolation = manifest.isolation
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.state = "idle"         # idle | running | backoff | disabled
+        self.restarts = 0
+        self.failures = 0           # 连续失败次数，成功心跳后清零
+        self.last_error: Optional[str] = None
+        self.last_beat: Optional[float] = None
+        self.events = 0
+        self._gen = 0
+        self._queue = None
+        self._stop_flag: Optional[threading.Event] = None
+        self._worker = None
+        self._block_strikes = 0
+
+    # --- 工作者生命周期 ---
+
+    def _start_worker(self):
+        self._gen += 1
+        manifest = self.manifest.model_dump()
+        if self.isolation == "thread":
+            self._queue = queue.Queue(maxsize=_QUEUE_SIZE)
+            self._stop_flag = threading.Event()
+            self._worker = threading.Thread(
+                target=_worker_loop,
+                args=(self.module_path, manifest, self._queue, self._stop_flag, self._gen),
+                name=f"janus-sensor-{self.manifest.id}",
+                daemon=True,
+            )
+            self._worker.start()
+        elif self.isolation == "process":
+            ctx = multiprocessing.get_context("spawn")
+            self._queue = ctx.Queue(maxsize=_QUEUE_SIZE)
+            self._worker = ctx.Process(
+                target=_process_main,
+                args=(self.module_path, manifest, self._queue, self._gen),
+                name=f"janus-sensor-{self.manifest.id}",
+                daemon=True,
+            )
+            self._worker.start()
+        else:
+            module = load_sensor_module(self.module_path, self.manifest.id)
+            self._worker = getattr(module, self.manifest.entry)
+            self._inline_state: Dict[str, Any] = {}
+        self.last_beat = time.monotonic()
+        self.state = "running"
+
+    def _stop_worker(self):
+        if self._stop_flag is not None:
+            self._stop_flag.set()  # 卡死的线程无法强杀：放弃它，代际号保证其后续输出被忽略
+            self._stop_flag = None
+        if isinstance(self._worker, multiprocessing.process.BaseProcess):
+            if self._worker.is_alive():
+                self._worker.terminate()
+            self._worker.join(timeout=1)
+        self._worker = None
+
+    def _worker_alive(self) -> bool:
+        if self.isolation == "inline":
+            return self._worker is not None
+        return self._worker is not None and self._worker.is_alive()
+
+    @property
+    def stall_timeout(self) -> float:
+        return max(self.manifest.interval * 3, 30.0)
+
+    # --- 事件转发 ---
+
+    async def _drain_queue(self):
+        while True:
+            try:
+                msg = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            except (OSError, ValueError, EOFError):
+                return  # 子进程已退出，队列关闭
+            kind, gen = msg[0], msg[1]
+            if gen != self._gen:
+                continue  # 已被放弃的旧工作者
+            if kind == "event":
+                event = msg[2]
+                self.events += 1
+                await self.emit(event["source"], event["data"], event["importance"])
+            elif kind == "beat":
+                self._heartbeat(msg[2])
+            elif kind == "error":
+                self._fail(msg[2])
+                return
+
+    def _heartbeat(self, busy: float):
+        self.last_beat = time.monotonic()
+        self.failures = 0
+        self._record_cycle(busy)
+
+    def _fail(self, error: str):
+        self.last_error = error
+        self.failures += 1
+        self.state = "backoff"
+        print(f"[感知器] 插件传感器 {self.manifest.id} 异常: {error}")
+
+    async def _sense_inline(self):
+        started = time.perf_counter()
+        result = self._worker(self.manifest.params, self._inline_state)
+        if inspect.isawaitable(result):
+            result = await result
+        else:
+            blocked = time.perf_counter() - started
+            self._block_strikes = self._block_strikes + 1 if blocked > _BLOCK_THRESHOLD else 0
+        for event in _normalize_events(result):
+            self.events += 1
+            await self.emit(event["source"], event["data"], event["importance"])
+        self._heartbeat(time.perf_counter() - started)
+
+        if self._block_strikes >= _BLOCK_STRIKES:
+            print(f"[感知器] 插件传感器 {self.manifest.id} 多次阻塞事件循环 (> {_BLOCK_THRESHOLD * 1000:.0f} ms)，自动改为线程隔离。")
+            self._block_strikes = 0
+            self._stop_worker()
+            self.isolation = "thread"
+            self._start_worker()
+
+    # --- 监督循环 ---
+
+    async def _run(self):
+        tick = min(0.5, self.manifest.interval)
+        while self.running:
+            if self.state in ("idle", "backoff"):
+                if self.failures > self.manifest.max_restarts:
+                    self.state = "disabled"
+                    print(f"[感知器] 插件传感器 {self.manifest.id} 连续失败 {self.failures} 次，已停用。")
+                    return
+                if self.failures:
+                    delay = min(self.backoff_base * 2 ** (self.failures - 1), self.backoff_max)
+                    await asyncio.sleep(delay)
+                    self.restarts += 1
+                try:
+                    self._start_worker()
+                except Exception as e:
+                    self._fail(f"{type(e).__name__}: {e}")
+                    continue
+
+            try:
+                if self.isolation == "inline":
+                    await self._sense_inline()
+                    await asyncio.sleep(self.manifest.interval)
+                    continue
+
+                await self._drain_queue()
+                if self.state != "running":
+                    self._stop_worker()
+                    continue
+                if not self._worker_alive():
+                    await self._drain_queue()
+                    if self.state == "running":
+                        self._fail("worker exited unexpectedly")
+                    self._stop_worker()
+                    continue
+                if time.monotonic() - self.last_beat > self.stall_timeout:
+                    self._fail(f"no heartbeat for {self.stall_timeout:.0f}s (stalled)")
+                    self._stop_worker()
+                    continue
+            except Exception as e:
+                self._fail(f"{type(e).__name__}: {e}")
+                self._stop_worker()
+                continue
+            await asyncio.sleep(tick)
+
+    async def stop(self):
+        await super().stop()
+        self._stop_worker()
+        if self.state != "disabled":
+            self.state = "idle"
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update({
+            "plugin": self.manifest.id,
+            "isolation": self.isolation,
+            "state": self.state,
+            "restarts": self.restarts,
+            "failures": self.failures,
+            "events": self.events,
+            "last_error": self.last_error,
+            "last_beat_age": round(time.monotonic() - self.last_beat, 1) if self.last_beat else None,
+        })
+        return stats
+
+
+def discover_sensor_plugins(plugin_dir: str) -> List[tuple]:
+    """扫描插件目录，返回 [(SensorManifest, module_path)]；清单非法或缺少模块的插件会被跳过"""
+    found = []
+    if not os.path.isdir(plugin_dir):
+        return found
+    for filename in sorted(os.listdir(plugin_dir)):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(plugin_dir, filename), "r", encoding="utf-8") as f:
+                manifest = SensorManifest(**json.load(f))
+        except Exception as e:
+            print(f"[感知器] 加载传感器清单 {filename} 失败: {e}")
+            continue
+        module_path = os.path.join(plugin_dir, f"{manifest.id}.py")
+        if not os.path.exists(module_path):
+            print(f"[感知器] 传感器插件 {manifest.id} 缺少模块文件 {manifest.id}.py，已跳过。")
+            continue
+        if manifest.enabled:
+            found.append((manifest, module_path))
+    return found
@@ -0,0 +1,114 @@
+import os
+from typing import Dict, NamedTuple, Optional
+
+PROC_ROOT = "/proc"
+
+# /proc/diskstats 扇区固定为 512 字节 (与设备实际扇区大小无关)
+SECTOR_SIZE = 512
+
+
+class CpuTimes(NamedTuple):
+    """/proc/stat 首行累计 jiffies"""
+    total: int
+    idle: int     # idle + iowait
+    iowait: int
+
+
+class LoadAvg(NamedTuple):
+    load1: float
+    load5: float
+    load15: float
+    running: int
+    tasks: int
+
+
+class DiskStat(NamedTuple):
+    """/proc/diskstats 中的累计计数"""
+    reads: int
+    sectors_read: int
+    writes: int
+    sectors_written: int
+    io_ms: int    # 设备忙碌时间 (毫秒)
+
+
+def procfs_available(root: str = PROC_ROOT) -> bool:
+    return os.path.exists(os.path.join(root, "stat"))
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding="ascii", errors="replace") as f:
+        return f.read()
+
+
+def read_cpu_times(root: str = PROC_ROOT) -> Optional[CpuTimes]:
+    try:
+        line = _read(os.path.join(root, "stat")).split("\n", 1)[0]
+    except OSError:
+        return None
+    # cpu user nice system idle iowait irq softirq steal guest guest_nice
+    values = [int(v) for v in line.split()[1:]]
+    # guest / guest_nice 已计入 user / nice，避免重复累加
+    total = sum(values[:8])
+    iowait = values[4] if len(values) > 4 else 0
+    return CpuTimes(total, values[3] + iowait, iowait)
+
+
+def read_meminfo(root: str = PROC_ROOT) -> Dict[str, int]:
+    """返回 /proc/meminfo 中各项数值 (单位 kB)"""
+    info = {}
+    try:
+        text = _read(os.path.join(root, "meminfo"))
+    except OSError:
+        return info
+    for line in text.splitlines():
+        key, _, rest = line.partition(":")
+        parts = rest.split()
+        if parts:
+            info[key] = int(parts[0])
+    return info
+
+
+def read_loadavg(root: str = PROC_ROOT) -> Optional[LoadAvg]:
+    try:
+        parts = _read(os.path.join(root, "loadavg")).split()
+    except OSError:
+        return None
+    running, _, tasks = parts[3].partition("/")
+    return LoadAvg(float(parts[0]), float(parts[1]), float(parts[2]), int(running), int(tasks))
+
+
+def read_diskstats(root: str = PROC_ROOT) -> Dict[str, DiskStat]:
+    """
+    读取物理块设备的累计 IO 计数。
+    分区 (sda1, nvme0n1p1) 与虚拟设备 (loop, ram, dm) 会被跳过，避免重复统计。
+    """
+    stats = {}
+    try:
+        text = _read(os.path.join(root, "diskstats"))
+    except OSError:
+        return stats
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) < 14:
+            continue
+        name = parts[2]
+        if name.startswith(("loop", "ram", "dm-", "zram", "sr")):
+            continue
+        if not os.path.exists(os.path.join("/sys/block", name)) and os.path.exists("/sys/block"):
+            continue
+        stats[name] = DiskStat(int(parts[3]), int(parts[5]), int(parts[7]), int(parts[9]), int(parts[12]))
+    return stats
+
+
+def read_self_status(root: str = PROC_ROOT) -> Dict[str, int]:
+    """当前进程的 VmRSS / VmHWM (kB) 与线程数"""
+    status = {}
+    try:
+        text = _read(os.path.join(root, "self", "status"))
+    except OSError:
+        return status
+    for line in text.splitlines():
+        key, _, rest = line.partition(":")
+        if key in ("VmRSS", "VmHWM", "VmSize", "Threads"):
+            status[key] = int(rest.split()[0])
+    return status
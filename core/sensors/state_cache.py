@@ -0,0 +1,47 @@
+import gzip
+import json
+import os
+from typing import Dict, NamedTuple, Optional
+
+STATE_VERSION = 1
+
+
+class FileRecord(NamedTuple):
+    """FileSensor 对单个文件的记忆 (path -> stat + 指纹)"""
+    mtime: float
+    size: int
+    ino: int
+    hash: Optional[str]
+
+
+def load_file_index(path: str, root: str, meta: Dict) -> Optional[Dict[str, FileRecord]]:
+    """
+    读取持久化的文件索引，返回 {绝对路径: FileRecord}。
+    文件不存在、已损坏，或哈希配置 (meta) 与当前不一致时返回 None (指纹不可比，视为冷启动)。
+    """
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError, EOFError):
+        return None
+    if data.get("version") != STATE_VERSION or data.get("root") != root or data.get("meta") != meta:
+        return None
+    return {
+        os.path.join(root, rel): FileRecord(*entry)
+        for rel, entry in data.get("files", {}).items()
+    }
+
+
+def save_file_index(path: str, root: str, meta: Dict, index: Dict[str, FileRecord]):
+    """原子写入文件索引 (路径存为相对 root 的形式，gzip 压缩)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    payload = {
+        "version": STATE_VERSION,
+        "root": root,
+        "meta": meta,
+        "files": {os.path.relpath(p, root): list(rec) for p, rec in index.items()},
+    }
+    tmp = f"{path}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=3) as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
@@ -1,39 +1,206 @@
 import asyncio
 import os
 import shutil
+import time
+from typing import Dict, Optional
 from .base import BaseSensor
+from .metrics import MetricsRegistry, SYSTEM_METRICS
+from .procfs import (
+    procfs_available, read_cpu_times, read_meminfo, read_loadavg, read_diskstats, read_self_status, SECTOR_SIZE,
+)
+
+
+class _Sampler:
+    """
+    系统指标采样器：直接读取 /proc，累计计数器 (CPU jiffies / 磁盘扇区) 与上一次采样做差得到速率。
+    非 Linux 平台只采集磁盘空间。
+    """
+    def __init__(self, disk_path: str = "/"):
+        self.disk_path = disk_path
+        self.procfs = procfs_available()
+        self.cpu_count = os.cpu_count() or 1
+        self._prev_cpu = None
+        self._prev_disks = None
+        self._prev_mono = None
+
+    def sample(self) -> Dict[str, float]:
+        values: Dict[str, float] = {}
+        usage = shutil.disk_usage(self.disk_path)
+        values["disk.free_gb"] = round(usage.free / (1024 ** 3), 2)
+        values["disk.used_pct"] = round(usage.used / usage.total * 100, 1) if usage.total else 0.0
+        if not self.procfs:
+            return values
+
+        mono = time.monotonic()
+        elapsed = mono - self._prev_mono if self._prev_mono else None
+        self._prev_mono = mono
+
+        # CPU: 两次采样间的 jiffies 差值
+        cpu = read_cpu_times()
+        if cpu and self._prev_cpu and cpu.total > self._prev_cpu.total:
+            d_total = cpu.total - self._prev_cpu.total
+            values["cpu.busy_pct"] = round((1 - (cpu.idle - self._prev_cpu.idle) / d_total) * 100, 1)
+            values["cpu.iowait_pct"] = round((cpu.iowait - self._prev_cpu.iowait) / d_total * 100, 1)
+        self._prev_cpu = cpu
+
+        mem = read_meminfo()
+        if mem.get("MemTotal"):
+            available = mem.get("MemAvailable", mem.get("MemFree", 0))
+            values["mem.available_mb"] = round(available / 1024, 1)
+            values["mem.available_pct"] = round(available / mem["MemTotal"] * 100, 1)
+            values["mem.swap_used_mb"] = round((mem.get("SwapTotal", 0) - mem.get("SwapFree", 0)) / 1024, 1)
+
+        load = read_loadavg()
+        if load:
+            values["load.1"] = load.load1
+            values["load.per_cpu"] = round(load.load1 / self.cpu_count, 2)
+
+        # 磁盘 IO: 扇区差值 -> KB/s，io_ms 差值 -> 最忙设备的繁忙百分比
+        disks = read_diskstats()
+        if self._prev_disks is not None and elapsed:
+            read_b = write_b = 0
+            busy = 0.0
+            for name, cur in disks.items():
+                prev = self._prev_disks.get(name)
+                if prev is None:
+                    continue
+                read_b += max(0, cur.sectors_read - prev.sectors_read) * SECTOR_SIZE
+                write_b += max(0, cur.sectors_written - prev.sectors_written) * SECTOR_SIZE
+                busy = max(busy, (cur.io_ms - prev.io_ms) / (elapsed * 1000) * 100)
+            values["io.read_kbps"] = round(read_b / 1024 / elapsed, 1)
+            values["io.write_kbps"] = round(write_b / 1024 / elapsed, 1)
+            values["io.busy_pct"] = round(min(busy, 100.0), 1)
+        self._prev_disks = disks
+
+        status = read_self_status()
+        if "VmRSS" in status:
+            values["proc.rss_mb"] = round(status["VmRSS"] / 1024, 1)
+        if "Threads" in status:
+            values["proc.threads"] = status["Threads"]
+        return values
+
+
+def read_system_snapshot(max_age: float = 60.0, metrics: Optional[MetricsRegistry] = None) -> Dict[str, float]:
+    """
+    读取最新系统指标 (供 health_monitor / system_stats 使用)。
+    SystemSensor 未运行或数据已过期时现场采样一次 (此时没有 CPU / IO 等速率类指标)。
+    """
+    metrics = metrics or SYSTEM_METRICS
+    points = metrics.series("disk.free_gb")
+    if points and time.time() - points[-1][0] <= max_age:
+        return metrics.snapshot()
+    return _Sampler().sample()
+
+
+class _Alarm:
+    """
+    带迟滞的阈值告警 (Hysteresis alarm)
+    连续 sustain 次越过 enter 阈值才进入告警，回到 exit 阈值另一侧才解除，避免在阈值附近反复触发。
+    """
+    def __init__(self, enter: float, exit: float, above: bool = True, sustain: int = 1):
+        self.enter = enter
+        self.exit = exit
+        self.above = above
+        self.sustain = sustain
+        self.active = False
+        self._streak = 0
+
+    def update(self, value: float) -> Optional[str]:
+        if self.active:
+            recovered = value < self.exit if self.above else value > self.exit
+            if recovered:
+                self.active = False
+                return "exit"
+            return None
+        crossed = value >= self.enter if self.above else value <= self.enter
+        self._streak = self._streak + 1 if crossed else 0
+        if self._streak >= self.sustain:
+            self.active = True
+            self._streak = 0
+            return "enter"
+        return None
+
 
 class SystemSensor(BaseSensor):
     """
     系统状态传感器 (System State Sensor)
-    周期性监测磁盘空间和负载，异常时触发反射。
+    周期性读取 /proc (CPU、内存、负载、磁盘 IO、自身进程) 与磁盘空间，写入 SYSTEM_METRICS 时间序列。
+    阈值事件带迟滞：进入告警与恢复各上报一次，不会每个周期重复触发；
+    另根据近 30 分钟的趋势预测磁盘耗尽与自身内存泄漏。
+    指标平稳时采样间隔逐步退避到 max_interval；处于告警或接近阈值时保持 interval 快速采样。
     """
-    def __init__(self, bus, interval: int = 10):
-        super().__init__("SystemSensor", bus)
-        self.interval = interval
+    # 指标 -> (告警参数, 进入文案, 恢复文案, 进入时的重要度)
+    ALARMS = {
+        "disk.free_gb": (dict(enter=10.0, exit=12.0, above=False), "磁盘空间告急 (剩余 {v:.1f} GB)", "磁盘空间已恢复 (剩余 {v:.1f} GB)", 0.8),
+        "mem.available_pct": (dict(enter=10.0, exit=15.0, above=False, sustain=2), "可用内存不足 ({v:.0f}%)", "可用内存已恢复 ({v:.0f}%)", 0.7),
+        "cpu.busy_pct": (dict(enter=90.0, exit=70.0, sustain=3), "CPU 持续高负载 ({v:.0f}%)", "CPU 负载已回落 ({v:.0f}%)", 0.6),
+        "load.per_cpu": (dict(enter=2.0, exit=1.5, sustain=3), "系统负载过高 (每核 {v:.2f})", "系统负载已回落 (每核 {v:.2f})", 0.5),
+        "io.busy_pct": (dict(enter=90.0, exit=60.0, sustain=3), "磁盘 IO 繁忙 ({v:.0f}%)", "磁盘 IO 已恢复 ({v:.0f}%)", 0.5),
+    }
+    TREND_WINDOW = 1800.0
+
+    def __init__(self, bus, interval: int = 10, disk_path: str = "/", metrics: Optional[MetricsRegistry] = None,
+                 max_interval: float = 60.0):
+        super().__init__("SystemSensor", bus, interval=interval, max_interval=max_interval)
+        self.metrics = metrics or SYSTEM_METRICS
+        self.sampler = _Sampler(disk_path)
+        self.alarms = {name: _Alarm(**params) for name, (params, _, _, _) in self.ALARMS.items()}
+        self._trends_active = set()
+
+    async def _check_thresholds(self, values: Dict[str, float]):
+        for name, (_, enter_msg, exit_msg, importance) in self.ALARMS.items():
+            if name not in values:
+                continue
+            value = values[name]
+            alarm = self.alarms[name]
+            transition = alarm.update(value)
+            if alarm.active or alarm._streak:
+                self.mark_activity()
+            if transition == "enter":
+                await self.emit(source="system", data=enter_msg.format(v=value), importance=importance)
+            elif transition == "exit":
+                await self.emit(source="system", data=exit_msg.format(v=value), importance=0.2)
+
+    async def _check_trends(self, values: Dict[str, float]):
+        # 1. 磁盘耗尽预测：按剩余空间的下降斜率估算
+        slope = self.metrics.slope("disk.free_gb", self.TREND_WINDOW)
+        eta = values["disk.free_gb"] / -slope if slope and slope < 0 else None
+        if eta is not None and eta < 3600:
+            if "disk_eta" not in self._trends_active:
+                self._trends_active.add("disk_eta")
+                await self.emit(source="system", data=f"磁盘空间预计 {eta / 60:.0f} 分钟内耗尽", importance=0.7)
+        elif eta is None or eta > 7200:
+            self._trends_active.discard("disk_eta")
+
+        # 2. 自身常驻内存持续增长 (疑似泄漏)
+        rss = self.metrics.summary("proc.rss_mb", self.TREND_WINDOW)
+        rss_slope = self.metrics.slope("proc.rss_mb", self.TREND_WINDOW)
+        if rss and rss["samples"] >= 30 and rss_slope and rss_slope > 0 and rss["last"] > rss["min"] * 1.5:
+            if "rss_growth" not in self._trends_active:
+                self._trends_active.add("rss_growth")
+                await self.emit(
+                    source="system",
+                    data=f"JANUS 进程内存持续增长 ({rss['min']:.0f} MB -> {rss['last']:.0f} MB)",
+                    importance=0.4
+                )
+        elif not rss_slope or rss_slope <= 0:
+            self._trends_active.discard("rss_growth")
 
     async def _run(self):
         while self.running:
+            started = time.perf_counter()
             try:
-                # 1. 监测磁盘
-                usage = shutil.disk_usage("/")
-                free_gb = usage.free / (1024**3)
-                if free_gb < 10:
-                    await self.bus.emit(source="system", data=f"磁盘空间告急", importance=0.8)
-
-                # 2. 时间意识 - 午夜自省仪式 (Midnight Reflection Trigger)
-                import datetime
-                now = datetime.datetime.now()
-                if now.hour == 2 and now.minute == 0:
-                    await self.bus.emit(
-                        source="chronos",
-                        data=f"午夜钟声响起 ({now.strftime('%H:%M')})，系统进入沉思模式。",
-                        importance=0.9
-                    )
-
-                # 3. 模拟 CPU 负载监测 (可在以后扩展)
-                
+                # 1. 采样并写入时间序列
+                values = self.sampler.sample()
+                now = time.time()
+                for name, value in values.items():
+                    self.metrics.record(name, value, now)
+
+                # 2. 阈值 (迟滞) 与趋势事件
+                await self._check_thresholds(values)
+                await self._check_trends(values)
+
             except Exception as e:
                 pass
-            
-            await asyncio.sleep(self.interval)
+
+            await self._cycle_sleep(time.perf_counter() - started)
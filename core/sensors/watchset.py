@@ -0,0 +1,205 @@
+import json
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+# 默认监控规则 (与历史硬编码清单保持一致)
+DEFAULT_EXCLUDE = [
+    'logs/', '.git/', '__pycache__/', '.venv/', 'dist/', 'build/',
+    'instance/', 'memory/', 'node_modules/', '.idea/', '.vscode/', 'tmp/',
+    'knowledge.json', '.DS_Store', 'uv.lock', '.janus_history',
+]
+DEFAULT_EXTENSIONS = ['.py', '.js', '.md', '.json', '.html', '.css', '.sh']
+
+_GLOB_CHARS = re.compile(r"[*?\[]")
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """gitignore 风格 glob -> 正则 (匹配以 / 分隔的相对路径)"""
+    anchored = pattern.startswith("/") or "/" in pattern.strip("/")
+    pat = pattern.strip("/")
+    out, i = [], 0
+    while i < len(pat):
+        c = pat[i]
+        if c == "*":
+            if pat.startswith("**/", i):
+                out.append("(?:.*/)?")
+                i += 3
+                continue
+            if pat.startswith("**", i):
+                out.append(".*")
+                i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pat.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pat[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ("" if anchored else "(?:.*/)?") + "".join(out)
+
+
+class _Pattern(NamedTuple):
+    regex: str
+    negate: bool
+    dir_only: bool
+    literal: Optional[str]  # 未锚定且不含通配符的纯名称，可走集合快速路径
+
+
+class GlobSet:
+    """
+    一组 gitignore 风格的规则，编译一次后反复匹配。
+    支持 *, **, ?, [...], 末尾 / (仅目录), 开头 / (锚定根目录), ! (取反，后者优先)。
+    """
+    def __init__(self, patterns: Iterable[str]):
+        parsed = []
+        for raw in patterns:
+            raw = raw.strip()
+            if not raw or raw.startswith("#"):
+                continue
+            negate = raw.startswith("!")
+            if negate:
+                raw = raw[1:]
+            dir_only = raw.endswith("/")
+            core = raw.strip("/")
+            literal = core if (not _GLOB_CHARS.search(core) and "/" not in core and not raw.startswith("/")) else None
+            parsed.append(_Pattern(_glob_to_regex(raw), negate, dir_only, literal))
+
+        self.patterns = parsed
+        self._ordered = any(p.negate for p in parsed)
+        if not self._ordered:
+            # 无取反规则时：纯名称走集合，其余合并为单个正则
+            self._names_any = {p.literal for p in parsed if p.literal and not p.dir_only}
+            self._names_dir = {p.literal for p in parsed if p.literal and p.dir_only}
+            self._re_any = self._combine(p.regex for p in parsed if not p.literal and not p.dir_only)
+            self._re_dir = self._combine(p.regex for p in parsed if not p.literal and p.dir_only)
+        else:
+            self._compiled = [(re.compile(p.regex), p) for p in parsed]
+
+    @staticmethod
+    def _combine(regexes: Iterable[str]):
+        regexes = list(regexes)
+        return re.compile("|".join(f"(?:{r})" for r in regexes)) if regexes else None
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def match(self, rel_path: str, name: str, is_dir: bool) -> bool:
+        if not self._ordered:
+            if name in self._names_any or (is_dir and name in self._names_dir):
+                return True
+            if self._re_any and self._re_any.fullmatch(rel_path):
+                return True
+            return bool(is_dir and self._re_dir and self._re_dir.fullmatch(rel_path))
+
+        matched = False
+        for regex, p in self._compiled:
+            if p.dir_only and not is_dir:
+                continue
+            if (p.literal and p.literal == name) or regex.fullmatch(rel_path):
+                matched = not p.negate
+        return matched
+
+
+class WatchMatcher:
+    """单个监控根目录的编译后匹配器 (Compiled include/exclude matcher)"""
+    def __init__(self, include: Iterable[str] = (), exclude: Iterable[str] = (), extensions: Iterable[str] = ()):
+        self.include = GlobSet(include)
+        self.exclude = GlobSet(exclude)
+        self.extensions = frozenset(e.lower() if e.startswith(".") else "." + e.lower() for e in extensions)
+
+    def dir_excluded(self, rel_path: str, name: str) -> bool:
+        return self.exclude.match(rel_path, name, True)
+
+    def file_included(self, rel_path: str, name: str) -> bool:
+        if self.extensions:
+            dot = name.rfind(".")
+            if dot < 0 or name[dot:].lower() not in self.extensions:
+                return False
+        if self.exclude.match(rel_path, name, False):
+            return False
+        return not self.include or self.include.match(rel_path, name, False)
+
+
+class WatchRoot(NamedTuple):
+    path: str
+    matcher: WatchMatcher
+    signature: str  # 规则内容指纹，用于热加载时判断是否变化
+
+
+class WatchSetConfig:
+    """
+    监控集配置 (Watch-set configuration)，支持热加载。
+    JSON 格式:
+    {
+      "defaults": {"include": [], "exclude": [...], "extensions": [...]},
+      "roots": [{"path": "../solar-system", "exclude": ["*.min.js"], "extensions": [".ts"]}]
+    }
+    root 中未给出的字段继承 defaults；defaults 未给出时使用内置清单。
+    相对路径以配置文件所在目录为基准。default_root 始终被监控 (DNA.md #1)，
+    roots 中列出同一路径时可覆盖其规则；配置文件不存在时只监控 default_root。
+    """
+    def __init__(self, path: Optional[str], default_root: Optional[str] = None):
+        self.path = os.path.abspath(path) if path else None
+        self.default_root = os.path.abspath(default_root) if default_root else None
+        self._mtime_ns = None
+        self.error: Optional[str] = None
+
+    def _stat(self):
+        if not self.path:
+            return None
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def changed(self) -> bool:
+        """配置文件自上次 load() 以来是否被修改 (一次 stat)"""
+        return self._stat() != self._mtime_ns
+
+    def load(self) -> List[WatchRoot]:
+        self._mtime_ns = self._stat()
+        data: Dict = {}
+        if self._mtime_ns is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.error = None
+            except (OSError, ValueError) as e:
+                self.error = str(e)
+                print(f"[感知器] 监控集配置解析失败，沿用默认规则: {e}")
+                data = {}
+
+        defaults = {
+            "include": [],
+            "exclude": DEFAULT_EXCLUDE,
+            "extensions": DEFAULT_EXTENSIONS,
+            **data.get("defaults", {}),
+        }
+        base = os.path.dirname(self.path) if self.path else os.getcwd()
+        entries = list(data.get("roots") or [])
+        if self.default_root:
+            listed = {os.path.abspath(os.path.join(base, os.path.expanduser(e["path"]))) for e in entries}
+            if self.default_root not in listed:
+                entries.insert(0, {"path": self.default_root})
+
+        roots, seen = [], set()
+        for entry in entries:
+            root = os.path.abspath(os.path.join(base, os.path.expanduser(entry["path"])))
+            if root in seen:
+                continue
+            seen.add(root)
+            spec = {k: entry.get(k, defaults[k]) for k in ("include", "exclude", "extensions")}
+            signature = json.dumps(spec, sort_keys=True, ensure_ascii=False)
+            roots.append(WatchRoot(root, WatchMatcher(**spec), signature))
+        return roots
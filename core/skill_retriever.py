@@ -0,0 +1,166 @@
+import json
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+from .schema import AgentSkill
+
+# 字段权重：id / name / tags 信息密度最高，examples 次之
+_FIELD_WEIGHTS = (("id", 2.0), ("name", 2.0), ("tags", 1.5), ("examples", 1.2), ("description", 1.0))
+
+_SEGMENT = re.compile(r"[a-z0-9]+|[㐀-鿿豈-﫿]+")
+_CJK = re.compile(r"[㐀-鿿豈-﫿]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Prompt token 粗估 (无需 tokenizer)：CJK 字符约 1 token/字，其余约 4 字符/token。
+    只用于前后对比，不追求与计费值完全一致。
+    """
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def _terms(text: str, ngram_range=(2, 3)) -> List[str]:
+    """
+    文本 -> 检索词：拉丁词整体保留，并拆出字符 n-gram (容忍词形变化)；
+    CJK 片段没有分词，直接取单字 + 字符 n-gram。
+    """
+    text = unicodedata.normalize("NFKC", text).lower().replace("_", " ")
+    terms = []
+    lo, hi = ngram_range
+    for seg in _SEGMENT.findall(text):
+        if _CJK.match(seg):
+            terms.extend(seg)
+        else:
+            terms.append(f"w:{seg}")
+            if len(seg) <= lo:
+                continue
+            seg = f" {seg} "
+        for n in range(lo, hi + 1):
+            terms.extend(seg[i:i + n] for i in range(len(seg) - n + 1))
+    return terms
+
+
+def skill_text_fields(skill: AgentSkill) -> Dict[str, str]:
+    return {
+        "id": skill.id,
+        "name": skill.name,
+        "tags": " ".join(skill.tags + skill.keywords),
+        "examples": " ".join(skill.examples),
+        "description": skill.description,
+    }
+
+
+def compact_manifest(skills: Sequence[AgentSkill]) -> str:
+    """紧凑技能清单：不缩进、省略空字段与 output_schema (调度只需要输入参数)"""
+    manifest = []
+    for s in skills:
+        entry = {"id": s.id, "name": s.name, "description": s.description}
+        if s.tags:
+            entry["tags"] = s.tags
+        if s.examples:
+            entry["examples"] = s.examples
+        if s.input_schema:
+            entry["input_schema"] = s.input_schema
+        manifest.append(entry)
+    return json.dumps(manifest, ensure_ascii=False, separators=(",", ":"))
+
+
+class SkillRetriever:
+    """
+    本地技能检索器 (Local skill retriever)
+    对技能的 id / name / tags (含 keywords) / examples / description 建立字符 n-gram TF-IDF 索引 (纯本地，无网络)，
+    每次意图解析只把 top_k 个候选技能 + always_include 技能放进提示词。
+    - 技能数不超过 top_k + always_include 时不做裁剪
+    - 查询与任何技能都没有词面重合 (如跨语言提问) 时回退为完整清单，宁可多花 token 也不漏技能
+    - 技能清单变化时自动重建索引
+    """
+    def __init__(self, top_k: int = 8, always_include: Iterable[str] = ("brain_rescue", "lifestyle_chat"),
+                 min_score: float = 0.02):
+        self.top_k = top_k
+        self.always_include = set(always_include)
+        self.min_score = min_score
+        self._signature = None
+        self._vectors: Dict[str, Dict[str, float]] = {}
+        self._idf: Dict[str, float] = {}
+        self.counters = {"queries": 0, "pruned": 0, "fallbacks": 0, "full_tokens": 0, "prompt_tokens": 0}
+        self.last: Optional[Dict] = None
+
+    # --- 索引 ---
+
+    def _ensure_index(self, skills: Sequence[AgentSkill]):
+        signature = tuple((s.id, s.name, s.description, tuple(s.tags), tuple(s.keywords), tuple(s.examples)) for s in skills)
+        if signature == self._signature:
+            return
+        raw: Dict[str, Counter] = {}
+        df: Counter = Counter()
+        for skill in skills:
+            tf: Counter = Counter()
+            fields = skill_text_fields(skill)
+            for field, weight in _FIELD_WEIGHTS:
+                for term in _terms(fields[field]):
+                    tf[term] += weight
+            raw[skill.id] = tf
+            df.update(tf.keys())
+        n = len(skills)
+        self._idf = {term: math.log((1 + n) / (1 + count)) + 1.0 for term, count in df.items()}
+        self._vectors = {sid: self._normalize(tf) for sid, tf in raw.items()}
+        self._signature = signature
+
+    def _normalize(self, tf: Counter) -> Dict[str, float]:
+        vec = {term: (1 + math.log(w)) * self._idf.get(term, 0.0) for term, w in tf.items() if w > 0}
+        norm = math.sqrt(sum(v * v for v in vec.values()))
+        return {t: v / norm for t, v in vec.items()} if norm else {}
+
+    # --- 检索 ---
+
+    def score(self, query: str, skills: Sequence[AgentSkill]) -> List[tuple]:
+        """返回 [(score, skill)]，按相关度降序"""
+        self._ensure_index(skills)
+        q = self._normalize(Counter(t for t in _terms(query) if t in self._idf))
+        scored = []
+        for skill in skills:
+            vec = self._vectors.get(skill.id, {})
+            scored.append((sum(w * vec.get(t, 0.0) for t, w in q.items()), skill))
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return scored
+
+    def select(self, query: str, skills: Sequence[AgentSkill]) -> List[AgentSkill]:
+        """挑选进入提示词的候选技能 (保持原注册顺序)"""
+        skills = list(skills)
+        self.counters["queries"] += 1
+        pinned = [s for s in skills if s.id in self.always_include]
+        if len(skills) <= self.top_k + len(pinned):
+            selected, reason = skills, "small"
+        else:
+            scored = self.score(query, skills)
+            if not scored or scored[0][0] < self.min_score:
+                selected, reason = skills, "fallback"
+                self.counters["fallbacks"] += 1
+            else:
+                chosen = {s.id for sc, s in scored[:self.top_k] if sc >= self.min_score} | self.always_include
+                selected, reason = [s for s in skills if s.id in chosen], "pruned"
+                self.counters["pruned"] += 1
+
+        full_tokens = estimate_tokens(compact_manifest(skills))
+        prompt_tokens = estimate_tokens(compact_manifest(selected))
+        self.counters["full_tokens"] += full_tokens
+        self.counters["prompt_tokens"] += prompt_tokens
+        self.last = {
+            "reason": reason,
+            "skills": len(skills),
+            "selected": [s.id for s in selected],
+            "full_tokens": full_tokens,
+            "prompt_tokens": prompt_tokens,
+        }
+        return selected
+
+    def stats(self) -> dict:
+        full = self.counters["full_tokens"]
+        return {
+            **self.counters,
+            "token_reduction": round(1 - self.counters["prompt_tokens"] / full, 3) if full else 0.0,
+            "last": self.last,
+        }
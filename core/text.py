@@ -0,0 +1,11 @@
+import re
+import unicodedata
+
+_TRAILING_PUNCT = re.compile(r"[\s\.\!\?,;。！？，；…~]+$")
+
+
+def normalize_query(query: str) -> str:
+    """NFKC 归一化 + 小写 + 折叠空白 + 去掉句末标点，使 “系统状态？” 与 “系统状态” 命中同一条"""
+    q = unicodedata.normalize("NFKC", query).lower().strip()
+    q = re.sub(r"\s+", " ", q)
+    return _TRAILING_PUNCT.sub("", q)
@@ -16,12 +16,16 @@ load_dotenv()
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.schema import AgentSkill, Intent, Message, TaskStatus, AuditStatus
+from core.schema import AgentSkill, Intent, Message, TaskStatus, AuditStatus, RiskTier
 from core.provider import BaseProvider
 from core.dispatcher import Dispatcher
 from core.executor import MCPExecutor
-from core.audit import RuleBasedAuditor, AIAuditor, CompositeAuditor
+from core.audit import RuleBasedAuditor, AIAuditor, CompositeAuditor, CachedAuditor
 from core.providers.openai import OpenAIProvider
+from core.providers.intent_cache import CachingProvider
+from core.providers.middleware import LimitedProvider
+from core.providers.router import RoutingProvider
+from core.skill_retriever import SkillRetriever
 from core.providers.antigravity import AntigravityBrainProvider
 from core.sensors import SensorManager
 
@@ -239,30 +243,110 @@ async def housekeeping_monitor(dispatcher):
                 # 默默启动，不干扰当前主循环 (Run silently in background)
                 asyncio.create_task(dispatcher.run_task(auto_ctx))
 
+async def stream_chat(provider, text: str):
+    """把 provider.chat_stream 的输出逐段打印，首段到达即开始显示"""
+    print("\n[Janus]:")
+    try:
+        async for chunk in provider.chat_stream([Message(role="user", content=text)]):
+            sys.stdout.write(chunk)
+            sys.stdout.flush()
+    except Exception as e:
+        print(f"\n[系统] 对话流中断: {e}")
+    print()
+
+def build_skill_retriever():
+    top_k = int(os.getenv("JANUS_SKILL_TOP_K", "8"))
+    if top_k <= 0:
+        return None
+    always = os.getenv("JANUS_SKILL_ALWAYS", "brain_rescue,lifestyle_chat")
+    return SkillRetriever(top_k=top_k, always_include=[s.strip() for s in always.split(",") if s.strip()])
+
+def build_cloud_provider(model: str, api_key: str, base_url: str = None):
+    """云端 LLM provider：OpenAIProvider 外包一层请求合并 / 并发 / 限流中间件"""
+    provider = OpenAIProvider(
+        model=model,
+        api_key=api_key,
+        base_url=base_url,
+        # 技能清单裁剪：每次只把检索出的 top-k 候选技能发给 LLM (JANUS_SKILL_TOP_K=0 关闭)
+        retriever=build_skill_retriever(),
+        # 流式意图解析：技能 ID 一出现即预热 / 提前审计 (不支持流式的兼容网关可设 JANUS_STREAM=0)
+        stream=os.getenv("JANUS_STREAM", "1") != "0",
+        # 客户端自身重试仍失败的 429 交给中间件退避 (所有请求一起冷却)
+        raise_on_rate_limit=True
+    )
+    # 请求合并 + 并发上限 + 令牌桶限流 (后台反射、AI 审计与交互查询共享同一 LLM 配额)
+    rpm = float(os.getenv("JANUS_LLM_RPM", "0"))
+    return LimitedProvider(
+        provider,
+        max_concurrency=int(os.getenv("JANUS_LLM_CONCURRENCY", "4")),
+        rate_tokens=rpm or None,
+        rate_period=60.0,
+        max_retries=int(os.getenv("JANUS_LLM_RETRIES", "3"))
+    )
+
 async def start_janus():
     print("=== Project JANUS 调度中心 (v0.1-EVOLVED) ===")
     
     # 1. Setup Kernel
     api_key = os.getenv("OPENAI_API_KEY")
     if api_key:
-        provider = OpenAIProvider(
+        provider = build_cloud_provider(
             model=os.getenv("JANUS_MODEL", "gpt-4-turbo-preview"),
             api_key=api_key,
             base_url=os.getenv("OPENAI_API_BASE")
         )
+        # 意图缓存：重复查询不再走 LLM 往返 (JANUS_INTENT_CACHE=0 关闭)
+        if os.getenv("JANUS_INTENT_CACHE", "1") != "0":
+            provider = CachingProvider(
+                provider,
+                include_snapshot=os.getenv("JANUS_INTENT_CACHE_SNAPSHOT") == "1"
+            )
+        # 意图路由：本地快速通道有把握时不走 LLM；可选对冲到备用模型 (JANUS_ROUTER=0 关闭)
+        if os.getenv("JANUS_ROUTER", "1") != "0":
+            hedge = None
+            if os.getenv("JANUS_HEDGE_MODEL"):
+                hedge = build_cloud_provider(
+                    model=os.getenv("JANUS_HEDGE_MODEL"),
+                    api_key=os.getenv("JANUS_HEDGE_API_KEY") or api_key,
+                    base_url=os.getenv("JANUS_HEDGE_API_BASE") or os.getenv("OPENAI_API_BASE")
+                )
+            provider = RoutingProvider(
+                provider,
+                hedge=hedge,
+                threshold=float(os.getenv("JANUS_ROUTE_THRESHOLD", "0.8")),
+                hedge_after=float(os.getenv("JANUS_HEDGE_AFTER", "2.0")),
+                shadow_rate=float(os.getenv("JANUS_ROUTE_SHADOW_RATE", "0"))
+            )
         mode_text = "智能大脑模式 (Connected to Cloud LLM)"
         # 为智能模式启用复合审计 (Rule + AI)
-        auditor = CompositeAuditor([
-            RuleBasedAuditor(),
-            AIAuditor(provider=provider)
-        ])
+        # 只读等技能在规则审计干净时跳过 AI 审计，其余情况两者并发执行；AI 审计超时按 JANUS_AUDIT_TIMEOUT_POLICY 处理
+        skip_tiers = [t.strip() for t in os.getenv("JANUS_AUDIT_SKIP_TIERS", "read_only").split(",") if t.strip()]
+        auditor = CompositeAuditor(
+            [RuleBasedAuditor()],
+            escalation=[AIAuditor(provider=provider)],
+            skip_tiers=[RiskTier(t) for t in skip_tiers],
+            deadlines={"AIAuditor": float(os.getenv("JANUS_AI_AUDIT_DEADLINE", "15"))},
+            timeout_policy=os.getenv("JANUS_AUDIT_TIMEOUT_POLICY", "warn")
+        )
+        # 审计结论缓存：相同技能 + 参数 + 查询在 TTL 内复用 PASS / FAIL (JANUS_AUDIT_CACHE_TTL=0 关闭)
+        audit_cache_ttl = float(os.getenv("JANUS_AUDIT_CACHE_TTL", "300"))
+        if audit_cache_ttl > 0:
+            auditor = CachedAuditor(auditor, ttl=audit_cache_ttl)
     else:
         # 默认启用「共生大脑模式」，直接对接 Antigravity
-        provider = AntigravityBrainProvider()
+        provider = AntigravityBrainProvider(
+            timeout=float(os.getenv("JANUS_BRIDGE_TIMEOUT", "3600")),
+            protocol=os.getenv("JANUS_BRIDGE_PROTOCOL", "files")
+        )
         mode_text = "共生大脑模式 (Connected to Antigravity Remote Brain)"
         auditor = RuleBasedAuditor()
         
     dispatcher = Dispatcher(provider=provider, auditor=auditor)
+
+    # 1.0 可选：感知事件录制 (用于复现反射风暴，回放见 python -m core.perception_replay)
+    record_path = os.getenv("JANUS_PERCEPTION_RECORD")
+    if record_path:
+        dispatcher.perception.start_recording(record_path)
     
     # 1.1 Initialize Perception Sensors
     # [DEPRECATED]: 不再需要的锁定
@@ -304,19 +388,21 @@ async def start_janus():
 
     # 3. Register Skills (Connecting Logic to Physical Tools)
     skills = [
-        AgentSkill(id="list_files", name="List Files", description="List local files."),
-        AgentSkill(id="search_in_file", name="Search Content", description="Search text in a file."),
-        AgentSkill(id="preview_data_schema", name="Preview Data", description="Preview CSV/Parquet schema."),
-        AgentSkill(id="data_summary_stats", name="Data Stats", description="Get statistical summary of a data file."),
-        AgentSkill(id="list_memory", name="List Memory", description="List all interaction logs."),
-        AgentSkill(id="read_memory", name="Read Memory", description="Read a specific log file."),
-        AgentSkill(id="query_knowledge", name="Query Knowledge", description="Query factual information."),
-        AgentSkill(id="add_knowledge", name="Add Knowledge", description="Manually record a fact."),
-        AgentSkill(id="lifestyle_chat", name="Lifestyle", description="Handle casual human requests."),
-        AgentSkill(id="brain_rescue", name="Brain Rescue", description="Generic skill for real-time brain intervention."),
-        AgentSkill(id="list_skills", name="List Registered Skills", description="List all skills currently loaded in Janus."),
-        AgentSkill(id="system_stats", name="System Stats", description="Check disk space and system health."),
-        AgentSkill(id="refresh_rules", name="Refresh Rules", description="Reload perception reflex rules from knowledge store."),
+        AgentSkill(id="list_files", name="List Files", description="List local files.", risk_tier=RiskTier.READ_ONLY),
+        AgentSkill(id="search_in_file", name="Search Content", description="Search text in a file.", risk_tier=RiskTier.READ_ONLY),
+        AgentSkill(id="preview_data_schema", name="Preview Data", description="Preview CSV/Parquet schema.", risk_tier=RiskTier.READ_ONLY),
+        AgentSkill(id="data_summary_stats", name="Data Stats", description="Get statistical summary of a data file.", risk_tier=RiskTier.READ_ONLY),
+        AgentSkill(id="list_memory", name="List Memory", description="List all interaction logs.", keywords=["记忆", "日志", "回顾", "记录"], risk_tier=RiskTier.READ_ONLY),
+        AgentSkill(id="read_memory", name="Read Memory", description="Read a specific log file.", risk_tier=RiskTier.READ_ONLY),
+        AgentSkill(id="query_knowledge", name="Query Knowledge", description="Query factual information.", keywords=["查询", "搜索", "寻找", "重构", "路线图", "计划"], risk_tier=RiskTier.READ_ONLY),
+        AgentSkill(id="add_knowledge", name="Add Knowledge", description="Manually record a fact.", risk_tier=RiskTier.LOCAL_WRITE),
+        AgentSkill(id="lifestyle_chat", name="Lifestyle", description="Handle casual human requests.", keywords=["你好", "最近", "聊聊", "吃饭", "嘿"], risk_tier=RiskTier.READ_ONLY),
+        AgentSkill(id="brain_rescue", name="Brain Rescue", description="Generic skill for real-time brain intervention.", risk_tier=RiskTier.EXTERNAL),
+        AgentSkill(id="list_skills", name="List Registered Skills", description="List all skills currently loaded in Janus.", keywords=["功能", "技能", "你会什么", "列表"], risk_tier=RiskTier.READ_ONLY),
+        AgentSkill(id="system_stats", name="System Stats", description="Check disk space and system health.", keywords=["磁盘", "空间", "状态"], risk_tier=RiskTier.READ_ONLY),
+        AgentSkill(id="refresh_rules", name="Refresh Rules", description="Reload perception reflex rules from knowledge store.", risk_tier=RiskTier.LOCAL_WRITE),
+        AgentSkill(id="check_version", name="Check Version", description="Show the JANUS core version.", risk_tier=RiskTier.READ_ONLY),
+        AgentSkill(id="runtime_stats", name="Runtime Stats", description="Show runtime statistics: intent cache hit rate, audit timings, sensor duty cycles.", risk_tier=RiskTier.READ_ONLY),
     ]
     for s in skills:
         dispatcher.register_skill(s, mcp_executor)
@@ -356,14 +442,8 @@ async def start_janus():
 
                 # --- 动态提示符引擎 (Dynamic Prompt Engine) ---
                 def get_prompt():
-                    # 实时扫描是否有挂起的建议
-                    suggestion_found = False
-                    for tid in list(dispatcher.active_tasks.keys()):
-                        if tid.startswith("suggest_"):
-                            suggestion_found = True
-                            break
-                    
-                    if suggestion_found:
+                    # 是否有挂起的建议 (O(1) 计数由调度器维护)
+                    if dispatcher.pending_suggestion_count:
                         return HTML('<ansigreen>确认执行以上建议？(y/n) ：</ansigreen>')
                     return "[用户] > "
 
@@ -384,12 +464,7 @@ async def start_janus():
                 
                 # --- 核心拦截：全时段建议优先级 (Priority Interception) ---
                 if user_input.lower() in ['y', 'n']:
-                    # 使用前缀强力拉取建议
-                    potential_suggestion = None
-                    for tid, t in list(dispatcher.active_tasks.items()):
-                        if tid.startswith("suggest_"):
-                            potential_suggestion = t
-                            break
+                    potential_suggestion = dispatcher.next_suggestion()
                     
                     if potential_suggestion:
                         if user_input.lower() == 'y':
@@ -400,8 +475,7 @@ async def start_janus():
                         else:
                             print("[系统] 建议内容已被忽略。")
                         
-                        if potential_suggestion.task_id in dispatcher.active_tasks:
-                            del dispatcher.active_tasks[potential_suggestion.task_id]
+                        dispatcher.release_task(potential_suggestion.task_id)
                         continue
                     else:
                         pass
@@ -409,6 +483,11 @@ async def start_janus():
 
 
 
+                # --- 自由对话 (流式渲染，不经过技能路由) ---
+                if user_input.lower().startswith("chat "):
+                    await stream_chat(dispatcher.provider, user_input[5:].strip())
+                    continue
+
                 # --- 正常查询处理 ---
                 context = await dispatcher.handle_query(user_input)
 
@@ -419,8 +498,7 @@ async def start_janus():
                          context = await dispatcher.run_task(context)
                      else:
                          print("[系统] 指令未识别。输入 'list_skills' 查看可用功能。")
-                         if context.task_id in dispatcher.active_tasks:
-                             del dispatcher.active_tasks[context.task_id]
+                         dispatcher.release_task(context.task_id)
                          continue
 
                 # --- 人机协同环节 (Human-in-the-loop for Auditing) ---
@@ -456,6 +534,11 @@ async def start_janus():
                 
     # Shutdown
     await sensor_manager.stop_all()
+    await dispatcher.perception.aclose()
+    # 意图缓存落盘 (装饰层会把 save 委托到内层的 CachingProvider)
+    save_cache = getattr(provider, "save", None)
+    if callable(save_cache):
+        save_cache()
     print("\n[系统] 感知器已关闭。")
 
 if __name__ == "__main__":
@@ -0,0 +1,331 @@
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.schema import AuditResult, AuditStatus, Message, MessageRole, RiskTier, TaskContext
+from core.audit import AIAuditor, BaseAuditor, CachedAuditor, CompositeAuditor, context_risk_tier, suspicious_parameter
+
+
+class ScriptedAuditor(BaseAuditor):
+    """延迟 delay 秒后给出固定结论，记录调用与取消次数"""
+    def __init__(self, status=AuditStatus.PASS, risk_level=1, delay=0.0):
+        self.status = status
+        self.risk_level = risk_level
+        self.delay = delay
+        self.counters = {"calls": 0, "cancelled": 0}  # 计数不计入审计器配置指纹
+
+    @property
+    def calls(self) -> int:
+        return self.counters["calls"]
+
+    @property
+    def cancelled(self) -> int:
+        return self.counters["cancelled"]
+
+    async def audit(self, skill_id, parameters, context) -> AuditResult:
+        self.counters["calls"] += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.counters["cancelled"] += 1
+            raise
+        return AuditResult(status=self.status, rationale=f"{type(self).__name__} says {self.status.value}",
+                           risk_level=self.risk_level)
+
+
+class RuleStub(ScriptedAuditor):
+    pass
+
+
+class AIStub(ScriptedAuditor):
+    pass
+
+
+def _context(query: str = "查看系统状态", risk_tier=None) -> TaskContext:
+    metadata = {"risk_tier": risk_tier} if risk_tier else {}
+    return TaskContext(task_id="t1", messages=[Message(role=MessageRole.USER, content=query)], metadata=metadata)
+
+
+def test_auditors_run_concurrently():
+    async def scenario():
+        auditor = CompositeAuditor([RuleStub(delay=0.1), AIStub(delay=0.1)])
+        started = time.perf_counter()
+        result = await auditor.audit("system_stats", {}, _context())
+        assert time.perf_counter() - started < 0.18
+        assert result.status == AuditStatus.PASS
+        assert result.audit_trail[0] == "tier: undeclared" and len(result.audit_trail) == 3
+        stats = auditor.stats()
+        assert stats["serial_estimate_ms"] > stats["avg_wall_ms"]
+
+    asyncio.run(scenario())
+
+
+def test_fail_short_circuits_and_cancels_slow_auditors():
+    async def scenario():
+        slow = AIStub(delay=1.0)
+        auditor = CompositeAuditor([RuleStub(status=AuditStatus.FAIL, risk_level=10), slow])
+        started = time.perf_counter()
+        result = await auditor.audit("cleaner", {"path": "/"}, _context())
+        await asyncio.sleep(0)
+        assert time.perf_counter() - started < 0.5
+        assert result.status == AuditStatus.FAIL and slow.cancelled == 1
+        assert "AIStub: cancelled" in result.audit_trail
+        assert auditor.counters["short_circuits"] == 1 and auditor.counters["cancelled"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_highest_risk_verdict_wins():
+    async def scenario():
+        auditor = CompositeAuditor([
+            RuleStub(status=AuditStatus.PASS, risk_level=2),
+            AIStub(status=AuditStatus.WARN, risk_level=5, delay=0.02),
+        ])
+        result = await auditor.audit("list_files", {"pattern": "*"}, _context())
+        assert result.status == AuditStatus.WARN and result.rationale == "AIStub says warn"
+
+        tie = CompositeAuditor([RuleStub(risk_level=3, delay=0.02), AIStub(risk_level=3)])
+        assert (await tie.audit("x", {}, _context())).rationale == "RuleStub says pass"  # 同等级取顺序靠前者
+
+    asyncio.run(scenario())
+
+
+def test_deadline_policies():
+    async def scenario():
+        expected = {"warn": AuditStatus.WARN, "fail": AuditStatus.FAIL, "ignore": AuditStatus.PASS}
+        for policy, status in expected.items():
+            auditor = CompositeAuditor([RuleStub(), AIStub(delay=1.0)], deadline=0.05, timeout_policy=policy)
+            result = await auditor.audit("x", {}, _context())
+            assert result.status == status, policy
+            assert not result.cacheable  # 超时得出的结论不可缓存
+            assert f"AIStub: timeout after 0.05s -> {policy}" in result.audit_trail
+            assert auditor.counters["timeouts"] == 1
+
+        # 按类名单独设置时限：规则审计器不受 AI 时限影响
+        auditor = CompositeAuditor([RuleStub(delay=0.08), AIStub(delay=0.08)], deadline=1.0,
+                                   deadlines={"AIStub": 0.02}, timeout_policy="fail")
+        result = await auditor.audit("x", {}, _context())
+        assert result.status == AuditStatus.FAIL and "AIStub" in result.rationale
+
+        try:
+            CompositeAuditor([RuleStub()], timeout_policy="retry")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("unknown timeout policy should be rejected")
+
+    asyncio.run(scenario())
+
+
+def test_suspicious_parameter_detection():
+    clean = {"city": "北京", "days": 3, "paths": ["docs/readme.md", "src"], "opts": {"depth": 1}}
+    assert suspicious_parameter(clean) is None
+    cases = {
+        "../etc/passwd": "value", "a; rm -rf": "value", "$(whoami)": "value", "`id`": "value",
+        "*.log": "value", "/etc/shadow": "value", "~/.ssh": "value", "out > file": "value",
+        "ok\nrm -rf /": "value", "ok\rcurl evil": "value",
+    }
+    for text, key in cases.items():
+        assert suspicious_parameter(text) == key, text
+    assert suspicious_parameter({"opts": {"targets": ["a", "b|c"]}}) == "opts.targets.1"
+
+
+def test_context_risk_tier_parsing():
+    assert context_risk_tier(_context(risk_tier="read_only")) == RiskTier.READ_ONLY
+    assert context_risk_tier(_context(risk_tier="bogus")) is None
+    assert context_risk_tier(_context()) is None
+
+
+def _tiered(rule=None, ai=None):
+    rule = rule or RuleStub()
+    ai = ai or AIStub(status=AuditStatus.WARN, risk_level=6)
+    return CompositeAuditor([rule], escalation=[ai]), rule, ai
+
+
+def test_read_only_clean_call_skips_expensive_audit():
+    async def scenario():
+        auditor, _, ai = _tiered()
+        result = await auditor.audit("weather_expert", {"city": "北京"}, _context(risk_tier="read_only"))
+        assert result.status == AuditStatus.PASS and ai.calls == 0
+        assert "AIStub: skipped (low-risk tier, rule audit clean)" in result.audit_trail
+        assert auditor.counters["skipped"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_read_only_escalates_on_suspicious_input_or_rule_concern():
+    async def scenario():
+        # 参数中的换行可拼接第二条命令：即便声明只读也要升级复核
+        auditor, _, ai = _tiered()
+        result = await auditor.audit("weather_expert", {"city": "北京\nrm -rf ~"}, _context(risk_tier="read_only"))
+        assert ai.calls == 1 and result.status == AuditStatus.WARN
+        assert "escalated: suspicious parameter 'city'" in result.audit_trail
+
+        auditor, _, ai = _tiered(rule=RuleStub(status=AuditStatus.WARN, risk_level=5))
+        result = await auditor.audit("weather_expert", {"city": "北京"}, _context(risk_tier="read_only"))
+        assert ai.calls == 1 and "escalated: rule verdict warn (risk 5)" in result.audit_trail
+
+        auditor, rule, ai = _tiered(rule=RuleStub(status=AuditStatus.FAIL, risk_level=10))
+        result = await auditor.audit("weather_expert", {"city": "x"}, _context(risk_tier="read_only"))
+        assert result.status == AuditStatus.FAIL and ai.calls == 0
+
+    asyncio.run(scenario())
+
+
+def test_other_tiers_run_full_review():
+    async def scenario():
+        for tier in ("local_write", "destructive", "external", None):
+            auditor, rule, ai = _tiered()
+            result = await auditor.audit("cleaner_expert", {"days": 7}, _context(risk_tier=tier))
+            assert rule.calls == ai.calls == 1, tier
+            assert f"escalated: tier {tier or 'undeclared'}" in result.audit_trail
+            assert result.status == AuditStatus.WARN
+
+    asyncio.run(scenario())
+
+
+def test_shell_backed_skills_are_not_declared_read_only():
+    manifest_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "core", "dynamic_skills")
+    tiers = {}
+    for path in glob.glob(os.path.join(manifest_dir, "*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if "risk_tier" in manifest:
+            tiers[manifest["id"]] = RiskTier(manifest["risk_tier"])  # 非法等级会抛出 ValueError
+    assert tiers["cleaner_expert"] != RiskTier.READ_ONLY
+    assert tiers["memory_cleaner"] == tiers["gene_remover"] == RiskTier.DESTRUCTIVE
+
+
+def test_brain_rescue_skills_are_not_skip_eligible():
+    """返回 “大脑救助” 暗号的技能会被 Dispatcher 转交 brain_rescue 生成代码，不能走只读快速通道"""
+    manifest_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "core", "dynamic_skills")
+    skip_tiers = _tiered()[0].skip_tiers
+    rescuers = []
+    for path in glob.glob(os.path.join(manifest_dir, "*.py")):
+        with open(path, "r", encoding="utf-8") as f:
+            if "大脑救助" not in f.read():
+                continue
+        with open(path[:-len(".py")] + ".json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        rescuers.append(manifest["id"])
+        tier = manifest.get("risk_tier")  # 未声明等级的技能本就不走快速通道
+        assert tier is None or RiskTier(tier) not in skip_tiers, manifest["id"]
+    assert {"translator_expert", "memory_synthesizer", "reflex_expert"} <= set(rescuers)
+
+
+def test_cache_stores_only_reusable_pass_and_fail():
+    async def scenario():
+        for status, cached in ((AuditStatus.PASS, True), (AuditStatus.FAIL, True), (AuditStatus.WARN, False)):
+            inner = RuleStub(status=status)
+            auditor = CachedAuditor(inner)
+            first = await auditor.audit("x", {"a": 1}, _context())
+            second = await auditor.audit("x", {"a": 1}, _context())
+            assert inner.calls == (1 if cached else 2), status
+            assert second.status == first.status
+            if cached:
+                assert second.audit_trail[0].startswith("cache: hit")
+                assert auditor.stats()["hit_rate"] == 0.5
+
+        # 超时得出的结论不可缓存
+        timed_out = CompositeAuditor([RuleStub(), AIStub(delay=1.0)], deadline=0.02, timeout_policy="ignore")
+        auditor = CachedAuditor(timed_out)
+        for _ in range(2):
+            await auditor.audit("x", {}, _context())
+        assert auditor.counters["stores"] == 0 and auditor.counters["skipped"] == 2
+
+    asyncio.run(scenario())
+
+
+class BrokenProvider:
+    async def chat(self, messages):
+        raise ConnectionError("gateway down")
+
+
+def test_degraded_ai_verdict_not_cached():
+    async def scenario():
+        auditor = CachedAuditor(AIAuditor(BrokenProvider()))
+        result = await auditor.audit("x", {}, _context())
+        assert result.status == AuditStatus.PASS and not result.cacheable
+        assert auditor.stats()["entries"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cache_key_covers_parameters_query_and_tier():
+    async def scenario():
+        inner = RuleStub()
+        auditor = CachedAuditor(inner)
+        await auditor.audit("x", {"a": 1, "b": 2}, _context("查看系统状态"))
+        await auditor.audit("x", {"b": 2, "a": 1}, _context("查看系统状态？"))  # 键序与句末标点不影响
+        assert inner.calls == 1
+        await auditor.audit("x", {"a": 1, "b": 3}, _context("查看系统状态"))
+        await auditor.audit("x", {"a": 1, "b": 2}, _context("删除系统状态"))
+        await auditor.audit("x", {"a": 1, "b": 2}, _context("查看系统状态", risk_tier="read_only"))
+        await auditor.audit("y", {"a": 1, "b": 2}, _context("查看系统状态"))
+        assert inner.calls == 5
+
+    asyncio.run(scenario())
+
+
+def test_cache_expiry_and_eviction():
+    async def scenario():
+        inner = RuleStub()
+        auditor = CachedAuditor(inner, ttl=0)
+        await auditor.audit("x", {}, _context())
+        await auditor.audit("x", {}, _context())
+        assert inner.calls == 2 and auditor.counters["expired"] == 1
+
+        inner = RuleStub()
+        auditor = CachedAuditor(inner, max_entries=2)
+        for skill in ("a", "b", "a", "c", "a", "b"):  # c 挤掉最久未用的 b
+            await auditor.audit(skill, {}, _context())
+        assert inner.calls == 4 and auditor.counters["evictions"] >= 1
+
+    asyncio.run(scenario())
+
+
+def test_config_change_invalidates_cache_on_reconfigure():
+    async def scenario():
+        composite = CompositeAuditor([RuleStub()], timeout_policy="warn")
+        auditor = CachedAuditor(composite)
+        fingerprints = []
+        original_config = composite.config
+        composite.config = lambda: fingerprints.append(1) or original_config()
+        for _ in range(3):
+            await auditor.audit("x", {}, _context())
+        assert auditor.counters["hits"] == 2 and fingerprints == []  # 指纹不在审计热路径上计算
+        del composite.config
+
+        composite.timeout_policy = "fail"
+        await auditor.audit("x", {}, _context())
+        assert auditor.counters["hits"] == 3  # 就地修改后未通知：仍按旧指纹命中
+        auditor.reconfigure()
+        await auditor.audit("x", {}, _context())
+        assert auditor.counters["invalidations"] == 1 and auditor.counters["hits"] == 3
+
+        composite.counters["audits"] += 100  # 统计计数不影响指纹
+        auditor.reconfigure()
+        await auditor.audit("x", {}, _context())
+        assert auditor.counters["invalidations"] == 1 and auditor.counters["hits"] == 4
+
+        auditor.reconfigure(CompositeAuditor([RuleStub(risk_level=2)], timeout_policy="fail"))  # 子审计器配置变化
+        assert auditor.counters["invalidations"] == 2 and auditor.stats()["entries"] == 0
+        await auditor.audit("x", {}, _context())
+        auditor.invalidate()  # 显式失效：无条件清空
+        assert auditor.counters["invalidations"] == 3 and auditor.stats()["entries"] == 0
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.schema import AgentSkill, AuditResult, AuditStatus, Intent, Message, TaskStatus
+from core.provider import BaseProvider
+from core.audit import BaseAuditor
+from core.executor import BaseExecutor
+from core.dispatcher import Dispatcher
+from core.memory import MirrorMemory, KnowledgeStore
+from core.sensors.chronos import ChronosSensor, ScheduledJob
+from core.sensors.cron import CronExpression
+
+
+class IdleProvider(BaseProvider):
+    async def chat(self, messages: list[Message]) -> str:
+        return ""
+
+    async def resolve_intent(self, query: str, skills: list[AgentSkill], **kwargs) -> Intent:
+        return Intent(raw_query=query, thought_process="unused", confidence=0.0)
+
+
+class FixedAuditor(BaseAuditor):
+    """返回固定结论并记录被审计的调用"""
+    def __init__(self, status: AuditStatus):
+        self.status = status
+        self.calls = []
+
+    async def audit(self, skill_id, parameters, context) -> AuditResult:
+        self.calls.append((skill_id, dict(parameters), context.metadata.get("risk_tier")))
+        return AuditResult(status=self.status, rationale=f"fixed {self.status.value}", risk_level=1)
+
+
+class RecordingExecutor(BaseExecutor):
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, skill_id, parameters, context):
+        self.calls.append((skill_id, dict(parameters)))
+        return "done"
+
+
+def _dispatcher(workdir: str, status: AuditStatus):
+    auditor = FixedAuditor(status)
+    dispatcher = Dispatcher(
+        provider=IdleProvider(), auditor=auditor,
+        memory=MirrorMemory(os.path.join(workdir, "mirror")),
+        knowledge=KnowledgeStore(os.path.join(workdir, "knowledge.json")),
+    )
+    executor = RecordingExecutor()
+    dispatcher.register_skill(
+        AgentSkill(id="nightly_probe", name="Nightly Probe", description="test skill", risk_tier="local_write"),
+        executor,
+    )
+    return dispatcher, auditor, executor
+
+
+def _sensor(dispatcher, workdir: str, **job_kwargs) -> ChronosSensor:
+    job = ScheduledJob(name="probe", cron="0 2 * * *", skill_id="nightly_probe", params={"depth": 1}, **job_kwargs)
+    return ChronosSensor(dispatcher.perception, jobs=[job], state_path=os.path.join(workdir, "chronos.json"))
+
+
+# --- cron 表达式 ---
+
+def test_cron_next_after_daily():
+    cron = CronExpression("30 3 * * *")
+    assert cron.next_after(datetime(2026, 1, 1, 3, 29)) == datetime(2026, 1, 1, 3, 30)
+    assert cron.next_after(datetime(2026, 1, 1, 3, 30)) == datetime(2026, 1, 2, 3, 30)
+
+
+def test_cron_steps_lists_and_names():
+    cron = CronExpression("*/20 9-10 * jan,feb mon")
+    assert cron.next_after(datetime(2026, 1, 1, 0, 0)) == datetime(2026, 1, 5, 9, 0)  # 2026-01-05 为周一
+    assert cron.next_after(datetime(2026, 1, 5, 9, 0)) == datetime(2026, 1, 5, 9, 20)
+    assert cron.next_after(datetime(2026, 1, 5, 10, 40)) == datetime(2026, 1, 12, 9, 0)
+
+
+def test_cron_day_fields_are_ored():
+    cron = CronExpression("0 0 13 * fri")
+    fires = []
+    t = datetime(2026, 2, 1)
+    for _ in range(4):
+        t = cron.next_after(t)
+        fires.append(t.date().isoformat())
+    assert fires == ["2026-02-06", "2026-02-13", "2026-02-20", "2026-02-27"]
+
+
+def test_cron_macros_and_sunday_alias():
+    assert CronExpression("@daily").next_after(datetime(2026, 3, 1, 12, 0)) == datetime(2026, 3, 2, 0, 0)
+    assert CronExpression("0 0 * * 7").next_after(datetime(2026, 3, 2)) == datetime(2026, 3, 8)
+
+
+def test_cron_rejects_invalid():
+    for expr in ("* * * *", "61 * * * *", "*/0 * * * *", "0 0 30 2 *"):
+        try:
+            CronExpression(expr).next_after(datetime(2026, 1, 1))
+        except ValueError:
+            continue
+        raise AssertionError(f"{expr!r} should be rejected")
+
+
+# --- 定时任务经过审计管线 ---
+
+def test_scheduled_job_runs_after_audit_pass():
+    async def scenario(workdir):
+        dispatcher, auditor, executor = _dispatcher(workdir, AuditStatus.PASS)
+        sensor = _sensor(dispatcher, workdir)
+        scheduled = datetime.now().replace(second=0, microsecond=0)
+        await sensor._fire(sensor.jobs["probe"], scheduled, scheduled + timedelta(seconds=5))
+        context = await asyncio.wait_for(dispatcher.completed_tasks_queue.get(), timeout=2)
+
+        assert auditor.calls == [("nightly_probe", {"depth": 1}, "local_write")]
+        assert executor.calls == [("nightly_probe", {"depth": 1})]
+        assert context.status == TaskStatus.COMPLETED
+        assert not dispatcher.active_tasks
+
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(scenario(workdir))
+
+
+def test_scheduled_job_blocked_by_audit():
+    async def scenario(workdir, status):
+        dispatcher, auditor, executor = _dispatcher(workdir, status)
+        sensor = _sensor(dispatcher, workdir)
+        scheduled = datetime.now().replace(second=0, microsecond=0)
+        await sensor._fire(sensor.jobs["probe"], scheduled, scheduled)
+        await asyncio.sleep(0.05)
+
+        assert len(auditor.calls) == 1
+        assert executor.calls == []  # WARN 无人确认，与 FAIL 一样不执行
+        assert dispatcher.completed_tasks_queue.empty()
+        assert not dispatcher.active_tasks
+
+    for status in (AuditStatus.FAIL, AuditStatus.WARN):
+        with tempfile.TemporaryDirectory() as workdir:
+            asyncio.run(scenario(workdir, status))
+
+
+def test_missed_trigger_outside_window_is_skipped():
+    async def scenario(workdir):
+        dispatcher, auditor, executor = _dispatcher(workdir, AuditStatus.PASS)
+        sensor = _sensor(dispatcher, workdir, catch_up_window=3600)
+        job = sensor.jobs["probe"]
+        scheduled = datetime(2026, 1, 1, 2, 0)
+        await sensor._fire(job, scheduled, scheduled + timedelta(hours=2))
+
+        assert job.missed == 1 and job.runs == 0
+        assert auditor.calls == [] and executor.calls == []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(scenario(workdir))
+
+
+def test_state_round_trip_plans_from_last_run():
+    with tempfile.TemporaryDirectory() as workdir:
+        dispatcher, _, _ = _dispatcher(workdir, AuditStatus.PASS)
+        sensor = _sensor(dispatcher, workdir)
+        sensor.jobs["probe"].last_run = datetime(2026, 1, 1, 2, 0)
+        sensor._save_state()
+
+        restored = _sensor(dispatcher, workdir)
+        restored._load_state()
+        restored._plan(datetime(2026, 1, 5))
+        assert restored.jobs["probe"].next_run == datetime(2026, 1, 2, 2, 0)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.memory import EpisodicFactSink, KnowledgeStore
+
+
+class SlowStore:
+    """add_facts 在工作线程中耗时提交的知识库替身"""
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches = []
+        self.committing = threading.Event()
+
+    def add_facts(self, facts):
+        self.committing.set()
+        time.sleep(self.delay)
+        self.batches.append([f["content"] for f in facts])
+        return len(facts)
+
+
+def test_window_coalesces_duplicates_into_one_commit():
+    async def scenario():
+        store = SlowStore()
+        sink = EpisodicFactSink(store, window=0.05)
+        for content in ("a", "b", "a", "c", "b"):
+            sink.submit("Perception", content, "test")
+        await asyncio.sleep(0.2)
+        assert store.batches == [["a", "b", "c"]]
+        assert sink.stats == {"submitted": 5, "coalesced": 2, "commits": 1, "facts_written": 3}
+
+    asyncio.run(scenario())
+
+
+def test_full_batch_commits_before_window():
+    async def scenario():
+        store = SlowStore()
+        sink = EpisodicFactSink(store, window=10.0, max_batch=3)
+        for content in ("a", "b", "c"):
+            sink.submit("Perception", content, "test")
+        await asyncio.sleep(0.1)
+        assert store.batches == [["a", "b", "c"]]
+        await sink.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_aclose_waits_for_in_flight_commit():
+    """aclose 期间已在工作线程中的提交必须完成并计入统计，而不是被取消后遗留在后台"""
+    async def scenario():
+        store = SlowStore(delay=0.3)
+        sink = EpisodicFactSink(store, window=0.01)
+        sink.submit("Perception", "first", "test")
+        await asyncio.to_thread(store.committing.wait, 2)  # 第一批已进入工作线程
+        sink.submit("Perception", "second", "test")
+        await sink.aclose()
+
+        assert store.batches == [["first"], ["second"]]
+        assert sink.stats["commits"] == 2
+        assert sink.stats["facts_written"] == 2
+        assert sink._task is None
+
+    asyncio.run(scenario())
+
+
+def test_aclose_flushes_pending_without_waiting_window():
+    async def scenario():
+        store = SlowStore()
+        sink = EpisodicFactSink(store, window=30.0)
+        sink.submit("Perception", "late", "test")
+        started = time.monotonic()
+        await sink.aclose()
+        assert time.monotonic() - started < 1.0
+        assert store.batches == [["late"]]
+
+    asyncio.run(scenario())
+
+
+def test_commits_into_knowledge_store():
+    async def scenario(path):
+        store = KnowledgeStore(path)
+        sink = EpisodicFactSink(store, window=0.01)
+        sink.submit("Perception", "[VISUAL] 文件变更", "PerceptionBus")
+        sink.submit("Perception", "[VISUAL] 文件变更", "PerceptionBus")
+        await sink.aclose()
+        assert [f["content"] for f in KnowledgeStore(path).query_facts("文件变更")] == ["[VISUAL] 文件变更"]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(scenario(os.path.join(workdir, "knowledge.json")))
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
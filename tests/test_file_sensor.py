@@ -0,0 +1,346 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sensors import SensorManager
+from core.sensors.file_sensor import FileSensor, compute_fingerprint
+from core.sensors.inotify import inotify_available
+
+
+class RecordingBus:
+    """
+    记录 emit 调用的感知总线替身 (Bus stand-in that records emitted events)
+    """
+    def __init__(self):
+        self.events = []
+        self._arrived = asyncio.Event()
+
+    async def emit(self, source, data, importance=0.5):
+        self.events.append((time.monotonic(), source, data))
+        self._arrived.set()
+
+    def texts(self) -> list:
+        return [data for _, _, data in self.events]
+
+    async def wait_for(self, fragment: str, timeout: float) -> float:
+        """等待包含 fragment 的事件，返回其到达时刻"""
+        deadline = time.monotonic() + timeout
+        while True:
+            for at, _, data in self.events:
+                if fragment in data:
+                    return at
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise AssertionError(f"no event containing {fragment!r} within {timeout}s: {self.events}")
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def _wait_ready(sensor: FileSensor, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not sensor.initial_scan_done:
+        assert time.monotonic() < deadline, "initial scan did not finish"
+        await asyncio.sleep(0.01)
+
+
+def test_poll_detects_in_place_edit_within_one_interval():
+    """原地写入不改变目录 mtime，轮询模式仍须在一个基础间隔内发现 (即使间隔已退避)"""
+    async def scenario(workdir: str, state_dir: str):
+        target = os.path.join(workdir, "notes.md")
+        with open(target, "w") as f:
+            f.write("v1")
+
+        bus = RecordingBus()
+        interval = 0.3
+        sensor = FileSensor(bus, workdir, interval=interval, backend="poll", debounce=0, state_dir=state_dir)
+        await sensor.start()
+        try:
+            await _wait_ready(sensor)
+            # 让若干空闲周期过去，覆盖 "间隔退避 + 按轮数全量 stat" 的回归场景
+            await asyncio.sleep(interval * 4)
+            dir_mtime = os.stat(workdir).st_mtime_ns
+
+            edited_at = time.monotonic()
+            with open(target, "w") as f:
+                f.write("version two")
+            assert os.stat(workdir).st_mtime_ns == dir_mtime
+
+            arrived = await bus.wait_for("活动文件变更: notes.md", timeout=interval * 3)
+            assert arrived - edited_at <= interval * 1.5, f"edit seen after {arrived - edited_at:.2f}s"
+        finally:
+            await sensor.stop()
+
+    with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+        asyncio.run(scenario(workdir, state_dir))
+
+
+def _poll_sensor(workdir: str, state_dir: str, bus=None, **kwargs) -> FileSensor:
+    return FileSensor(bus or RecordingBus(), workdir, backend="poll", state_dir=state_dir, **kwargs)
+
+
+def _prime(sensor: FileSensor):
+    """不启动主循环，直接完成初始扫描 (轮询后端)"""
+    async def prime():
+        for spec in sensor.watchset.load():
+            await sensor._activate_root(spec)
+        sensor.initial_scan_done = True
+    return prime()
+
+
+def test_poll_relists_only_changed_directories():
+    async def scenario(workdir: str, state_dir: str):
+        for i in range(20):
+            os.makedirs(os.path.join(workdir, f"d{i}"))
+            for j in range(5):
+                with open(os.path.join(workdir, f"d{i}", f"f{j}.py"), "w") as f:
+                    f.write("x")
+        bus = RecordingBus()
+        sensor = _poll_sensor(workdir, state_dir, bus)
+        await _prime(sensor)
+        root = sensor.roots[sensor.watch_path]
+        assert len(root.index) == 100 and bus.texts() == []
+
+        listed = []
+        original = os.scandir
+
+        def counting_scandir(path):
+            listed.append(path)
+            return original(path)
+
+        os.scandir = counting_scandir
+        try:
+            await sensor._poll_tree(root, root.path)
+            assert listed == []  # 目录 mtime 均未变化：复用缓存列表
+            with open(os.path.join(workdir, "d3", "new.py"), "w") as f:
+                f.write("y")
+            await sensor._poll_tree(root, root.path)
+            assert listed == [os.path.join(workdir, "d3")]
+        finally:
+            os.scandir = original
+        assert bus.texts() == [f"检测到新文件创建: {os.path.join('d3', 'new.py')}"]
+        await sensor.stop()
+
+    with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+        asyncio.run(scenario(workdir, state_dir))
+
+
+def test_idle_poll_cost_bounded_by_sweep_batch():
+    """未变化的大目录树上，每轮空闲轮询的 stat 次数不随文件总数增长，原地修改仍在一遍轮转内被发现"""
+    async def scenario(workdir: str, state_dir: str):
+        dirs, per_dir, batch = 40, 50, 256
+        for i in range(dirs):
+            os.makedirs(os.path.join(workdir, f"d{i}"))
+            for j in range(per_dir):
+                with open(os.path.join(workdir, f"d{i}", f"f{j}.py"), "w") as f:
+                    f.write("x")
+        bus = RecordingBus()
+        sensor = _poll_sensor(workdir, state_dir, bus, sweep_batch=batch)
+        await _prime(sensor)
+        assert len(sensor.roots[sensor.watch_path].index) == dirs * per_dir
+
+        counts = {"stat": 0, "scandir": 0}
+        original_stat, original_scandir = os.stat, os.scandir
+
+        def counting_stat(*args, **kwargs):
+            counts["stat"] += 1
+            return original_stat(*args, **kwargs)
+
+        def counting_scandir(*args, **kwargs):
+            counts["scandir"] += 1
+            return original_scandir(*args, **kwargs)
+
+        os.stat, os.scandir = counting_stat, counting_scandir
+        try:
+            per_cycle = []
+            for _ in range(5):
+                counts["stat"] = counts["scandir"] = 0
+                await sensor._poll_once()
+                per_cycle.append(dict(counts))
+            # 每轮：每个目录一次 stat + 至多 sweep_batch (加最后一个目录的余量) 次文件 stat，不重新列目录
+            assert all(c["scandir"] == 0 for c in per_cycle), per_cycle
+            assert all(c["stat"] <= (dirs + 1) + batch + per_dir + 5 for c in per_cycle), per_cycle
+
+            target = os.path.join(workdir, "d17", "f23.py")
+            with open(target, "w") as f:
+                f.write("edited")
+            st = original_stat(target)
+            os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+            os.utime(os.path.dirname(target), ns=(original_stat(os.path.dirname(target)).st_atime_ns,
+                                                  original_stat(os.path.dirname(target)).st_mtime_ns))
+            expected = f"检测到活动文件变更: {os.path.join('d17', 'f23.py')}"
+            for _ in range(-(-dirs * per_dir // batch) + 1):
+                await sensor._poll_once()
+                if expected in bus.texts():
+                    break
+            assert bus.texts() == [expected]
+        finally:
+            os.stat, os.scandir = original_stat, original_scandir
+        await sensor.stop()
+
+    with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+        asyncio.run(scenario(workdir, state_dir))
+
+
+def test_poll_reports_deleted_files_and_trees():
+    async def scenario(workdir: str, state_dir: str):
+        os.makedirs(os.path.join(workdir, "keep"))
+        os.makedirs(os.path.join(workdir, "gone", "deep"))
+        for rel in ("keep/a.py", "keep/b.py", "gone/deep/c.md"):
+            with open(os.path.join(workdir, rel), "w") as f:
+                f.write(rel)
+        bus = RecordingBus()
+        sensor = _poll_sensor(workdir, state_dir, bus)
+        await _prime(sensor)
+        root = sensor.roots[sensor.watch_path]
+
+        os.remove(os.path.join(workdir, "keep", "b.py"))
+        shutil.rmtree(os.path.join(workdir, "gone"))
+        await sensor._poll_tree(root, root.path)
+        assert sorted(bus.texts()) == sorted([
+            f"检测到文件删除: {os.path.join('keep', 'b.py')}",
+            f"检测到文件删除: {os.path.join('gone', 'deep', 'c.md')}",
+        ])
+        assert sorted(root.index) == [os.path.join(workdir, "keep", "a.py")]
+        assert all(not d.startswith(os.path.join(workdir, "gone")) for d in root.dir_cache)
+        await sensor.stop()
+
+    with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+        asyncio.run(scenario(workdir, state_dir))
+
+
+def test_touch_without_content_change_is_silent():
+    """[AI-SAFEGUARD] 双检：mtime 变化但内容未变不应上报"""
+    async def scenario(workdir: str, state_dir: str):
+        target = os.path.join(workdir, "same.py")
+        with open(target, "w") as f:
+            f.write("same")
+        bus = RecordingBus()
+        sensor = _poll_sensor(workdir, state_dir, bus)
+        await _prime(sensor)
+        root = sensor.roots[sensor.watch_path]
+        st = os.stat(target)
+        os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+        await sensor._poll_tree(root, root.path, full_sweep=True)
+        assert bus.texts() == []
+        assert root.index[target].mtime == os.stat(target).st_mtime
+        await sensor.stop()
+
+    with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+        asyncio.run(scenario(workdir, state_dir))
+
+
+def test_fingerprint_full_and_partial():
+    with tempfile.TemporaryDirectory() as workdir:
+        small = os.path.join(workdir, "small.py")
+        with open(small, "wb") as f:
+            f.write(b"hello")
+        assert compute_fingerprint(small) == hashlib.sha256(b"hello").hexdigest()
+        assert compute_fingerprint(small, "blake2b") == hashlib.blake2b(b"hello", digest_size=20).hexdigest()
+
+        big = os.path.join(workdir, "big.bin")
+        payload = bytearray(os.urandom(300 * 1024))
+        with open(big, "wb") as f:
+            f.write(payload)
+        first = compute_fingerprint(big, partial_threshold=100 * 1024)
+        assert first.startswith("partial:")
+
+        # 尾部变化可被部分指纹捕获
+        with open(big, "r+b") as f:
+            f.seek(-10, os.SEEK_END)
+            f.write(b"0123456789")
+        assert compute_fingerprint(big, partial_threshold=100 * 1024) != first
+        # 低于阈值时仍走全量哈希
+        assert not compute_fingerprint(big, partial_threshold=1024 * 1024).startswith("partial:")
+        assert compute_fingerprint(os.path.join(workdir, "missing.py")) is None
+
+
+def test_hash_many_preserves_order_off_loop():
+    async def scenario(workdir: str, state_dir: str):
+        paths = []
+        for i in range(37):
+            path = os.path.join(workdir, f"f{i}.py")
+            with open(path, "w") as f:
+                f.write(f"content {i}")
+            paths.append(path)
+        sensor = _poll_sensor(workdir, state_dir, hash_workers=4, hash_mode="blake2b")
+        hashes = await sensor._hash_many(paths)
+        assert hashes == [compute_fingerprint(p, "blake2b") for p in paths]
+        assert sensor._hash_pool._max_workers == 4
+        await sensor.stop()
+        assert sensor._hash_pool is None
+
+    with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+        asyncio.run(scenario(workdir, state_dir))
+
+
+def test_unknown_hash_mode_rejected():
+    try:
+        FileSensor(RecordingBus(), ".", hash_mode="md5")
+    except ValueError:
+        return
+    raise AssertionError("md5 should be rejected")
+
+
+def test_supervisor_restart_rewatches_roots():
+    """主循环崩溃后由 SensorManager 重启：新的 inotify 实例必须重新注册 watch，变更继续上报"""
+    if not inotify_available():
+        print("inotify unavailable, skipped")
+        return
+
+    async def scenario(workdir: str, state_dir: str):
+        os.makedirs(os.path.join(workdir, "src"))
+        bus = RecordingBus()
+        manager = SensorManager(types.SimpleNamespace(perception=bus), supervise_interval=0.05)
+        sensor = FileSensor(bus, workdir, interval=0.2, backend="inotify", debounce=0.01, state_dir=state_dir)
+        manager.register(sensor)
+
+        crashes = []
+        original = sensor._record_cycle
+
+        def crash_once(busy):
+            if not crashes:
+                crashes.append(busy)
+                raise RuntimeError("simulated crash")
+            original(busy)
+
+        sensor._record_cycle = crash_once
+        await manager.start_all()
+        try:
+            await _wait_ready(sensor)
+            first = sensor._task
+            deadline = time.monotonic() + 5
+            while sensor._task is first or sensor._inotify is None or not sensor._inotify.watch_count:
+                assert time.monotonic() < deadline, "sensor was not restarted"
+                await asyncio.sleep(0.05)
+
+            assert manager.stats()["FileSensor"]["crashes"] == 1
+            assert sensor.active_backend == "inotify"
+            assert sensor._inotify.watch_count >= 2  # 根目录 + src
+
+            with open(os.path.join(workdir, "src", "after_restart.py"), "w") as f:
+                f.write("print('hi')")
+            await bus.wait_for("新文件创建: src/after_restart.py", timeout=2)
+        finally:
+            await manager.stop_all()
+
+    with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+        asyncio.run(scenario(workdir, state_dir))
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
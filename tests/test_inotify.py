@@ -0,0 +1,185 @@
+import asyncio
+import errno
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sensors import file_sensor
+from core.sensors.file_sensor import FileSensor, _WATCH_MASK
+from core.sensors.inotify import (
+    Inotify, inotify_available, IN_CREATE, IN_DELETE, IN_CLOSE_WRITE, IN_MODIFY,
+)
+
+
+class RecordingBus:
+    def __init__(self):
+        self.events = []
+
+    async def emit(self, source, data, importance=0.5):
+        self.events.append(data)
+
+
+def _drain(notifier: Inotify, timeout: float = 1.0):
+    deadline = time.monotonic() + timeout
+    events = []
+    while time.monotonic() < deadline:
+        batch = notifier.read_events()
+        events.extend(batch)
+        if batch:
+            time.sleep(0.02)
+            continue
+        if events:
+            break
+        time.sleep(0.01)
+    return events
+
+
+async def _until(predicate, timeout: float = 3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not met in time"
+        await asyncio.sleep(0.02)
+
+
+def test_parses_file_and_directory_events():
+    if not inotify_available():
+        print("inotify unavailable, skipped")
+        return
+    with tempfile.TemporaryDirectory() as workdir:
+        notifier = Inotify()
+        try:
+            notifier.add_watch(workdir, _WATCH_MASK)
+            assert notifier.watch_count == 1
+            target = os.path.join(workdir, "a.txt")
+            with open(target, "w") as f:
+                f.write("x")
+            os.mkdir(os.path.join(workdir, "sub"))
+            os.remove(target)
+
+            events = _drain(notifier)
+            by_path = {}
+            for event in events:
+                by_path.setdefault(event.path, 0)
+                by_path[event.path] |= event.mask
+            assert by_path[target] & IN_CREATE
+            assert by_path[target] & (IN_MODIFY | IN_CLOSE_WRITE)
+            assert by_path[target] & IN_DELETE
+            sub = [e for e in events if e.path == os.path.join(workdir, "sub")]
+            assert sub and sub[0].is_dir
+        finally:
+            notifier.close()
+        assert notifier.fd is None and notifier.watch_count == 0
+
+
+def test_removed_directory_drops_its_watch():
+    if not inotify_available():
+        print("inotify unavailable, skipped")
+        return
+    with tempfile.TemporaryDirectory() as workdir:
+        sub = os.path.join(workdir, "sub")
+        os.makedirs(os.path.join(sub, "deep"))
+        notifier = Inotify()
+        try:
+            for path in (workdir, sub, os.path.join(sub, "deep")):
+                notifier.add_watch(path, _WATCH_MASK)
+            notifier.forget_tree(os.path.join(sub, "deep"))
+            assert notifier.watch_count == 2
+            shutil.rmtree(sub)
+            _drain(notifier)  # IN_IGNORED 到达后内核已移除该 watch
+            assert notifier.watch_count == 1
+        finally:
+            notifier.close()
+
+
+def test_inotify_backend_reports_changes():
+    if not inotify_available():
+        print("inotify unavailable, skipped")
+        return
+
+    async def scenario(workdir, state_dir):
+        os.makedirs(os.path.join(workdir, "a", "node_modules"))
+        with open(os.path.join(workdir, "a", "x.py"), "w") as f:
+            f.write("1")
+        bus = RecordingBus()
+        sensor = FileSensor(bus, workdir, interval=5, backend="inotify", debounce=0.05, state_dir=state_dir)
+        await sensor.start()
+        try:
+            await _until(lambda: sensor.initial_scan_done)
+            assert sensor.active_backend == "inotify"
+            assert bus.events == []  # 冷启动的初始扫描静默
+
+            with open(os.path.join(workdir, "a", "x.py"), "w") as f:
+                f.write("2")
+            with open(os.path.join(workdir, "a", "node_modules", "dep.js"), "w") as f:
+                f.write("ignored")
+            os.makedirs(os.path.join(workdir, "b", "c"))
+            with open(os.path.join(workdir, "b", "c", "q.md"), "w") as f:
+                f.write("m")
+            await _until(lambda: len(bus.events) >= 2)
+            await asyncio.sleep(0.2)
+            assert sorted(bus.events) == sorted([
+                f"检测到活动文件变更: {os.path.join('a', 'x.py')}",
+                f"检测到新文件创建: {os.path.join('b', 'c', 'q.md')}",
+            ])
+
+            bus.events.clear()
+            shutil.rmtree(os.path.join(workdir, "b"))
+            await _until(lambda: bus.events)
+            assert bus.events == [f"检测到文件删除: {os.path.join('b', 'c', 'q.md')}"]
+        finally:
+            await sensor.stop()
+
+    with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+        asyncio.run(scenario(workdir, state_dir))
+
+
+class ScarceInotify(Inotify):
+    """只允许 2 个 watch，模拟 fs.inotify.max_user_watches 耗尽"""
+    def add_watch(self, path, mask):
+        if self.watch_count >= 2:
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+        return super().add_watch(path, mask)
+
+
+def test_watch_exhaustion_falls_back_to_polling_subtree():
+    if not inotify_available():
+        print("inotify unavailable, skipped")
+        return
+
+    async def scenario(workdir, state_dir):
+        for name in ("a", "b", "c"):
+            os.makedirs(os.path.join(workdir, name))
+        bus = RecordingBus()
+        original = file_sensor.Inotify
+        file_sensor.Inotify = ScarceInotify
+        sensor = FileSensor(bus, workdir, interval=0.2, backend="inotify", debounce=0.01, state_dir=state_dir)
+        try:
+            await sensor.start()
+            await _until(lambda: sensor.initial_scan_done)
+            assert sensor._inotify.watch_count == 2
+            assert len(sensor._polled_roots) == 2
+
+            for name in ("a", "b", "c"):
+                with open(os.path.join(workdir, name, "new.md"), "w") as f:
+                    f.write(name)
+            await _until(lambda: len(bus.events) >= 3)
+            assert sorted(bus.events) == [f"检测到新文件创建: {os.path.join(n, 'new.md')}" for n in ("a", "b", "c")]
+        finally:
+            file_sensor.Inotify = original
+            await sensor.stop()
+
+    with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+        asyncio.run(scenario(workdir, state_dir))
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.schema import AgentSkill, Intent, Message
+from core.provider import BaseProvider
+from core.providers.intent_cache import CachingProvider, skills_fingerprint, snapshot_digest
+from core.text import normalize_query
+
+SKILLS = [
+    AgentSkill(id="system_stats", name="System stats", description="Show CPU / memory / disk"),
+    AgentSkill(id="cleaner", name="Cleaner", description="Clean temp files"),
+]
+
+
+class ScriptedProvider(BaseProvider):
+    """按查询返回预设意图，并记录真实解析次数"""
+    def __init__(self, intents: dict):
+        self.intents = intents
+        self.calls = []
+
+    async def chat(self, messages: list[Message]) -> str:
+        return ""
+
+    async def resolve_intent(self, query: str, skills: list[AgentSkill], **kwargs) -> Intent:
+        self.calls.append(query)
+        skill_id, confidence = self.intents.get(normalize_query(query), (None, 0.0))
+        return Intent(raw_query=query, thought_process="live", target_skill_id=skill_id,
+                      parameters={"q": query}, confidence=confidence)
+
+
+def test_normalization_and_fingerprints():
+    assert normalize_query("  系统　状态？？ ") == normalize_query("系统 状态") == "系统 状态"
+    assert normalize_query("Disk USAGE!") == "disk usage"
+    assert skills_fingerprint(SKILLS) == skills_fingerprint(list(reversed(SKILLS)))
+    changed = [SKILLS[0], SKILLS[1].model_copy(update={"description": "Clean caches"})]
+    assert skills_fingerprint(changed) != skills_fingerprint(SKILLS)
+    assert snapshot_digest("[12:00:01] 文件变更 a.py") == snapshot_digest("[13:45:59] 文件变更 a.py")
+
+
+def test_hit_returns_fresh_copy_with_new_raw_query():
+    async def scenario():
+        inner = ScriptedProvider({"系统状态": ("system_stats", 0.9)})
+        cache = CachingProvider(inner, path=None)
+        first = await cache.resolve_intent("系统状态", SKILLS)
+        second = await cache.resolve_intent("系统状态？", SKILLS)
+        assert inner.calls == ["系统状态"]
+        assert second.target_skill_id == "system_stats" and second.raw_query == "系统状态？"
+        assert second.thought_process.startswith("[意图缓存命中]")
+        second.parameters["q"] = "mutated"
+        third = await cache.resolve_intent("系统状态", SKILLS)
+        assert third.parameters == first.parameters  # 命中返回副本，调用方修改不影响缓存
+        assert cache.own_stats()["hits"] == 2 and cache.own_stats()["hit_rate"] == round(2 / 3, 3)
+
+    asyncio.run(scenario())
+
+
+def test_uncacheable_intents_always_reach_provider():
+    async def scenario():
+        inner = ScriptedProvider({
+            "求助": ("brain_rescue", 1.0),
+            "含糊": ("cleaner", 0.2),
+        })
+        cache = CachingProvider(inner, path=None)
+        for query in ("求助", "求助", "含糊", "含糊", "闲聊", "闲聊"):
+            await cache.resolve_intent(query, SKILLS)
+        assert len(inner.calls) == 6
+        assert cache.own_stats()["skipped"] == 6 and cache.own_stats()["entries"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_skill_changes_and_snapshot_keying_miss():
+    async def scenario():
+        inner = ScriptedProvider({"清理": ("cleaner", 0.9)})
+        cache = CachingProvider(inner, path=None, include_snapshot=True)
+        await cache.resolve_intent("清理", SKILLS, perception_snapshot="[10:00:00] 磁盘告急")
+        await cache.resolve_intent("清理", SKILLS, perception_snapshot="[10:05:00] 磁盘告急")
+        assert len(inner.calls) == 1
+        await cache.resolve_intent("清理", SKILLS, perception_snapshot="[10:05:00] 内存不足")
+        await cache.resolve_intent("清理", SKILLS[:1], perception_snapshot="[10:05:00] 磁盘告急")
+        assert len(inner.calls) == 3
+
+    asyncio.run(scenario())
+
+
+def test_lru_eviction_and_ttl_expiry():
+    async def scenario():
+        inner = ScriptedProvider({q: ("cleaner", 0.9) for q in ("a", "b", "c")})
+        cache = CachingProvider(inner, path=None, max_entries=2)
+        for query in ("a", "b", "a", "c"):  # 访问 a 后，b 是最久未使用者
+            await cache.resolve_intent(query, SKILLS)
+        await cache.resolve_intent("a", SKILLS)
+        await cache.resolve_intent("b", SKILLS)
+        assert inner.calls == ["a", "b", "c", "b"]
+        assert cache.counters["evictions"] >= 1
+
+        expiring = CachingProvider(ScriptedProvider({"a": ("cleaner", 0.9)}), path=None, ttl=0)
+        await expiring.resolve_intent("a", SKILLS)
+        await expiring.resolve_intent("a", SKILLS)
+        assert expiring.counters["expired"] == 1 and expiring.counters["hits"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_persists_across_restart_and_ignores_other_versions():
+    async def scenario(workdir: str):
+        path = os.path.join(workdir, "cache", "intent_cache.json")
+        cache = CachingProvider(ScriptedProvider({"清理": ("cleaner", 0.9)}), path=path, save_delay=0)
+        await cache.resolve_intent("清理", SKILLS)
+        await cache._save_task
+        assert os.path.exists(path) and not os.path.exists(path + ".tmp")
+
+        inner = ScriptedProvider({})
+        restarted = CachingProvider(inner, path=path)
+        intent = await restarted.resolve_intent("清理", SKILLS)
+        assert intent.target_skill_id == "cleaner" and inner.calls == []
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": 0, "entries": []}, f)
+        assert CachingProvider(inner, path=path).own_stats()["entries"] == 0
+
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(scenario(workdir))
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.jsonstream import IncrementalJSONObject
+
+INTENT = {
+    "thought_process": "用户想看 \"磁盘\" 状态, 含 {花括号} 与 [方括号]",
+    "target_skill_id": "system_stats",
+    "parameters": {"paths": ["/", "/home"], "detail": {"level": 2}},
+    "confidence": 0.92,
+    "note": None,
+}
+
+
+def _feed_in_pieces(text: str, size: int):
+    parser = IncrementalJSONObject()
+    completed = []
+    for i in range(0, len(text), size):
+        completed.append(parser.feed(text[i:i + size]))
+    return parser, completed
+
+
+def test_fields_complete_as_soon_as_they_close():
+    text = json.dumps(INTENT, ensure_ascii=False)
+    parser = IncrementalJSONObject()
+    closed_at = {}
+    for i, ch in enumerate(text):
+        for key in parser.feed(ch):
+            closed_at[key] = i
+    assert list(closed_at) == list(INTENT)
+    assert parser.fields == INTENT
+    # target_skill_id 在对象结束前很早就可用
+    assert closed_at["target_skill_id"] < text.index('"parameters"')
+    assert parser.done and parser.value == INTENT
+
+
+def test_chunk_size_does_not_change_result():
+    text = json.dumps(INTENT, ensure_ascii=False, indent=2)
+    for size in (1, 3, 7, 64, len(text)):
+        parser, completed = _feed_in_pieces(text, size)
+        assert [k for batch in completed for k in batch] == list(INTENT)
+        assert parser.fields == INTENT
+
+
+def test_skips_preamble_and_ignores_trailing_text():
+    parser = IncrementalJSONObject()
+    parser.feed("好的，结果如下：\n```json\n")
+    assert parser.value is None and parser.fields == {}
+    parser.feed('{"target_skill_id": "weather", "parameters": {"city": "北京"}}\n```\n{"ignored": 1}')
+    assert parser.done
+    assert parser.value == {"target_skill_id": "weather", "parameters": {"city": "北京"}}
+    assert parser.feed('"more": 2}') == []
+
+
+def test_empty_and_unfinished_objects():
+    empty = IncrementalJSONObject()
+    assert empty.feed("{ }") == [] and empty.done and empty.value == {}
+
+    partial = IncrementalJSONObject()
+    partial.feed('{"a": 1, "b": [1, 2')
+    assert partial.fields == {"a": 1} and not partial.done and partial.value is None
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
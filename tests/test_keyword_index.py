@@ -0,0 +1,105 @@
+import os
+import random
+import sys
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.schema import AgentSkill
+from core.providers.antigravity import match_fast_path
+from core.providers.keyword_index import AhoCorasick, SkillKeywordIndex, get_keyword_index
+
+SKILLS = [
+    AgentSkill(id="system_stats", name="System Stats", description="d", tags=["system", "monitor"],
+               keywords=["系统状态", "cpu"]),
+    AgentSkill(id="cleaner", name="Cleaner", description="d", tags=["disk"], keywords=["清理", "磁盘"]),
+    AgentSkill(id="disk_usage", name="Disk Usage", description="d", tags=["disk"], keywords=["磁盘"]),
+    AgentSkill(id="brain_rescue", name="Brain Rescue", description="d", keywords=["求助"]),
+]
+
+
+def _naive_matches(patterns, text):
+    found = set()
+    for idx, pattern in enumerate(patterns):
+        start = text.find(pattern)
+        while start != -1:
+            found.add((idx, start, start + len(pattern)))
+            start = text.find(pattern, start + 1)
+    return found
+
+
+def _naive_scores(skills, q):
+    """逐条 `in` 判断的原始打分规则，作为索引结果的对照"""
+    scores = []
+    for s in skills:
+        score = 0
+        for kw in s.keywords:
+            if kw.lower() in q:
+                score += 20 if q.startswith(kw.lower()) else 10
+        if s.id in q.split():
+            score += 30
+        elif s.id in q:
+            score += 5
+        if s.name.lower() in q:
+            score += 15
+        score += 5 * sum(1 for t in s.tags if t.lower() in q)
+        scores.append(score)
+    return scores
+
+
+def test_automaton_finds_every_overlapping_occurrence():
+    patterns = ["he", "she", "his", "hers", "a", "aa", "aaa"]
+    automaton = AhoCorasick(patterns)
+    assert set(automaton.iter_matches("ushers")) == {(1, 1, 4), (0, 2, 4), (3, 2, 6)}
+    rng = random.Random(7)
+    for _ in range(200):
+        text = "".join(rng.choice("aehirs") for _ in range(rng.randint(0, 30)))
+        assert set(automaton.iter_matches(text)) == _naive_matches(patterns, text)
+
+
+def test_index_scores_match_reference_rules():
+    index = SkillKeywordIndex(SKILLS)
+    assert [s.id for s in index.skills] == ["system_stats", "cleaner", "disk_usage"]  # brain_rescue 不参与打分
+    queries = [
+        "系统状态", "看看系统状态", "cpu 和 磁盘", "清理磁盘 cleaner", "system_stats", "my_system_stats_x",
+        "disk usage monitor", "磁盘磁盘磁盘", "求助", "",
+    ]
+    for q in queries:
+        assert index.scores(q) == _naive_scores(index.skills, q), q
+    skill, highest, runner_up = index.best("磁盘")
+    assert (skill.id, highest, runner_up) == ("cleaner", 20, 20)  # 并列取注册顺序靠前者
+
+
+def test_index_cache_reused_until_skills_change():
+    first = get_keyword_index(SKILLS)
+    assert get_keyword_index(SKILLS) is first
+    assert get_keyword_index([s.model_copy() for s in SKILLS]) is first  # 内容相同：仅刷新身份
+    changed = SKILLS[:-1] + [SKILLS[-1].model_copy(update={"keywords": ["救命"]})]
+    assert get_keyword_index(changed) is not first
+
+
+def test_fast_path_control_tokens_and_confidence():
+    control = match_fast_path("你好", SKILLS)
+    assert control.control and control.skill_id == "lifestyle_chat" and control.confidence == 1.0
+    assert match_fast_path("好的", SKILLS).skill_id is None
+    assert match_fast_path("今天天气怎么样", SKILLS) is None
+
+    clear = match_fast_path("system_stats 系统状态 cpu", SKILLS)
+    assert clear.skill_id == "system_stats" and clear.confidence == 1.0 and clear.runner_up == 0
+    ambiguous = match_fast_path("磁盘", SKILLS)
+    assert ambiguous.score == ambiguous.runner_up == 20
+    assert ambiguous.confidence == round(20 / 30 * 0.5, 3)
+
+
+def test_fast_path_extracts_parameters():
+    match = match_fast_path('清理 path="/tmp/a b" days=7 明天', SKILLS)
+    assert match.parameters == {"path": "/tmp/a b", "days": 7, "day": "明天"}
+    assert match_fast_path("清理 '缓存目录'", SKILLS).parameters == {"text": "缓存目录", "query": "缓存目录"}
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
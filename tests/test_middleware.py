@@ -0,0 +1,167 @@
+import asyncio
+import os
+import sys
+import types
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.schema import AgentSkill, Intent, Message, MessageRole
+from core.provider import BaseProvider
+from core.providers.middleware import LimitedProvider, is_rate_limited, _retry_after
+
+SKILLS = [AgentSkill(id="system_stats", name="System stats", description="Show system status")]
+
+
+class TooManyRequests(Exception):
+    """模拟兼容网关的 429 异常"""
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests")
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = types.SimpleNamespace(headers=headers)
+
+
+class SlowProvider(BaseProvider):
+    """每次调用耗时 delay 秒；failures 中预置的异常按顺序先抛出"""
+    def __init__(self, delay: float = 0.05, failures=()):
+        self.delay = delay
+        self.failures = list(failures)
+        self.calls = 0
+        self.active = 0
+        self.cancelled = 0
+
+    async def _work(self):
+        self.calls += 1
+        self.active += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.active -= 1
+        if self.failures:
+            raise self.failures.pop(0)
+
+    async def chat(self, messages: list[Message]) -> str:
+        await self._work()
+        return f"reply to {messages[-1].content}"
+
+    async def chat_stream(self, messages: list[Message]):
+        await self._work()
+        for piece in ("a", "b", "c"):
+            yield piece
+
+    async def resolve_intent(self, query: str, skills: list[AgentSkill], **kwargs) -> Intent:
+        await self._work()
+        return Intent(raw_query=query, thought_process="live", target_skill_id="system_stats",
+                      parameters={"seen": []}, confidence=0.9)
+
+
+def _user(text: str) -> list:
+    return [Message(role=MessageRole.USER, content=text)]
+
+
+def test_rate_limit_detection_and_retry_after():
+    assert is_rate_limited(TooManyRequests())
+    assert not is_rate_limited(ValueError("boom"))
+    assert _retry_after(TooManyRequests(retry_after=2.5)) == 2.5
+    assert _retry_after(TooManyRequests()) is None
+    assert _retry_after(ValueError()) is None
+
+
+def test_identical_requests_share_one_call():
+    async def scenario():
+        inner = SlowProvider()
+        provider = LimitedProvider(inner)
+        replies = await asyncio.gather(*(provider.chat(_user("hi")) for _ in range(5)), provider.chat(_user("other")))
+        assert inner.calls == 2
+        assert replies[:5] == ["reply to hi"] * 5 and replies[5] == "reply to other"
+        assert provider.own_stats()["coalesced"] == 4 and provider.own_stats()["coalescing"] == 0
+
+        intents = await asyncio.gather(*(provider.resolve_intent("状态", SKILLS) for _ in range(3)))
+        intents[1].parameters["seen"].append("mutated")
+        assert intents[0].parameters == {"seen": []}  # 合并者拿到独立副本
+
+    asyncio.run(scenario())
+
+
+def test_concurrency_cap_queues_extra_requests():
+    async def scenario():
+        inner = SlowProvider(delay=0.03)
+        provider = LimitedProvider(inner, max_concurrency=2)
+        await asyncio.gather(*(provider.chat(_user(f"q{i}")) for i in range(6)))
+        stats = provider.own_stats()
+        assert inner.calls == 6 and stats["max_in_flight"] == 2
+        assert stats["max_queue_wait_ms"] > 0 and stats["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_429_retried_with_retry_after_then_degrades():
+    async def scenario():
+        inner = SlowProvider(delay=0, failures=[TooManyRequests(retry_after=0.01)] * 2)
+        provider = LimitedProvider(inner, max_retries=3)
+        assert await provider.chat(_user("hi")) == "reply to hi"
+        assert inner.calls == 3 and provider.counters["retries"] == 2
+
+        exhausted = LimitedProvider(SlowProvider(delay=0, failures=[TooManyRequests(retry_after=0)] * 5), max_retries=2)
+        intent = await exhausted.resolve_intent("状态", SKILLS)
+        assert intent.target_skill_id is None and intent.confidence == 0.0
+        assert exhausted.counters["failures"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_non_rate_limit_errors_are_not_retried():
+    async def scenario():
+        inner = SlowProvider(delay=0, failures=[ValueError("bad request")])
+        provider = LimitedProvider(inner)
+        try:
+            await provider.resolve_intent("状态", SKILLS)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("ValueError should propagate")
+        assert inner.calls == 1 and provider.counters["retries"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_underlying_call_cancelled_only_when_all_waiters_leave():
+    async def scenario():
+        inner = SlowProvider(delay=0.2)
+        provider = LimitedProvider(inner)
+        first = asyncio.create_task(provider.chat(_user("hi")))
+        second = asyncio.create_task(provider.chat(_user("hi")))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        assert await second == "reply to hi" and inner.cancelled == 0
+
+        lonely = asyncio.create_task(provider.chat(_user("bye")))
+        await asyncio.sleep(0.02)
+        lonely.cancel()
+        await asyncio.sleep(0.02)
+        assert inner.cancelled == 1 and provider.own_stats()["coalescing"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_stream_retries_only_before_first_chunk():
+    async def scenario():
+        inner = SlowProvider(delay=0, failures=[TooManyRequests(retry_after=0)])
+        provider = LimitedProvider(inner)
+        chunks = [c async for c in provider.chat_stream(_user("hi"))]
+        assert chunks == ["a", "b", "c"] and inner.calls == 2
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.providers.mock_server import MockOpenAIServer
+
+
+async def _request(server: MockOpenAIServer, method: str, path: str, payload=None, raw: bytes = None):
+    """最小 HTTP/1.1 客户端：返回 (status, headers, body)，分块响应已解码"""
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    body = raw if raw is not None else (json.dumps(payload).encode("utf-8") if payload is not None else b"")
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+                 .encode("latin-1") + body)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, rest = data.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:])}
+    if headers.get("transfer-encoding") == "chunked":
+        decoded = b""
+        while rest:
+            size_line, _, rest = rest.partition(b"\r\n")
+            size = int(size_line, 16)
+            if size == 0:
+                break
+            decoded += rest[:size]
+            rest = rest[size + 2:]
+        rest = decoded
+    return status, headers, rest
+
+
+def _chat(content: str, system: str = None, **extra) -> dict:
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": content})
+    return {"model": "mock-model", "messages": messages, **extra}
+
+
+def _server(**kwargs) -> MockOpenAIServer:
+    kwargs.setdefault("latency_ms", 0)
+    return MockOpenAIServer(port=0, jitter_ms=0, chunk_interval_ms=0, seed=3, **kwargs)
+
+
+def test_models_stats_and_unknown_routes():
+    async def scenario():
+        async with _server() as server:
+            status, _, body = await _request(server, "GET", "/v1/models")
+            assert status == 200 and json.loads(body)["data"][0]["id"] == "mock-model"
+            assert (await _request(server, "GET", "/v1/nothing"))[0] == 404
+            status, _, body = await _request(server, "POST", "/v1/chat/completions", raw=b"{oops")
+            assert status == 400 and json.loads(body)["error"]["type"] == "invalid_request_error"
+            status, _, body = await _request(server, "GET", "/stats")
+            assert status == 200 and json.loads(body)["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_default_responder_builds_intent_audit_and_chat():
+    async def scenario():
+        manifest = json.dumps([{"id": "system_stats", "name": "System Stats", "description": "d",
+                                "keywords": ["系统状态"]}], ensure_ascii=False)
+        async with _server() as server:
+            _, _, body = await _request(server, "POST", "/v1/chat/completions",
+                                        _chat("看看 system_stats 系统状态", system=f"调度\n## 可用技能清单:\n{manifest}\n"))
+            reply = json.loads(body)
+            intent = json.loads(reply["choices"][0]["message"]["content"])
+            assert intent["target_skill_id"] == "system_stats" and intent["confidence"] == 1.0
+            assert reply["usage"]["total_tokens"] == reply["usage"]["prompt_tokens"] + reply["usage"]["completion_tokens"]
+
+            _, _, body = await _request(server, "POST", "/v1/chat/completions", _chat("审计", system="你是首席安全审计官"))
+            assert json.loads(json.loads(body)["choices"][0]["message"]["content"])["status"] == "pass"
+
+            _, _, body = await _request(server, "POST", "/v1/chat/completions",
+                                        _chat("hi", response_format={"type": "json_object"}))
+            assert json.loads(json.loads(body)["choices"][0]["message"]["content"]) == {"reply": "[mock] hi"}
+
+    asyncio.run(scenario())
+
+
+def test_streaming_splits_content_and_appends_usage():
+    async def scenario():
+        script = [{"match": "故事", "response": "很久很久以前，有一座山。"}]
+        async with _server(chunk_chars=4, script=script) as server:
+            status, headers, body = await _request(server, "POST", "/v1/chat/completions",
+                                                   _chat("讲个故事", stream=True, stream_options={"include_usage": True}))
+            assert status == 200 and headers["content-type"] == "text/event-stream"
+            events = [line[len("data: "):] for line in body.decode("utf-8").split("\n\n") if line]
+            assert events[-1] == "[DONE]"
+            chunks = [json.loads(e) for e in events[:-1]]
+            text = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks if c["choices"])
+            assert text == "很久很久以前，有一座山。"
+            assert chunks[-1]["choices"] == [] and chunks[-1]["usage"]["completion_tokens"] == len(text) // 4
+            assert len([c for c in chunks if c["choices"] and c["choices"][0]["delta"].get("content")]) == 3
+            assert server.stats()["streams"] == 1 and server.stats()["scripted"] == 1
+
+        async with _server(stream_usage=False) as server:
+            status, _, _ = await _request(server, "POST", "/v1/chat/completions",
+                                          _chat("x", stream=True, stream_options={"include_usage": True}))
+            assert status == 400
+
+    asyncio.run(scenario())
+
+
+def test_injected_failures_and_scripted_latency():
+    async def scenario():
+        script = [{"match": "慢", "response": "ok", "latency_ms": 150}, {"match": "坏", "response": "", "status": 500}]
+        async with _server(rate_limit_rate=1.0, retry_after=2.5) as server:
+            status, headers, _ = await _request(server, "POST", "/v1/chat/completions", _chat("hi"))
+            assert status == 429 and headers["retry-after"] == "2.5"
+        async with _server(script=script) as server:
+            assert (await _request(server, "POST", "/v1/chat/completions", _chat("坏了")))[0] == 500
+            started = time.monotonic()
+            status, _, _ = await _request(server, "POST", "/v1/chat/completions", _chat("慢一点"))
+            assert status == 200 and time.monotonic() - started >= 0.15
+            assert server.stats()["errors"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_requests_tracked_in_flight():
+    async def scenario():
+        async with _server(latency_ms=50) as server:
+            await asyncio.gather(*(_request(server, "POST", "/v1/chat/completions", _chat(f"q{i}")) for i in range(5)))
+            stats = server.stats()
+            assert stats["requests"] == 5 and stats["max_in_flight"] == 5 and stats["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+import sys
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.schema import AgentSkill, Message, MessageRole
+from core.prompts import prompt_report
+from core.providers.openai import OpenAIProvider
+from core.providers.mock_server import MockOpenAIServer
+
+SKILLS = [
+    AgentSkill(id="list_files", name="List Files", description="Lists files in a directory."),
+    AgentSkill(id="weather_expert", name="Weather", description="Weather forecast."),
+]
+INTENT = {
+    "target_skill_id": "list_files",
+    "parameters": {"pattern": "*.py"},
+    "confidence": 0.9,
+    "raw_query": "列出 python 文件",
+    "thought_process": "用户希望浏览文件，匹配 list_files 技能。" * 4,
+}
+
+
+def _server(**kwargs) -> MockOpenAIServer:
+    script = [{"match": "列出", "response": INTENT}]
+    return MockOpenAIServer(port=0, latency_ms=5, jitter_ms=0, chunk_chars=6, chunk_interval_ms=2,
+                            script=script, seed=1, **kwargs)
+
+
+def _provider(server: MockOpenAIServer) -> OpenAIProvider:
+    return OpenAIProvider(model="mock-model", base_url=server.base_url, api_key="test")
+
+
+def _intent_reports() -> int:
+    return prompt_report()["intent"].get("server_reports", 0)
+
+
+def test_streamed_intent_reports_usage_and_cache_hits():
+    async def scenario():
+        async with _server() as server:
+            provider = _provider(server)
+            before = _intent_reports()
+            for _ in range(2):
+                intent = await provider.resolve_intent("列出 python 文件", SKILLS)
+                assert intent.target_skill_id == "list_files"
+            report = prompt_report()["intent"]
+            assert report["server_reports"] - before == 2
+            assert report["cache_hit_rate"] > 0  # 第二次请求的静态前缀命中模拟前缀缓存
+            assert provider._stream_usage
+
+    asyncio.run(scenario())
+
+
+def test_gateway_without_stream_options_falls_back():
+    async def scenario():
+        async with _server(stream_usage=False) as server:
+            provider = _provider(server)
+            before = _intent_reports()
+            intent = await provider.resolve_intent("列出 python 文件", SKILLS)
+            assert intent.target_skill_id == "list_files"
+            assert intent.parameters == {"pattern": "*.py"}
+            assert not provider._stream_usage
+            assert _intent_reports() == before
+            # 关闭后不再附带 stream_options，不会重复收到 400
+            requests = server.stats()["requests"]
+            await provider.resolve_intent("列出 python 文件", SKILLS)
+            assert server.stats()["requests"] == requests + 1
+
+    asyncio.run(scenario())
+
+
+def test_skill_hint_fires_before_stream_completes():
+    async def scenario():
+        async with _server() as server:
+            provider = _provider(server)
+            hints = []
+            intent = await provider.resolve_intent(
+                "列出 python 文件", SKILLS,
+                on_skill_hint=lambda skill_id, params: hints.append((skill_id, params))
+            )
+            assert hints[0] == ("list_files", None)
+            assert hints[-1] == ("list_files", {"pattern": "*.py"})
+            timings = provider.last_timings
+            assert timings["first_token_ms"] <= timings["parameters_ms"] < timings["total_ms"]
+            assert intent.thought_process == INTENT["thought_process"]
+
+    asyncio.run(scenario())
+
+
+def test_chat_stream_yields_full_text():
+    async def scenario():
+        async with _server() as server:
+            provider = _provider(server)
+            chunks = [c async for c in provider.chat_stream([Message(role=MessageRole.USER, content="你好")])]
+            assert len(chunks) > 1
+            assert "".join(chunks) == "[mock] 收到: 你好"
+
+    asyncio.run(scenario())
+
+
+def test_non_streaming_intent_matches_streaming():
+    async def scenario():
+        async with _server() as server:
+            streamed = await _provider(server).resolve_intent("列出 python 文件", SKILLS)
+            provider = _provider(server)
+            provider.stream = False
+            plain = await provider.resolve_intent("列出 python 文件", SKILLS)
+            assert json.loads(plain.model_dump_json()) == json.loads(streamed.model_dump_json())
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.schema import AgentSkill, AuditResult, AuditStatus, Intent, Message
+from core.provider import BaseProvider
+from core.audit import BaseAuditor
+from core.executor import BaseExecutor
+from core.dispatcher import Dispatcher
+from core.memory import MirrorMemory, KnowledgeStore
+from core.perception_replay import PerceptionRecorder, PerceptionReplayer, load_recording
+
+
+class IdleProvider(BaseProvider):
+    async def chat(self, messages: list[Message]) -> str:
+        return ""
+
+    async def resolve_intent(self, query: str, skills: list[AgentSkill], **kwargs) -> Intent:
+        return Intent(raw_query=query, thought_process="unused", confidence=0.0)
+
+
+class PassAuditor(BaseAuditor):
+    async def audit(self, skill_id, parameters, context) -> AuditResult:
+        return AuditResult(status=AuditStatus.PASS, rationale="ok", risk_level=1)
+
+
+class RecordingExecutor(BaseExecutor):
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, skill_id, parameters, context):
+        self.calls.append(skill_id)
+        return "done"
+
+
+# 不覆盖 rate_limit：使用默认反射限流 (DEFAULT_REFLEX_RATE_LIMIT，每 5 秒 1 次)
+STORM_RULES = [
+    {"id": "suggest_stats", "source": "system", "pattern": "CPU", "target_skill": "probe_stats",
+     "template": "CPU 告警: {data}"},
+    {"id": "auto_clean", "source": "visual", "pattern": "tmp", "target_skill": "probe_clean",
+     "template": "清理: {data}", "is_auto_run": True},
+]
+
+
+def _dispatcher(workdir: str):
+    dispatcher = Dispatcher(
+        provider=IdleProvider(), auditor=PassAuditor(),
+        memory=MirrorMemory(os.path.join(workdir, "mirror")),
+        knowledge=KnowledgeStore(os.path.join(workdir, "knowledge.json")),
+    )
+    executor = RecordingExecutor()
+    for skill_id in ("probe_stats", "probe_clean"):
+        dispatcher.register_skill(AgentSkill(id=skill_id, name=skill_id, description="test"), executor)
+    dispatcher.perception.reflex_rules = [dict(rule) for rule in STORM_RULES]
+    return dispatcher, executor
+
+
+def _write_trace(path: str, records):
+    recorder = PerceptionRecorder(path)
+    for stage, source, content, importance in records:
+        recorder.record(stage, source, content, importance)
+    recorder.close()
+
+
+def _write_timed_trace(path: str, records):
+    """按给定的录制时刻写入 event 轨迹：records 为 (t, source, content, importance)"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"version": 1}) + "\n")
+        for t, source, content, importance in records:
+            f.write(json.dumps({"t": t, "stage": "event", "source": source, "content": content,
+                                "importance": importance}, ensure_ascii=False) + "\n")
+
+
+def test_recording_round_trip_and_segments():
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "trace.jsonl")
+        _write_trace(path, [("emit", "visual", "a", 0.4), ("event", "system", "b", 0.8)])
+        _write_trace(path, [("event", "system", "c", 0.9)])
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"t": 9.9, "stage": "eve')  # 被强杀时不完整的最后一行
+
+        events = load_recording(path)
+        assert [(e["stage"], e["content"]) for e in events] == [("emit", "a"), ("event", "b"), ("event", "c")]
+        assert [e["t"] for e in events] == sorted(e["t"] for e in events)
+        assert [e["content"] for e in load_recording(path, stage="event")] == ["b", "c"]
+
+
+def test_replay_reproduces_storm_without_executing():
+    """回放须复现每一条反射建议 (而不是在第一条未决建议后短路)，且 dry-run 下不执行技能"""
+    async def scenario(workdir):
+        dispatcher, executor = _dispatcher(workdir)
+        path = os.path.join(workdir, "storm.jsonl")
+        _write_timed_trace(path, [(6.0 * i, "system", f"CPU 持续高负载 ({90 + i}%)", 0.6) for i in range(5)]
+                           + [(30.0 + 6.0 * i, "visual", f"检测到新文件创建: tmp/{i}.log", 0.5) for i in range(3)])
+
+        stats = await PerceptionReplayer(dispatcher.perception).replay(path, speed=0)
+        await asyncio.sleep(0.05)  # 让自动执行的后台任务跑完
+
+        assert stats["events"] == 8 and stats["dry_run"] is True
+        assert stats["reflexes"] == {"suggested": {"probe_stats": 5}, "auto_run": {"probe_clean": 3}}
+        assert executor.calls == []
+        assert dispatcher.pending_suggestion_count == 0
+        assert not dispatcher.active_tasks
+        assert dispatcher.perception.dispatcher is dispatcher  # 回放结束后恢复真实调度器
+
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(scenario(workdir))
+
+
+def test_live_replay_executes_auto_run_reflexes():
+    async def scenario(workdir):
+        dispatcher, executor = _dispatcher(workdir)
+        path = os.path.join(workdir, "live.jsonl")
+        _write_timed_trace(path, [(6.0 * i, "visual", f"检测到新文件创建: tmp/{i}.log", 0.5) for i in range(2)])
+
+        stats = await PerceptionReplayer(dispatcher.perception, dry_run=False).replay(path, speed=0)
+        await asyncio.sleep(0.05)
+        assert stats["reflexes"]["auto_run"] == {"probe_clean": 2}
+        assert executor.calls == ["probe_clean", "probe_clean"]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(scenario(workdir))
+
+
+def test_emit_stage_aggregates_visual_burst_under_replay():
+    async def scenario(workdir):
+        dispatcher, executor = _dispatcher(workdir)
+        path = os.path.join(workdir, "burst.jsonl")
+        _write_trace(path, [("emit", "visual", f"检测到活动文件变更: tmp/{i}.txt", 0.4) for i in range(4)])
+
+        stats = await PerceptionReplayer(dispatcher.perception).replay(path, speed=0, stage="emit")
+        # 四条视觉信号聚合为一次批量事件，其触发的反射也在回放替身下计数
+        assert stats["reflexes"]["auto_run"] == {"probe_clean": 1}
+        assert executor.calls == []
+        assert "批量活动 (4 项变更)" in dispatcher.perception.transient_log[-1].content
+
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(scenario(workdir))
+
+
+def test_reflex_rate_limit_follows_recorded_time_not_replay_speed():
+    """默认限流 (每 5 秒 1 次) 按录制时间轴计算：无论回放倍速如何，放行的反射都相同"""
+    async def scenario(workdir):
+        path = os.path.join(workdir, "timed.jsonl")
+        # 录制时刻 0, 1, 6, 7, 12 秒：限流应放行 0, 6, 12 三次；tmp 事件 0.5, 3, 5.6 秒：放行 0.5 与 5.6
+        _write_timed_trace(path, sorted(
+            [(t, "system", f"CPU 持续高负载 ({t})", 0.6) for t in (0.0, 1.0, 6.0, 7.0, 12.0)]
+            + [(t, "visual", f"检测到新文件创建: tmp/{t}.log", 0.5) for t in (0.5, 3.0, 5.6)]))
+        expected = {"suggested": {"probe_stats": 3}, "auto_run": {"probe_clean": 2}}
+        for speed in (0, 1000.0):
+            dispatcher, _ = _dispatcher(workdir)
+            live_buckets = dispatcher.perception.reflex_buckets
+            stats = await PerceptionReplayer(dispatcher.perception).replay(path, speed=speed)
+            await asyncio.sleep(0.05)  # 让自动执行的后台任务跑完
+            assert stats["reflexes"] == expected, speed
+            assert dispatcher.perception.reflex_buckets is live_buckets  # 回放结束后恢复真实限流表
+            assert live_buckets.try_acquire("suggest_stats", 1, 5.0)     # 回放不消耗真实令牌
+
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(scenario(workdir))
+
+
+def test_replay_paces_events_by_recorded_offsets():
+    async def scenario(workdir):
+        dispatcher, _ = _dispatcher(workdir)
+        path = os.path.join(workdir, "paced.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": 1}) + "\n")
+            for t in (0.0, 0.1, 0.2):
+                f.write(json.dumps({"t": t, "stage": "event", "source": "chronos", "content": "tick", "importance": 0.1}) + "\n")
+        stats = await PerceptionReplayer(dispatcher.perception).replay(path, speed=2.0)
+        assert 0.09 <= stats["wall_seconds"] < 0.5
+
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(scenario(workdir))
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.schema import SensorManifest
+from core.sensors.plugin import PluginSensor, discover_sensor_plugins, _normalize_events
+
+
+class RecordingBus:
+    def __init__(self):
+        self.events = []
+
+    async def emit(self, source, data, importance=0.5):
+        self.events.append((source, data, importance))
+
+
+async def _until(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not met in time"
+        await asyncio.sleep(0.02)
+
+
+def _plugin(plugin_dir: str, plugin_id: str, code: str, **manifest) -> tuple:
+    module_path = os.path.join(plugin_dir, f"{plugin_id}.py")
+    with open(module_path, "w", encoding="utf-8") as f:
+        f.write(code)
+    manifest.setdefault("name", plugin_id)
+    return SensorManifest(id=plugin_id, **manifest), module_path
+
+
+COUNTER = """
+def sense(params, state):
+    state["n"] = state.get("n", 0) + 1
+    return {"source": "plugin", "data": f"{params['label']} #{state['n']}", "importance": 0.3}
+"""
+
+CRASHER = """
+def sense(params, state):
+    raise RuntimeError("sensor broke")
+"""
+
+BLOCKER = """
+import threading, time
+def sense(params, state):
+    time.sleep(0.08)
+    return threading.current_thread().name
+"""
+
+
+def test_normalize_events_accepts_all_shapes():
+    assert _normalize_events(None) == []
+    assert _normalize_events("hi") == [{"source": "plugin", "data": "hi", "importance": 0.5}]
+    assert _normalize_events([{"data": 1, "source": "x", "importance": "0.9"}, "y"]) == [
+        {"source": "x", "data": 1, "importance": 0.9},
+        {"source": "plugin", "data": "y", "importance": 0.5},
+    ]
+
+
+def test_discover_skips_invalid_disabled_and_orphan_manifests():
+    with tempfile.TemporaryDirectory() as plugin_dir:
+        def manifest(name, payload):
+            with open(os.path.join(plugin_dir, name), "w", encoding="utf-8") as f:
+                f.write(payload if isinstance(payload, str) else json.dumps(payload))
+
+        manifest("good.json", {"id": "good", "name": "Good"})
+        manifest("off.json", {"id": "off", "name": "Off", "enabled": False})
+        manifest("orphan.json", {"id": "orphan", "name": "No module"})
+        manifest("broken.json", "{not json")
+        manifest("bad_interval.json", {"id": "bad_interval", "name": "Bad", "interval": 0})
+        for plugin_id in ("good", "off", "bad_interval"):
+            open(os.path.join(plugin_dir, f"{plugin_id}.py"), "w").close()
+
+        found = discover_sensor_plugins(plugin_dir)
+        assert [(m.id, os.path.basename(p)) for m, p in found] == [("good", "good.py")]
+        assert discover_sensor_plugins(os.path.join(plugin_dir, "missing")) == []
+
+
+def test_unknown_isolation_rejected():
+    try:
+        PluginSensor(RecordingBus(), SensorManifest(id="x", name="x", isolation="docker"), "x.py")
+    except ValueError:
+        return
+    raise AssertionError("unknown isolation should be rejected")
+
+
+def test_inline_and_thread_isolation_forward_events():
+    async def scenario(plugin_dir: str):
+        for isolation in ("inline", "thread"):
+            bus = RecordingBus()
+            manifest, path = _plugin(plugin_dir, f"counter_{isolation}", COUNTER, isolation=isolation,
+                                     interval=0.05, params={"label": isolation})
+            sensor = PluginSensor(bus, manifest, path)
+            await sensor.start()
+            try:
+                await _until(lambda: len(bus.events) >= 3)
+            finally:
+                await sensor.stop()
+            assert bus.events[:3] == [("plugin", f"{isolation} #{i}", 0.3) for i in (1, 2, 3)]
+            stats = sensor.stats()
+            assert stats["state"] == "idle" and stats["failures"] == 0 and stats["events"] >= 3
+
+    with tempfile.TemporaryDirectory() as plugin_dir:
+        asyncio.run(scenario(plugin_dir))
+
+
+def test_failing_plugin_backs_off_then_disables():
+    async def scenario(plugin_dir: str):
+        manifest, path = _plugin(plugin_dir, "crasher", CRASHER, isolation="thread", interval=0.05, max_restarts=2)
+        sensor = PluginSensor(RecordingBus(), manifest, path, backoff_base=0.01)
+        await sensor.start()
+        try:
+            await _until(lambda: sensor.state == "disabled")
+        finally:
+            await sensor.stop()
+        assert sensor.failures == 3 and sensor.restarts == 2
+        assert sensor.last_error == "RuntimeError: sensor broke"
+        assert sensor.state == "disabled"  # stop() 不会复位已停用的插件
+
+    with tempfile.TemporaryDirectory() as plugin_dir:
+        asyncio.run(scenario(plugin_dir))
+
+
+def test_blocking_inline_plugin_moves_to_thread():
+    async def scenario(plugin_dir: str):
+        bus = RecordingBus()
+        manifest, path = _plugin(plugin_dir, "blocker", BLOCKER, isolation="inline", interval=0.01)
+        sensor = PluginSensor(bus, manifest, path)
+        await sensor.start()
+        try:
+            await _until(lambda: sensor.isolation == "thread" and len(bus.events) >= 4)
+        finally:
+            await sensor.stop()
+        threads = [data for _, data, _ in bus.events]
+        assert threads[:3] == ["MainThread"] * 3
+        assert threads[3] == "janus-sensor-blocker"
+
+    with tempfile.TemporaryDirectory() as plugin_dir:
+        asyncio.run(scenario(plugin_dir))
+
+
+def test_process_isolation_forwards_events():
+    async def scenario(plugin_dir: str):
+        bus = RecordingBus()
+        manifest, path = _plugin(plugin_dir, "counter_process", COUNTER, isolation="process",
+                                 interval=0.05, params={"label": "proc"})
+        sensor = PluginSensor(bus, manifest, path)
+        await sensor.start()
+        try:
+            await _until(lambda: len(bus.events) >= 2, timeout=15)
+            worker = sensor._worker
+        finally:
+            await sensor.stop()
+        assert bus.events[0] == ("plugin", "proc #1", 0.3)
+        assert not worker.is_alive()
+
+    with tempfile.TemporaryDirectory() as plugin_dir:
+        asyncio.run(scenario(plugin_dir))
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
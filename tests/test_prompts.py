@@ -0,0 +1,64 @@
+import os
+import sys
+import types
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.prompts import AUDIT_PROMPT, INTENT_PROMPT, PromptTemplate, prompt_report, record_usage
+
+
+def _usage(prompt_tokens, cached=None, deepseek=None):
+    details = types.SimpleNamespace(cached_tokens=cached) if cached is not None else None
+    usage = types.SimpleNamespace(prompt_tokens=prompt_tokens, prompt_tokens_details=details)
+    if deepseek is not None:
+        usage.prompt_cache_hit_tokens = deepseek
+    return usage
+
+
+def test_static_prefix_is_identical_across_renders():
+    first = INTENT_PROMPT.render(user="系统状态", manifest="[]", perception_snapshot="无")
+    second = INTENT_PROMPT.render(user="清理缓存", manifest='[{"id":"cleaner"}]', perception_snapshot="磁盘告急")
+    assert first[0] == second[0] and first[0]["content"] == INTENT_PROMPT.static
+    assert "{" not in INTENT_PROMPT.static.split("示例")[0]  # 静态段不含动态占位符
+    assert [m["role"] for m in first] == ["system", "system", "user"]
+    assert '[{"id":"cleaner"}]' in second[1]["content"] and "磁盘告急" in second[1]["content"]
+    assert second[2]["content"] == "清理缓存"
+
+    audit = AUDIT_PROMPT.render(skill_id="cleaner", parameters={"path": "/tmp"}, raw_query="清理")
+    assert [m["role"] for m in audit] == ["system", "user"]
+    assert "- 目标技能: cleaner" in audit[1]["content"]
+
+
+def test_intent_fields_listed_in_streaming_order():
+    order = ["target_skill_id", "parameters", "confidence", "raw_query", "thought_process"]
+    listed = [line.strip("- ").split(":")[0] for line in INTENT_PROMPT.static.splitlines() if line.startswith("- ")]
+    assert listed == order
+
+
+def test_render_and_usage_recorded_per_template():
+    template = PromptTemplate("test_prompt", static="  固定前缀 static prefix\n", context="动态: {value}")
+    assert template.static == "固定前缀 static prefix"
+    messages = template.render(user="hello", value=42)
+    template.render(value=7)
+    report = prompt_report()["test_prompt"]
+    assert report["calls"] == 2 and report["prefix_hash"] == template.prefix_hash
+    assert report["static_tokens"] == template.static_tokens
+    assert 0 < report["static_share"] < 1 and "server_reports" not in report
+
+    record_usage(messages, _usage(100, cached=80))
+    record_usage(messages, _usage(100, deepseek=40))
+    record_usage(messages, _usage(100))                                       # 未上报缓存字段：忽略
+    record_usage([{"role": "user", "content": "普通对话"}], _usage(100, cached=100))  # 非模板消息：忽略
+    record_usage(messages, None)
+    report = prompt_report()["test_prompt"]
+    assert report["server_reports"] == 2 and report["cache_hit_rate"] == 0.6
+    assert PromptTemplate.prompt_tokens(messages) > 0
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.ratelimit import TokenBucket, BucketTable
+from core.schema import AgentSkill, AuditResult, AuditStatus, Intent, Message
+from core.provider import BaseProvider
+from core.audit import BaseAuditor
+from core.dispatcher import Dispatcher
+from core.memory import MirrorMemory, KnowledgeStore
+from core.perception import PerceptionEvent
+
+
+class FakeClock:
+    def __init__(self, now: float = 100.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_bucket_burst_then_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(tokens=3, period=6.0, clock=clock)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.wait_time() == 2.0
+    clock.now += 2.0
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_bucket_never_exceeds_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(tokens=2, period=1.0, clock=clock)
+    clock.now += 1000
+    assert bucket.is_full()
+    assert [bucket.try_acquire() for _ in range(3)] == [True, True, False]
+
+
+def test_table_rebuilds_bucket_when_rule_changes():
+    clock = FakeClock()
+    table = BucketTable(clock=clock)
+    assert table.try_acquire("rule", 1, 5.0)
+    assert not table.try_acquire("rule", 1, 5.0)
+    # 规则修改了限额：重建为新桶
+    assert table.try_acquire("rule", 2, 5.0)
+    assert table.try_acquire("rule", 2, 5.0)
+    assert not table.try_acquire("rule", 2, 5.0)
+
+
+def test_table_sweeps_refilled_buckets():
+    clock = FakeClock()
+    table = BucketTable(sweep_interval=10.0, clock=clock)
+    table.try_acquire("hot", 1, 60.0)
+    table.try_acquire("cold", 1, 1.0)
+    clock.now += 11.0
+    table.get("other", 1, 1.0)  # 触发清扫
+    assert len(table) == 2  # "cold" 已回满被丢弃，"hot" 仍在冷却
+    assert not table.try_acquire("hot", 1, 60.0)
+
+
+class IdleProvider(BaseProvider):
+    async def chat(self, messages: list[Message]) -> str:
+        return ""
+
+    async def resolve_intent(self, query: str, skills: list[AgentSkill], **kwargs) -> Intent:
+        return Intent(raw_query=query, thought_process="unused", confidence=0.0)
+
+
+class PassAuditor(BaseAuditor):
+    async def audit(self, skill_id, parameters, context) -> AuditResult:
+        return AuditResult(status=AuditStatus.PASS, rationale="ok", risk_level=1)
+
+
+def test_reflex_rule_is_rate_limited_per_rule():
+    async def scenario(workdir):
+        dispatcher = Dispatcher(
+            provider=IdleProvider(), auditor=PassAuditor(),
+            memory=MirrorMemory(os.path.join(workdir, "mirror")),
+            knowledge=KnowledgeStore(os.path.join(workdir, "knowledge.json")),
+        )
+        bus = dispatcher.perception
+        clock = FakeClock()
+        bus.reflex_buckets = BucketTable(clock=clock)
+        bus.reflex_rules = [
+            {"id": "disk", "source": "system", "pattern": "磁盘", "target_skill": "system_stats",
+             "template": "磁盘告警: {data}"},  # 默认限流：每 5 秒 1 次
+            {"id": "load", "source": "system", "pattern": "负载", "target_skill": "system_stats",
+             "template": "负载告警: {data}", "rate_limit": {"tokens": 2, "period": 10.0}},
+        ]
+
+        async def fire(text) -> bool:
+            await bus._process_event(PerceptionEvent("system", text, 0.5))
+            suggestion = dispatcher.next_suggestion()
+            if suggestion is None:
+                return False
+            dispatcher.release_task(suggestion.task_id)  # 用户拒绝，不阻塞后续建议
+            return True
+
+        assert [await fire("磁盘空间告急") for _ in range(3)] == [True, False, False]
+        assert [await fire("系统负载过高") for _ in range(3)] == [True, True, False]
+        clock.now += 5.0
+        assert await fire("磁盘空间告急")
+        assert [await fire("系统负载过高")] == [True]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(scenario(workdir))
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import sys
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.schema import AgentSkill, Intent, Message
+from core.provider import BaseProvider
+from core.providers.router import RoutingProvider
+
+SKILLS = [
+    AgentSkill(id="system_stats", name="System Stats", description="Show system status", keywords=["系统状态"]),
+    AgentSkill(id="cleaner", name="Cleaner", description="Clean temp files", keywords=["清理"]),
+]
+
+
+class ScriptedProvider(BaseProvider):
+    def __init__(self, skill_id="cleaner", confidence=0.9, delay=0.0, error=None):
+        self.skill_id = skill_id
+        self.confidence = confidence
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def chat(self, messages: list[Message]) -> str:
+        return ""
+
+    async def resolve_intent(self, query: str, skills: list[AgentSkill], **kwargs) -> Intent:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return Intent(raw_query=query, thought_process=f"from {id(self)}",
+                      target_skill_id=self.skill_id, confidence=self.confidence)
+
+
+def test_confident_local_match_skips_llm():
+    async def scenario():
+        inner = ScriptedProvider()
+        router = RoutingProvider(inner, threshold=0.8)
+        intent = await router.resolve_intent("看看 system_stats 系统状态", SKILLS)
+        assert intent.target_skill_id == "system_stats" and intent.thought_process.startswith("[本地路由]")
+        assert inner.calls == 0
+        assert router.own_stats()["routes"]["local"]["count"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_weak_local_match_goes_to_llm_and_records_agreement():
+    async def scenario():
+        inner = ScriptedProvider(skill_id="system_stats")
+        router = RoutingProvider(inner, threshold=0.8)
+        intent = await router.resolve_intent("系统状态", SKILLS)  # 句首关键词 20 分 -> 置信度 0.667
+        assert intent.thought_process == f"from {id(inner)}" and inner.calls == 1
+        inner.skill_id = "cleaner"
+        await router.resolve_intent("系统状态", SKILLS)
+        await router.resolve_intent("今天天气", SKILLS)  # 无本地候选，不参与一致性统计
+        stats = router.own_stats()
+        assert stats["routes"]["llm"]["count"] == 3 and stats["hedges_started"] == 0
+        assert stats["agreement"] == {"0.6-0.7": {"compared": 2, "agreed": 1, "rate": 0.5}}
+
+    asyncio.run(scenario())
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    async def scenario():
+        primary = ScriptedProvider(delay=1.0)
+        backup = ScriptedProvider(skill_id="cleaner", delay=0.01)
+        router = RoutingProvider(primary, hedge=backup, hedge_after=0.05)
+        intent = await router.resolve_intent("今天天气", SKILLS)
+        await asyncio.sleep(0)
+        assert intent.thought_process == f"from {id(backup)}"
+        assert router.hedges_started == 1 and primary.cancelled == 1
+        assert router.own_stats()["routes"]["hedge"]["count"] == 1
+
+        fast = ScriptedProvider(delay=0)
+        quick = RoutingProvider(fast, hedge=ScriptedProvider(), hedge_after=0.5)
+        await quick.resolve_intent("今天天气", SKILLS)
+        assert quick.hedges_started == 0 and quick.hedge.calls == 0
+
+    asyncio.run(scenario())
+
+
+def test_hedge_ignores_failed_or_degraded_results():
+    async def scenario():
+        # 对冲方先返回降级意图 (confidence 0)：继续等待主 provider
+        primary = ScriptedProvider(skill_id="system_stats", delay=0.1)
+        degraded = ScriptedProvider(skill_id=None, confidence=0.0, delay=0)
+        router = RoutingProvider(primary, hedge=degraded, hedge_after=0.02)
+        intent = await router.resolve_intent("今天天气", SKILLS)
+        assert intent.target_skill_id == "system_stats"
+
+        # 主 provider 抛异常：采用对冲结果
+        broken = ScriptedProvider(delay=0.05, error=RuntimeError("gateway down"))
+        router = RoutingProvider(broken, hedge=ScriptedProvider(skill_id="cleaner", delay=0.1), hedge_after=0.02)
+        assert (await router.resolve_intent("今天天气", SKILLS)).target_skill_id == "cleaner"
+
+        # 双方都失败：抛出主 provider 的异常
+        router = RoutingProvider(broken, hedge=ScriptedProvider(delay=0.01, error=ValueError("x")), hedge_after=0.02)
+        try:
+            await router.resolve_intent("今天天气", SKILLS)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("primary error should propagate")
+
+    asyncio.run(scenario())
+
+
+def test_shadow_review_checks_local_decisions():
+    async def scenario():
+        inner = ScriptedProvider(skill_id="system_stats")
+        router = RoutingProvider(inner, threshold=0.8, shadow_rate=1.0)
+        intent = await router.resolve_intent("看看 system_stats 系统状态", SKILLS)
+        assert intent.thought_process.startswith("[本地路由]")
+        await asyncio.gather(*router._shadow_tasks)
+        assert inner.calls == 1
+        assert router.own_stats()["agreement"]["0.9-1.0"] == {"compared": 1, "agreed": 1, "rate": 1.0}
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import sys
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sensors.base import BaseSensor
+
+
+class IdleSensor(BaseSensor):
+    """不发射任何事件的最小传感器"""
+    async def _run(self):
+        while self.running:
+            await self._cycle_sleep(0.0)
+
+
+def _idle_intervals(sensor: BaseSensor, cycles: int) -> list:
+    return [sensor._next_interval() for _ in range(cycles)]
+
+
+def test_fixed_interval_without_opt_in():
+    sensor = IdleSensor("idle", bus=None, interval=5)
+    assert sensor.max_interval == 5
+    assert _idle_intervals(sensor, 6) == [5] * 6
+
+
+def test_backoff_when_max_interval_given():
+    sensor = IdleSensor("idle", bus=None, interval=5, max_interval=30)
+    assert _idle_intervals(sensor, 5) == [10, 20, 30, 30, 30]
+
+
+def test_activity_resets_interval():
+    sensor = IdleSensor("idle", bus=None, interval=2, max_interval=16)
+    _idle_intervals(sensor, 4)
+    assert sensor.current_interval == 16
+    sensor.mark_activity()
+    assert sensor._next_interval() == 2
+    assert sensor._next_interval() == 4
+
+
+def test_max_interval_never_below_interval():
+    sensor = IdleSensor("idle", bus=None, interval=10, max_interval=3)
+    assert sensor.max_interval == 10
+
+
+def test_interval_free_sensor_has_no_schedule():
+    sensor = IdleSensor("idle", bus=None)
+    assert sensor.max_interval is None
+    assert sensor._next_interval() is None
+
+
+def test_duty_cycle_stats():
+    async def scenario():
+        sensor = IdleSensor("idle", bus=None, interval=0.01)
+        await sensor.start()
+        await asyncio.sleep(0.1)
+        sensor.running = False
+        await sensor.stop()
+        stats = sensor.stats()
+        assert stats["cycles"] >= 3
+        assert stats["base_interval"] == 0.01
+        assert stats["max_interval"] == 0.01
+        assert 0.0 <= stats["duty_cycle_pct"] <= 100.0
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
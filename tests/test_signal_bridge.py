@@ -0,0 +1,200 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.providers import signal_bridge
+from core.providers.signal_bridge import (
+    JournalBridge, SignalWatcher, cleanup_orphaned_requests, get_signal_watcher,
+)
+from core.sensors.inotify import inotify_available
+
+
+def _atomic_drop(directory: str, name: str, text: str = "{}"):
+    tmp = os.path.join(directory, f".{name}.tmp")
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, os.path.join(directory, name))
+
+
+async def _drop_later(directory: str, name: str, delay: float):
+    await asyncio.sleep(delay)
+    _atomic_drop(directory, name)
+
+
+def _watch_scenario(directory: str, expected_mode: str):
+    async def scenario():
+        watcher = SignalWatcher(directory, poll_interval=0.02)
+        try:
+            # 文件已存在：立即返回
+            _atomic_drop(directory, "ready.json")
+            assert await watcher.wait_for("ready.json", timeout=0.5)
+            assert watcher.mode == expected_mode
+
+            # 多个任务等待不同文件，各自在文件落地时被唤醒
+            started = time.monotonic()
+            waits = [asyncio.create_task(watcher.wait_for(f"response_{i}.json", timeout=2)) for i in range(5)]
+            await asyncio.sleep(0.01)
+            assert watcher.waiting == 5
+            await asyncio.gather(*(_drop_later(directory, f"response_{i}.json", 0.02 * i) for i in range(5)))
+            assert await asyncio.gather(*waits) == [True] * 5
+            assert time.monotonic() - started < 1.0
+            assert watcher.waiting == 0
+
+            # 前缀等待与超时
+            prefix = asyncio.create_task(watcher.wait_for("batch_", timeout=2, prefix=True))
+            await _drop_later(directory, "batch_001.jsonl", 0.02)
+            assert await prefix
+            assert not await watcher.wait_for("never.json", timeout=0.05)
+            assert watcher.waiting == 0 and watcher.wakeups >= 7
+        finally:
+            watcher.close()
+        assert watcher.mode == "idle"
+
+    asyncio.run(scenario())
+
+
+def test_inotify_watcher_wakes_waiters():
+    if not inotify_available():
+        print("inotify unavailable, skipped")
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        _watch_scenario(directory, "inotify")
+
+
+def test_poll_fallback_shares_one_poller():
+    original = signal_bridge.inotify_available
+    signal_bridge.inotify_available = lambda: False
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            _watch_scenario(directory, "poll")
+
+            async def single_poller():
+                watcher = SignalWatcher(directory, poll_interval=0.02)
+                waits = [asyncio.create_task(watcher.wait_for(f"late_{i}", timeout=1)) for i in range(10)]
+                await asyncio.sleep(0.01)
+                assert watcher._poller is not None and watcher.waiting == 10
+                for i in range(10):
+                    _atomic_drop(directory, f"late_{i}")
+                assert await asyncio.gather(*waits) == [True] * 10
+                await asyncio.sleep(0.05)
+                assert watcher._poller is None  # 无人等待时轮询协程自行退出
+                watcher.close()
+
+            asyncio.run(single_poller())
+    finally:
+        signal_bridge.inotify_available = original
+
+
+def test_watchers_shared_per_directory():
+    with tempfile.TemporaryDirectory() as directory:
+        watcher = get_signal_watcher(directory)
+        assert get_signal_watcher(os.path.join(directory, ".")) is watcher
+        assert get_signal_watcher(os.path.join(directory, "other")) is not watcher
+
+
+def test_cleanup_removes_only_stale_inactive_requests():
+    with tempfile.TemporaryDirectory() as directory:
+        old = time.time() - 3600
+        for name in ("pending_a.request", "pending_b.request", "pending_c.request", "response_a.json"):
+            with open(os.path.join(directory, name), "w") as f:
+                f.write("x")
+        for name in ("pending_a.request", "pending_b.request", "response_a.json"):
+            os.utime(os.path.join(directory, name), (old, old))
+
+        removed = cleanup_orphaned_requests(directory, max_age=600, active={"pending_b.request"})
+        assert removed == 1
+        assert sorted(os.listdir(directory)) == ["pending_b.request", "pending_c.request", "response_a.json"]
+
+
+def _journal_lines(journal: JournalBridge) -> list:
+    with open(journal.journal_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_journal_manifest_published_once_per_content():
+    with tempfile.TemporaryDirectory() as directory:
+        journal = JournalBridge(directory)
+        manifest = [{"id": "system_stats", "name": "System stats"}]
+        digest = journal.publish_manifest(manifest)
+        assert journal.publish_manifest([dict(manifest[0])]) == digest
+        other = journal.publish_manifest(manifest + [{"id": "cleaner"}])
+        assert other != digest
+        assert sorted(os.listdir(journal.manifest_dir)) == sorted([f"{digest}.json", f"{other}.json"])
+        assert journal.counters["manifests_written"] == 2
+
+        # 重启后已存在的清单不重复写入
+        restarted = JournalBridge(directory)
+        assert restarted.publish_manifest(manifest) == digest
+        assert restarted.counters["manifests_written"] == 0
+
+
+def test_journal_batch_responses_dispatched_by_task_id():
+    async def scenario(directory: str):
+        journal = JournalBridge(directory, backstop=0.5)
+        futures = {tid: journal.submit({"task_id": tid, "query": f"q {tid}"}) for tid in ("t1", "t2", "t3")}
+        assert [r["task_id"] for r in _journal_lines(journal)] == ["t1", "t2", "t3"]
+        assert journal.pending == 3
+
+        # 半成品批次 (非法 JSON) 不被消费，也不删除
+        with open(os.path.join(directory, "responses_000.jsonl"), "w") as f:
+            f.write('{"task_id": "t1", "answer"')
+        await asyncio.sleep(0.05)
+        assert journal.pending == 3
+        os.remove(os.path.join(directory, "responses_000.jsonl"))
+
+        batch = [{"task_id": "t2", "target_skill_id": "cleaner"}, {"task_id": "t1", "target_skill_id": "system_stats"},
+                 {"task_id": "stale", "target_skill_id": None}]
+        _atomic_drop(directory, "responses_001.jsonl", "\n".join(json.dumps(r) for r in batch) + "\n")
+        r1, r2 = await asyncio.wait_for(asyncio.gather(futures["t1"], futures["t2"]), timeout=2)
+        assert (r1["target_skill_id"], r2["target_skill_id"]) == ("system_stats", "cleaner")
+        assert not os.path.exists(os.path.join(directory, "responses_001.jsonl"))
+
+        journal.close("t1", "ANSWERED")
+        journal.close("t2", "ANSWERED")
+        journal.close("t3", "EXPIRED")
+        assert futures["t3"].cancelled()
+        assert _journal_lines(journal)[-3:] == [
+            {"task_id": "t1", "status": "ANSWERED"}, {"task_id": "t2", "status": "ANSWERED"},
+            {"task_id": "t3", "status": "EXPIRED"},
+        ]
+        stats = journal.stats()
+        assert stats["answered"] == 2 and stats["expired"] == 1 and stats["unknown_responses"] == 1
+        assert stats["batches"] == 1 and stats["pending"] == 0
+        assert journal._consumer is None
+        get_signal_watcher(directory).close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(scenario(directory))
+
+
+def test_journal_rotates_only_when_idle():
+    async def scenario(directory: str):
+        journal = JournalBridge(directory, rotate_bytes=64)
+        journal.submit({"task_id": "a", "query": "x" * 100})
+        journal.submit({"task_id": "b", "query": "y"})  # 仍有未决请求：不轮转
+        assert journal.counters["rotations"] == 0
+        journal.close("a", "EXPIRED")
+        journal.close("b", "EXPIRED")
+        journal.submit({"task_id": "c", "query": "z"})
+        assert journal.counters["rotations"] == 1
+        assert [r["task_id"] for r in _journal_lines(journal)] == ["c"]
+        assert os.path.exists(journal.journal_path + ".1")
+        journal.close("c", "EXPIRED")
+        get_signal_watcher(directory).close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(scenario(directory))
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
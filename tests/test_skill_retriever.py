@@ -0,0 +1,93 @@
+import json
+import os
+import sys
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.schema import AgentSkill
+from core.skill_retriever import SkillRetriever, compact_manifest, estimate_tokens
+
+
+def _skill(skill_id, name, description, tags=(), examples=(), keywords=()):
+    return AgentSkill(id=skill_id, name=name, description=description, tags=list(tags),
+                      examples=list(examples), keywords=list(keywords))
+
+
+SKILLS = [
+    _skill("system_stats", "System Stats", "显示 CPU、内存和磁盘使用情况", tags=["system"], examples=["系统状态如何"]),
+    _skill("weather", "Weather", "查询城市天气预报", tags=["weather"], examples=["北京明天天气"]),
+    _skill("cleaner", "Cleaner", "清理临时文件与缓存目录", tags=["disk"], keywords=["清理"]),
+    _skill("git_helper", "Git Helper", "Show git status, commits and branches", tags=["git"]),
+    _skill("translator", "Translator", "翻译一段文本到指定语言", examples=["把这句话翻译成英文"]),
+    _skill("timer", "Timer", "设置倒计时提醒", examples=["十分钟后提醒我"]),
+    _skill("calculator", "Calculator", "Evaluate arithmetic expressions", tags=["math"]),
+    _skill("music", "Music", "播放音乐或暂停播放", tags=["media"]),
+    _skill("news", "News", "获取今日新闻摘要", tags=["news"]),
+    _skill("notes", "Notes", "记录和查找个人笔记", keywords=["笔记"]),
+    _skill("brain_rescue", "Brain Rescue", "无法处理时转交云端大脑"),
+    _skill("lifestyle_chat", "Chat", "日常闲聊"),
+]
+
+
+def test_estimate_tokens_counts_cjk_per_char():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("系统状态") == 4
+    assert estimate_tokens("系统 ok") == 2 + 1
+
+
+def test_compact_manifest_omits_empty_fields_and_output_schema():
+    skill = AgentSkill(id="a", name="A", description="d", input_schema={"type": "object"},
+                       output_schema={"type": "string"})
+    manifest = compact_manifest([skill, _skill("b", "B", "e", tags=["t"])])
+    assert json.loads(manifest) == [
+        {"id": "a", "name": "A", "description": "d", "input_schema": {"type": "object"}},
+        {"id": "b", "name": "B", "description": "e", "tags": ["t"]},
+    ]
+    assert "\n" not in manifest and ": " not in manifest
+
+
+def test_small_catalogue_is_not_pruned():
+    retriever = SkillRetriever(top_k=8)
+    few = SKILLS[:5] + SKILLS[-2:]
+    assert retriever.select("天气", few) == few
+    assert retriever.last["reason"] == "small"
+
+
+def test_prunes_to_relevant_skills_plus_pinned_in_original_order():
+    retriever = SkillRetriever(top_k=2)
+    selected = [s.id for s in retriever.select("北京今天天气怎么样", SKILLS)]
+    assert retriever.score("北京今天天气怎么样", SKILLS)[0][1].id == "weather"
+    assert set(selected) >= {"weather", "brain_rescue", "lifestyle_chat"}
+    assert len(selected) <= 4
+    assert selected == [s.id for s in SKILLS if s.id in selected]  # 保持注册顺序
+
+    assert "git_helper" in [s.id for s in retriever.select("show me the git commits", SKILLS)]
+    stats = retriever.stats()
+    assert stats["pruned"] == 2 and stats["prompt_tokens"] < stats["full_tokens"]
+    assert 0 < stats["token_reduction"] < 1
+
+
+def test_no_overlap_falls_back_to_full_catalogue():
+    retriever = SkillRetriever(top_k=2)
+    assert retriever.select("Привет, как дела", SKILLS) == SKILLS
+    assert retriever.last["reason"] == "fallback" and retriever.counters["fallbacks"] == 1
+
+
+def test_index_rebuilt_when_skills_change():
+    retriever = SkillRetriever(top_k=2)
+    retriever.select("天气", SKILLS)
+    signature = retriever._signature
+    extended = SKILLS + [_skill("stocks", "Stocks", "查询股票行情与涨跌", keywords=["股票"])]
+    selected = [s.id for s in retriever.select("股票行情", extended)]
+    assert retriever._signature != signature
+    assert "stocks" in selected and "weather" not in selected
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
@@ -0,0 +1,121 @@
+import asyncio
+import gzip
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sensors.file_sensor import FileSensor
+from core.sensors.state_cache import FileRecord, load_file_index, save_file_index
+
+META = {"hash_mode": "sha256", "partial_threshold": 1024}
+
+
+class RecordingBus:
+    def __init__(self):
+        self.events = []
+
+    async def emit(self, source, data, importance=0.5):
+        self.events.append(data)
+
+
+def test_index_round_trip_uses_relative_paths():
+    with tempfile.TemporaryDirectory() as workdir:
+        root = os.path.join(workdir, "project")
+        path = os.path.join(workdir, "state", "index.json.gz")
+        index = {os.path.join(root, "src", "a.py"): FileRecord(1.5, 10, 42, "abc")}
+        save_file_index(path, root, META, index)
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        assert list(payload["files"]) == [os.path.join("src", "a.py")]
+        assert load_file_index(path, root, META) == index
+        assert not os.path.exists(path + ".tmp")
+
+
+def test_index_rejected_on_mismatch_or_corruption():
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "index.json.gz")
+        save_file_index(path, "/p", META, {"/p/a.py": FileRecord(1.0, 1, 1, "h")})
+        assert load_file_index(path, "/other", META) is None
+        assert load_file_index(path, "/p", dict(META, hash_mode="blake2b")) is None  # 指纹不可比
+        assert load_file_index(os.path.join(workdir, "missing.gz"), "/p", META) is None
+        with open(path, "wb") as f:
+            f.write(b"\x1f\x8b truncated")
+        assert load_file_index(path, "/p", META) is None
+
+
+def test_warm_start_reports_offline_changes_only():
+    """热启动：停机期间的增删改如实上报，未变化的文件不重新哈希"""
+    async def scenario(workdir: str, state_dir: str):
+        for name in ("keep.py", "edit.py", "drop.py"):
+            with open(os.path.join(workdir, name), "w") as f:
+                f.write(name)
+
+        first = FileSensor(RecordingBus(), workdir, backend="poll", state_dir=state_dir)
+        for spec in first.watchset.load():
+            await first._activate_root(spec)
+        await first.stop()
+        assert os.listdir(state_dir)
+
+        # 停机期间的变更
+        with open(os.path.join(workdir, "edit.py"), "w") as f:
+            f.write("edited while offline")
+        os.remove(os.path.join(workdir, "drop.py"))
+        with open(os.path.join(workdir, "new.py"), "w") as f:
+            f.write("new")
+
+        bus = RecordingBus()
+        second = FileSensor(bus, workdir, backend="poll", state_dir=state_dir)
+        hashed = []
+        original = second._compute_hash
+
+        def tracking_hash(path):
+            hashed.append(os.path.basename(path))
+            return original(path)
+
+        second._compute_hash = tracking_hash
+        for spec in second.watchset.load():
+            await second._activate_root(spec)
+        await second.stop()
+
+        root = second.roots[second.watch_path]
+        assert root.warm
+        assert sorted(hashed) == ["edit.py", "new.py"]
+        assert sorted(bus.events) == sorted([
+            "检测到活动文件变更: edit.py",
+            "检测到新文件创建: new.py",
+            "检测到文件删除: drop.py",
+        ])
+
+    with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+        asyncio.run(scenario(workdir, state_dir))
+
+
+def test_cold_start_is_silent_and_persists_immediately():
+    async def scenario(workdir: str, state_dir: str):
+        with open(os.path.join(workdir, "a.py"), "w") as f:
+            f.write("a")
+        bus = RecordingBus()
+        sensor = FileSensor(bus, workdir, backend="poll", state_dir=state_dir, state_save_interval=3600)
+        for spec in sensor.watchset.load():
+            await sensor._activate_root(spec)
+        root = sensor.roots[sensor.watch_path]
+        assert bus.events == [] and not root.warm
+        # 初始扫描后立即落盘，不等待 state_save_interval
+        assert load_file_index(root.state_path, root.path, sensor._state_meta()).keys() == root.index.keys()
+        await sensor.stop()
+
+    with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+        asyncio.run(scenario(workdir, state_dir))
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
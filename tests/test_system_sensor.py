@@ -0,0 +1,154 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sensors.metrics import MetricsRegistry
+from core.sensors.procfs import (
+    read_cpu_times, read_meminfo, read_loadavg, read_diskstats, read_self_status, procfs_available,
+)
+from core.sensors.system_sensor import SystemSensor, _Alarm, read_system_snapshot
+
+
+class RecordingBus:
+    def __init__(self):
+        self.events = []
+
+    async def emit(self, source, data, importance=0.5):
+        self.events.append(data)
+
+
+def _write(root: str, rel: str, text: str):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _block_device() -> str:
+    """挑选一个真实存在于 /sys/block 的物理设备名 (read_diskstats 会以此过滤分区)"""
+    if os.path.isdir("/sys/block"):
+        for name in sorted(os.listdir("/sys/block")):
+            if not name.startswith(("loop", "ram", "dm-", "zram", "sr")):
+                return name
+    return "sda"
+
+
+def test_procfs_parsers_read_fake_root():
+    with tempfile.TemporaryDirectory() as root:
+        device = _block_device()
+        _write(root, "stat", "cpu  100 5 50 800 40 3 2 0 7 0\ncpu0 1 2 3 4\n")
+        _write(root, "meminfo", "MemTotal:       16000 kB\nMemAvailable:    4000 kB\nHugePages_Total:       0\n")
+        _write(root, "loadavg", "0.50 0.40 0.30 2/345 6789\n")
+        _write(root, "diskstats", "\n".join([
+            f"   8       0 {device} 10 0 200 0 20 0 400 0 0 150 0",
+            f"   8       1 {device}1 10 0 200 0 20 0 400 0 0 150 0",
+            "   7       0 loop0 1 0 2 0 3 0 4 0 0 5 0",
+            "   bad line",
+        ]) + "\n")
+        _write(root, "self/status", "Name:\tpython\nVmRSS:\t  2048 kB\nThreads:\t4\n")
+
+        assert procfs_available(root)
+        cpu = read_cpu_times(root)
+        assert cpu.total == 100 + 5 + 50 + 800 + 40 + 3 + 2 + 0  # guest 不重复计入
+        assert (cpu.idle, cpu.iowait) == (840, 40)
+        assert read_meminfo(root) == {"MemTotal": 16000, "MemAvailable": 4000, "HugePages_Total": 0}
+        assert read_loadavg(root) == (0.5, 0.4, 0.3, 2, 345)
+        disks = read_diskstats(root)
+        assert list(disks) == [device]  # 分区与 loop 设备被跳过
+        assert disks[device] == (10, 200, 20, 400, 150)
+        assert read_self_status(root) == {"VmRSS": 2048, "Threads": 4}
+
+        missing = os.path.join(root, "missing")
+        assert not procfs_available(missing)
+        assert read_cpu_times(missing) is None and read_meminfo(missing) == {} and read_diskstats(missing) == {}
+
+
+def test_alarm_hysteresis_and_sustain():
+    alarm = _Alarm(enter=90.0, exit=70.0, sustain=3)
+    assert [alarm.update(v) for v in (95, 95, 50, 95, 95)] == [None] * 5  # 中断后重新计数
+    assert alarm.update(95) == "enter" and alarm.active
+    assert [alarm.update(v) for v in (85, 75, 92)] == [None] * 3      # 迟滞带内不解除也不重复触发
+    assert alarm.update(69) == "exit" and not alarm.active
+
+    low = _Alarm(enter=10.0, exit=12.0, above=False)
+    assert low.update(9.5) == "enter"
+    assert low.update(11.0) is None
+    assert low.update(12.5) == "exit"
+
+
+def test_metrics_registry_window_summary_and_slope():
+    metrics = MetricsRegistry(maxlen=5)
+    for i in range(8):
+        metrics.record("x", float(i), ts=1000.0 + i * 10)
+    assert [v for _, v in metrics.series("x")] == [3.0, 4.0, 5.0, 6.0, 7.0]  # 只保留最近 maxlen 个
+    assert [v for _, v in metrics.series("x", window=20)] == [5.0, 6.0, 7.0]
+    assert metrics.summary("x") == {"last": 7.0, "min": 3.0, "avg": 5.0, "max": 7.0, "samples": 5}
+    assert abs(metrics.slope("x", window=100) - 0.1) < 1e-9
+    assert metrics.slope("x", window=10) is None  # 采样不足
+    assert metrics.summary("missing") is None and metrics.latest("missing", 1.0) == 1.0
+    metrics.record("y", 2.0, ts=1000.0)
+    assert metrics.snapshot() == {"x": 7.0, "y": 2.0} and metrics.names() == ["x", "y"]
+
+
+def test_thresholds_emit_once_per_transition():
+    async def scenario():
+        bus = RecordingBus()
+        sensor = SystemSensor(bus, metrics=MetricsRegistry())
+        for free in (50.0, 9.0, 8.0, 7.5, 11.0, 12.5, 13.0):
+            await sensor._check_thresholds({"disk.free_gb": free})
+        assert bus.events == ["磁盘空间告急 (剩余 9.0 GB)", "磁盘空间已恢复 (剩余 12.5 GB)"]
+
+        bus.events.clear()
+        for busy in (95.0, 95.0, 95.0, 95.0):
+            await sensor._check_thresholds({"cpu.busy_pct": busy})
+        assert bus.events == ["CPU 持续高负载 (95%)"]
+
+    asyncio.run(scenario())
+
+
+def test_disk_exhaustion_trend_reported_once():
+    async def scenario():
+        bus = RecordingBus()
+        metrics = MetricsRegistry()
+        sensor = SystemSensor(bus, metrics=metrics)
+        now = time.time()
+        # 每分钟减少 1 GB，剩余 30 GB -> 约 30 分钟耗尽
+        for i in range(10):
+            metrics.record("disk.free_gb", 39.0 - i, ts=now - (9 - i) * 60)
+        await sensor._check_trends({"disk.free_gb": 30.0})
+        await sensor._check_trends({"disk.free_gb": 30.0})
+        assert bus.events == ["磁盘空间预计 30 分钟内耗尽"]
+
+        # 趋势解除后可再次上报
+        metrics.record("disk.free_gb", 60.0, ts=now + 60)
+        metrics.record("disk.free_gb", 80.0, ts=now + 120)
+        metrics.record("disk.free_gb", 100.0, ts=now + 180)
+        await sensor._check_trends({"disk.free_gb": 100.0})
+        assert "disk_eta" not in sensor._trends_active
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_prefers_fresh_metrics():
+    metrics = MetricsRegistry()
+    metrics.record("disk.free_gb", 42.0)
+    metrics.record("cpu.busy_pct", 12.0)
+    assert read_system_snapshot(metrics=metrics) == {"disk.free_gb": 42.0, "cpu.busy_pct": 12.0}
+
+    stale = MetricsRegistry()
+    stale.record("disk.free_gb", 42.0, ts=time.time() - 3600)
+    sampled = read_system_snapshot(max_age=60, metrics=stale)
+    assert "disk.free_gb" in sampled and "cpu.busy_pct" not in sampled  # 现场采样没有速率类指标
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to allow importing core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sensors.file_sensor import FileSensor
+from core.sensors.watchset import GlobSet, WatchMatcher, WatchSetConfig, DEFAULT_EXTENSIONS
+
+
+def _match(patterns, rel, is_dir=False):
+    return GlobSet(patterns).match(rel, rel.rsplit("/", 1)[-1], is_dir)
+
+
+def test_glob_unanchored_names_match_at_any_depth():
+    assert _match(["*.min.js"], "static/js/app.min.js")
+    assert _match(["node_modules/"], "web/node_modules", is_dir=True)
+    assert not _match(["node_modules/"], "web/node_modules", is_dir=False)  # 仅目录
+    assert _match(["uv.lock"], "sub/uv.lock")
+
+
+def test_glob_anchored_and_double_star():
+    assert _match(["/build"], "build", is_dir=True)
+    assert not _match(["/build"], "src/build", is_dir=True)
+    assert _match(["docs/*.md"], "docs/a.md")
+    assert not _match(["docs/*.md"], "docs/sub/a.md")
+    assert _match(["docs/**/*.md"], "docs/sub/deep/a.md")
+    assert _match(["docs/**/*.md"], "docs/a.md")
+    assert _match(["a?c.py"], "abc.py") and not _match(["a?c.py"], "a/c.py")
+    assert _match(["[!x]*.py"], "main.py") and not _match(["[!x]*.py"], "x.py")
+
+
+def test_glob_negation_last_rule_wins():
+    patterns = ["*.json", "!package.json", "config/package.json"]
+    assert _match(patterns, "data.json")
+    assert not _match(patterns, "package.json")
+    assert _match(patterns, "config/package.json")
+
+
+def test_glob_comments_and_blank_lines_ignored():
+    globs = GlobSet(["# comment", "", "  ", "*.log"])
+    assert len(globs.patterns) == 1 and bool(globs)
+    assert not GlobSet([])
+
+
+def test_matcher_extensions_exclude_include():
+    matcher = WatchMatcher(include=["src/**"], exclude=["*_test.py", "vendor/"], extensions=["py", ".MD"])
+    assert matcher.file_included("src/app.py", "app.py")
+    assert matcher.file_included("src/README.md", "README.md")
+    assert not matcher.file_included("src/app.js", "app.js")          # 扩展名不在清单
+    assert not matcher.file_included("src/app_test.py", "app_test.py")  # 被排除
+    assert not matcher.file_included("tools/run.py", "run.py")        # 不在 include 范围
+    assert matcher.dir_excluded("src/vendor", "vendor")
+
+
+def test_config_inherits_defaults_and_keeps_default_root():
+    with tempfile.TemporaryDirectory() as workdir:
+        main_root = os.path.join(workdir, "main")
+        side = os.path.join(workdir, "side")
+        os.makedirs(main_root)
+        os.makedirs(side)
+        path = os.path.join(workdir, "watchsets.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"defaults": {"extensions": [".py"]},
+                       "roots": [{"path": "side", "extensions": [".ts"]}, {"path": "side"}]}, f)
+
+        config = WatchSetConfig(path, default_root=main_root)
+        roots = config.load()
+        assert [r.path for r in roots] == [main_root, side]  # default_root 始终在列，重复路径去重
+        assert roots[0].matcher.file_included("a.py", "a.py")
+        assert not roots[0].matcher.file_included("a.ts", "a.ts")
+        assert roots[1].matcher.file_included("a.ts", "a.ts")
+        assert not config.changed()
+
+        time.sleep(0.01)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{broken")
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10_000_000))
+        assert config.changed()
+        roots = config.load()
+        assert config.error and [r.path for r in roots] == [main_root]
+        assert roots[0].matcher.extensions == frozenset(DEFAULT_EXTENSIONS)
+
+
+class RecordingBus:
+    def __init__(self):
+        self.events = []
+
+    async def emit(self, source, data, importance=0.5):
+        self.events.append(data)
+
+
+def test_hot_reload_adds_roots_silently_and_reports_later_changes():
+    async def scenario(workdir: str, state_dir: str):
+        main_root = os.path.join(workdir, "main")
+        side = os.path.join(workdir, "side")
+        os.makedirs(main_root)
+        os.makedirs(side)
+        with open(os.path.join(side, "existing.py"), "w") as f:
+            f.write("x")
+        path = os.path.join(workdir, "watchsets.json")
+        bus = RecordingBus()
+        sensor = FileSensor(bus, main_root, backend="poll", state_dir=state_dir,
+                            watchset=WatchSetConfig(path, default_root=main_root))
+        for spec in sensor.watchset.load():
+            await sensor._activate_root(spec)
+        assert list(sensor.roots) == [main_root]
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"roots": [{"path": "side"}]}, f)
+        await sensor._reload_watchset()
+        assert sorted(sensor.roots) == [main_root, side]
+        assert bus.events == []  # 新增根目录的既有文件不视为新建
+
+        with open(os.path.join(side, "later.py"), "w") as f:
+            f.write("y")
+        for root in sensor.roots.values():
+            await sensor._poll_tree(root, root.path, full_sweep=True)
+        assert bus.events == [f"检测到新文件创建: {os.path.join('side', 'later.py')}"]
+
+        # 移除根目录后停止监控
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10_000_000))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"roots": []}, f)
+        await sensor._reload_watchset()
+        assert list(sensor.roots) == [main_root]
+        await sensor.stop()
+
+    with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+        asyncio.run(scenario(workdir, state_dir))
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"--- {name} ---")
+            fn()
+    print("OK")